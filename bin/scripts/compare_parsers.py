@@ -0,0 +1,55 @@
+import sys
+import copy
+import time
+from scraper.utils.fetch import fetch, fetch_many
+from scraper.utils.soup import make_soup
+from scraper.lib.entries import parse_entry_fragments, assign_tab_entry_ids
+from scraper.lib.entry import get_entry_url, parse_entry
+
+PARSERS = ['html.parser', 'lxml']
+
+
+def compare_parsers(tab_tourn_id: int, tab_event_id: int, sample_size: int = 25):
+    """Checks that every parser backend yields identical scraper output for a division and reports parse times.
+
+    Args:
+        tab_tourn_id (int): The unique ID assigned to the tournament, visible in the `tourn_id` query parameter.
+        tab_event_id (int): The unique ID assigned to the event, visible in the `event_id` query parameter.
+        sample_size (int, optional): The number of entry pages to compare. Defaults to 25.
+    """
+
+    fields = fetch(f"https://www.tabroom.com/index/tourn/fields.mhtml?tourn_id={tab_tourn_id}&event_id={tab_event_id}")
+    ranked_list = fetch(f"https://www.tabroom.com/index/tourn/results/ranked_list.mhtml?event_id={tab_event_id}&tourn_id={tab_tourn_id}")
+
+    fragments = {}
+    for parser in PARSERS:
+        start = time.perf_counter()
+        soup = make_soup(fields, parser)
+        if not len(soup.find_all('tr')):
+            soup = make_soup(ranked_list, parser)
+        fragments[parser] = parse_entry_fragments(soup)
+        assign_tab_entry_ids(fragments[parser], make_soup(ranked_list, parser))
+        print(f"[{parser}] Entries parsed in {round(time.perf_counter() - start, 3)}s")
+
+    baseline = fragments[PARSERS[0]]
+    for parser in PARSERS[1:]:
+        print(f"[{parser}] Entries {'match' if fragments[parser] == baseline else 'DIFFER'}")
+
+    sample = baseline[0:sample_size]
+    pages = fetch_many(list(map(lambda f: get_entry_url(tab_tourn_id, f['tab_entry_id']), sample)))
+
+    entries = {}
+    for parser in PARSERS:
+        start = time.perf_counter()
+        entries[parser] = list(map(lambda f, page: parse_entry(copy.deepcopy(f), make_soup(page, parser)), sample, pages))
+        print(f"[{parser}] {len(sample)} entry pages parsed in {round(time.perf_counter() - start, 3)}s")
+
+    for parser in PARSERS[1:]:
+        for expected, actual in zip(entries[PARSERS[0]], entries[parser]):
+            if expected != actual:
+                print(f"[{parser}] Entry {expected['tab_entry_id']} DIFFERS")
+        print(f"[{parser}] Entry comparison complete")
+
+
+if __name__ == "__main__":
+    compare_parsers(int(sys.argv[1]), int(sys.argv[2]))
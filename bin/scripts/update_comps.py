@@ -1,4 +1,6 @@
 from shared.const import API_BASE
+from pipelines.utils.otr_comp import get_round_rxrs, get_otr_comps
+import numpy as np
 import math
 import requests
 
@@ -32,17 +34,23 @@ results = requests.post(f"{API_BASE}/results/teams/advanced/findMany", json={
     }
 }).json()
 
+team_idx = []
+op_p_wps = []
+p_wps = []
+break_boosts = []
+tournament_boosts = []
+
 for i, result in enumerate(results):
-    print(f"Updating {i + 1}/{len(results)}")
-    rxr = 0
-    p_wp = result['prelimBallotsWon'] / (result['prelimBallotsWon'] + result['prelimBallotsLost'])
-    break_boost = (result['elimWins'] or 0) + (result['elimLosses'] or 0) + 1
-    tournament_boost = result['division']['boost'] or 1
+    print(f"Fetching rounds {i + 1}/{len(results)}")
+    p_wps.append(result['prelimBallotsWon'] / (result['prelimBallotsWon'] + result['prelimBallotsLost']))
+    break_boosts.append((result['elimWins'] or 0) + (result['elimLosses'] or 0) + 1)
+    tournament_boosts.append(result['division']['boost'] or 1)
 
     prelims = requests.post(f"{API_BASE}/rounds/advanced/findMany", json={
         "where": {
             "resultId": result['id'],
             'type': "Prelim",
+            'outcome': "Win",
             'opponentId': {
                 'not': None
             }
@@ -57,15 +65,20 @@ for i, result in enumerate(results):
             }
         }).json()
 
-        op_pwp = opp_result['prelimBallotsWon'] / (opp_result['prelimBallotsWon'] + opp_result['prelimBallotsLost'])
-        delta_pwp = op_pwp - p_wp
+        team_idx.append(i)
+        op_p_wps.append(opp_result['prelimBallotsWon'] / (opp_result['prelimBallotsWon'] + opp_result['prelimBallotsLost']))
 
-        if delta_pwp <= 0 or prelim['outcome'] != "Win":
-            continue
-        rxr += .12 * ((delta_pwp + 0.7)**16 /
-                        (0.5 + (delta_pwp + 0.7)**10))**(1/2)
+# Only the RxR is recomputed, opWpM is taken as stored
+p_wps = np.array(p_wps)
+team_idx = np.array(team_idx, dtype=int)
+round_rxrs = get_round_rxrs(p_wps[team_idx], np.array(op_p_wps, dtype=float),
+                            np.ones(len(team_idx), dtype=bool), np.zeros(len(team_idx), dtype=bool))
+rxrs = np.bincount(team_idx, weights=round_rxrs, minlength=len(results))
+otr_comps = get_otr_comps(p_wps, np.array(break_boosts), np.array(list(map(lambda r: r['opWpM'], results)), dtype=float),
+                          np.array(tournament_boosts), rxrs)
 
-    otrcomp = (p_wp * break_boost * (result['opWpM'] + 0.625) * tournament_boost + rxr) / 3
+for i, (result, otrcomp) in enumerate(zip(results, otr_comps.tolist())):
+    print(f"Updating {i + 1}/{len(results)}")
     # otrcomp2 = (p_wp * get_break_boost(break_boost) * (result['opWpM'] + 0.625) * tournament_boost + rxr) / 3
     res = requests.patch(f"{API_BASE}/results/teams/{result['id']}", json={
         "otrComp": otrcomp
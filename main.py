@@ -1,15 +1,17 @@
-from typing import TypedDict, List
+from typing import TypedDict, List, Mapping
 from shared.helpers import get_tourn_boost
-from pipelines.transformer import TransformedTournamentData, transform_data
+from pipelines.transformer import TransformedTournamentData, DivisionTransformer
 from pipelines.uploader import upload_data, clear
-from scraper.utils.unscraped_entries import get_unscraped_entries
-from scraper.lib.entry import scrape_entry
+from scraper.utils.unscraped_entries import EntryFrontier
+from scraper.lib.entry import iter_entry_batch
 from scraper.lib.entries import scrape_entries
-from scraper.lib.tournament import scrape_tournament
+from scraper.lib.download_data import get_download_data, get_entries_from_download_data
+from scraper.lib.tournament import get_tournament
 from shared.helpers import enum_to_string
 from pipelines.post_upload.index import update_indicies, update_all_indicies
 from pipelines.post_upload.otr import update_otrs, update_all_otrs
 from pipelines.post_upload.stats import update_stats, update_all_stats
+from pipelines.post_upload.retroactive import update_all_scopes
 from pipelines.post_upload.update_search import update_team_index, update_judge_index, update_competitor_index
 from shared.lprint import lprint
 from shared.const import API_BASE
@@ -17,9 +19,9 @@ import traceback
 import datetime
 from bullmq import Worker, Job
 
-from scraper.lib.division import get_division_name
+from scraper.lib.division import get_division_name, DivisionPages
+from scraper.utils.fetch import start_recording, start_replay
 import requests
-import requests_cache
 
 import os
 import time
@@ -27,7 +29,8 @@ import sys
 import asyncio
 import csv
 
-requests_cache.install_cache("tabroom_cache")
+# Number of entry pages fetched at once while scraping a division
+SCRAPING_FAN_OUT = int(os.environ.get('SCRAPING_FAN_OUT', 16))
 
 class ScrapingJobData(TypedDict):
     class Group(TypedDict):
@@ -56,45 +59,72 @@ class ScrapingJobData(TypedDict):
     tabTournId: int
     divisions: List[Division]
 
-async def processTournament(data: ScrapingJobData, id: int | None = None):
+async def processTournament(data: ScrapingJobData, id: int | None = None, offline: bool = False):
     start = time.perf_counter()
     lprint(id, "Info", start, f"Started scraping tournament: {data['group']['nickname']} {data['season']['year']}")
 
+    lprint(id, "Info", start, "Scraping tournament")
+    get_tournament(id, data['tabTournId'])
+    download_data = get_download_data(id, data['tabTournId'])
+    # Schools are shared across divisions, so their IDs are only looked up once per job
+    school_ids: Mapping[str, int] = {}
+
     for i, division in enumerate(data['divisions']):
         lprint(id, "Info", start, f"Started scraping division {i+1}/{len(data['divisions'])}: {enum_to_string(division['classification'])} {division['event']}")
 
-        tournament = scrape_tournament(id, data['tabTournId'])
-        division_name = get_division_name(data['tabTournId'], division['tabEventId'])
-        entries = []
-
-        for entryFragment in scrape_entries(data['tabTournId'], division['tabEventId']):
-            entry = scrape_entry(data['tabTournId'], entryFragment)
-            entries.append(entry)
-
-        unscraped_entries = get_unscraped_entries(entries)
-
-        lprint(id, "Info", start, "Aggregating unscraped entries")
-        while unscraped_entries:
-            for tab_entry_id in unscraped_entries:
-                entries.append(scrape_entry(data['tabTournId'], {
-                    'code': None,
-                    'location': None,
-                    'school': None,
-                    'tab_competitor_ids': [],
-                    'tab_entry_id': tab_entry_id
-                }))
-
-            unscraped_entries = get_unscraped_entries(entries)
-
-        lprint(id, "Info", start, message="Transforming data")
+        # Each division gets its own copy of the memoized snapshot since the transformer mutates it
+        tournament = get_tournament(id, data['tabTournId'])
+        division_pages = DivisionPages(data['tabTournId'], division['tabEventId'])
+        division_name = get_division_name(data['tabTournId'], division['tabEventId'], division_pages)
         boost = division['tournBoost']
         if boost == 1:
             boost = get_tourn_boost(division['firstElimRound'])
-        data: TransformedTournamentData = transform_data(id, data['tabTournId'], division['tabEventId'], data['group']['nickname'], division['event'], tournament, entries, list(map(lambda c: c['geographyName'], division['circuits'])),
-                              data['season']['year'], boost, division['classification'], division_name, enum_to_string(division['firstElimRound']), enum_to_string(division['tocFullBidLevel']), division['event'] == "PublicForum")
+        transformer = DivisionTransformer(id, data['tabTournId'], division['tabEventId'], data['group']['nickname'], division['event'], tournament, list(map(lambda c: c['geographyName'], division['circuits'])),
+                                          data['season']['year'], boost, division['classification'], division_name, enum_to_string(division['firstElimRound']), enum_to_string(division['tocFullBidLevel']), division['event'] == "PublicForum", not offline)
+
+        # Prefer the single JSON export, scraping every entry page only if it doesn't cover the division
+        entries = get_entries_from_download_data(id, download_data, division['tabEventId']) if download_data else None
+        if entries is None:
+            entry_fragments = scrape_entries(data['tabTournId'], division['tabEventId'], division_pages)
+        else:
+            lprint(id, "Info", start, "Built entries from Tabroom's JSON export")
+            entry_fragments = []
+
+        # Entries are transformed as their pages arrive, while opponents they reveal are queued for the next wave
+        frontier = EntryFrontier()
+        frontier.expect(list(map(lambda e: e['tab_entry_id'], entries or entry_fragments)))
+        entry_stream = entries if entries is not None else iter_entry_batch(data['tabTournId'], entry_fragments, SCRAPING_FAN_OUT)
+        entries = None
+
+        lprint(id, "Info", start, message="Scraping and transforming entries")
+        while True:
+            unscraped_entries = []
+            for entry in entry_stream:
+                transformer.add_entry(entry)
+                unscraped_entries += frontier.add([entry])
+
+            if not unscraped_entries:
+                break
+
+            lprint(id, "Info", start, f"Scraping {len(unscraped_entries)} unscraped entries")
+            entry_stream = iter_entry_batch(data['tabTournId'], list(map(lambda tab_entry_id: {
+                'code': None,
+                'location': None,
+                'school': None,
+                'tab_competitor_ids': [],
+                'tab_entry_id': tab_entry_id
+            }, unscraped_entries)), SCRAPING_FAN_OUT)
+
+        lprint(id, "Info", start, message="Transforming data")
+        transformed: TransformedTournamentData = transformer.finalize()
+
+        # Offline runs (replays) stop after transforming, everything past this point talks to the API
+        if offline:
+            lprint(id, "Info", start, "Completed division (offline)")
+            continue
 
         lprint(id, "Info", start, message="Uploading data")
-        upload_data(id, data)
+        upload_data(id, transformed, school_ids=school_ids)
         lprint(id, "Info", start, "Updating OTRs")
         update_otrs(division['tabEventId'])
         lprint(id, "Info", start, "Updating indicies")
@@ -114,17 +144,11 @@ async def processTournament(data: ScrapingJobData, id: int | None = None):
 async def processRetroactiveUpdate(id: int | None = None):
     start = time.perf_counter()
 
-    lprint(id, "Info", start, f"Updating Indicies...")
-
-    update_all_indicies(id)
-
-    lprint(id, "Info", start, f"Updating OTRs...")
-
-    update_all_otrs(id)
+    lprint(id, "Info", start, f"Updating OTRs, indicies and stats by scope...")
 
-    lprint(id, "Info", start, f"Updating stats...")
+    update_all_scopes(id)
 
-    update_all_stats(id)
+    lprint(id, "Info", start, f"Completed retroactive update")
 
 async def processScrapingJob(job: Job, token: str):
     try:
@@ -142,7 +166,7 @@ async def processRetroactiveUpdateJob(job: Job, token: str):
         lprint(job.id, "Error", message=traceback.format_exc())
         raise Exception()
 
-async def processScrapingJobCSV(path: str):
+async def processScrapingJobCSV(path: str, offline: bool = False):
     DATA = []
 
     with open(path, "r") as f:
@@ -175,7 +199,7 @@ async def processScrapingJobCSV(path: str):
                     'tocFullBidLevel': None if tourn[8] == "None" else tourn[8],
                     'tournBoost': float(tourn[9]),
                 }]
-            })
+            }, offline=offline)
         except Exception as e:
             lprint(None, "Error", message=traceback.format_exc())
             continue
@@ -188,9 +212,21 @@ async def startWorker():
     while True:
         await asyncio.sleep(1)
 
-if len(sys.argv) > 1 and '--file' in sys.argv and sys.argv.index('--file') > 0 and sys.argv.index('--file') < len(sys.argv) - 1:
-    asyncio.run(processScrapingJobCSV(sys.argv[sys.argv.index('--file') + 1]))
-elif '--retroactiveUpdate' in sys.argv:
-    asyncio.run(processRetroactiveUpdate())
-else:
-    asyncio.run(startWorker())
+# Scope processes of the retroactive update are spawned, and re-import this module without running the worker
+if __name__ == "__main__":
+    # Record every fetched page with `--record <archive>`, or re-run fully offline from one with `--replay <archive>`
+    record_path = sys.argv[sys.argv.index('--record') + 1] if '--record' in sys.argv and sys.argv.index('--record') < len(sys.argv) - 1 else None
+    replay_path = sys.argv[sys.argv.index('--replay') + 1] if '--replay' in sys.argv and sys.argv.index('--replay') < len(sys.argv) - 1 else None
+
+    if replay_path:
+        start_replay(replay_path)
+
+    if len(sys.argv) > 1 and '--file' in sys.argv and sys.argv.index('--file') > 0 and sys.argv.index('--file') < len(sys.argv) - 1:
+        recording = start_recording() if record_path else None
+        asyncio.run(processScrapingJobCSV(sys.argv[sys.argv.index('--file') + 1], offline=replay_path is not None))
+        if recording:
+            recording.save(record_path)
+    elif '--retroactiveUpdate' in sys.argv:
+        asyncio.run(processRetroactiveUpdate())
+    else:
+        asyncio.run(startWorker())
@@ -1,13 +1,20 @@
 import time
 import math
-import statistics
-import requests
+from functools import lru_cache
+from typing import List, Mapping, Tuple, TypedDict
 from shared.const import API_BASE
 from shared.lprint import lprint
+from pipelines.utils.robust_stats import mean, stdev
 
-from requests_cache import DO_NOT_CACHE, CachedSession
-requests = CachedSession(expire_after=DO_NOT_CACHE)
-cached_requests = CachedSession()
+from shared.api import get_api_session
+from .rankings import upsert_rankings
+requests = get_api_session()
+
+"""Maximum number of rounds or records updated by a single request"""
+INDEX_BATCH_SIZE = 500
+
+"""A round or record's division ID, result ID and ID, which it's written under as a nested write on its division"""
+RowKey = Tuple[int, int, int]
 
 # Update all indicies given a tab tourn id to get judges from
 
@@ -37,8 +44,19 @@ def get_index_deflator(num_rounds: int, initial_index: float) -> float:
 
     return rnd_deflator*idx_deflator
 
-def update_scoped_index(judge_id: str, circuit_id: int, season_id: int) -> float:
-    speaking_aggregation = cached_requests.post(f'{API_BASE}/speaking/rounds/advanced/aggregate', json={
+@lru_cache(maxsize=None)
+def get_scope_avg(circuit_id: int, season_id: int) -> float:
+    """Gets the average speaker points given in a (circuit, season) scope, fetched once per scope per process.
+
+    Args:
+        circuit_id (int): The circuit ID.
+        season_id (int): The season ID.
+
+    Returns:
+        float: The average points, or 28.5 if the scope has no speaks.
+    """
+
+    speaking_aggregation = requests.post(f'{API_BASE}/speaking/rounds/advanced/aggregate', json={
         "where": {
             "round": {
                 "result": {
@@ -65,23 +83,58 @@ def update_scoped_index(judge_id: str, circuit_id: int, season_id: int) -> float
         print(f"No speaking aggregation for scope (circuit, season) = ({circuit_id}, {season_id}), defaulting to 28.5.")
         scope_avg = 28.5
 
-    records = requests.post(f'{API_BASE}/judge-records/advanced/findMany', json={
+    return scope_avg
+
+class JudgeIndex(TypedDict):
+    ranking: dict
+    round_e_wps: Mapping[RowKey, float | None]
+    record_screw_factors: Mapping[RowKey, float | None]
+
+
+class JudgeRowWrites(TypedDict):
+    round_e_wps: Mapping[RowKey, float | None]
+    record_screw_factors: Mapping[RowKey, float | None]
+
+
+def _get_records_query(circuit_id: int, season_id: int, judge_id: str | None = None) -> dict:
+    """Builds the query of the judge records in a (circuit, season) scope, with everything an index is computed from.
+
+    Args:
+        circuit_id (int): The circuit ID.
+        season_id (int): The season ID.
+        judge_id (str | None, optional): The judge to query. Defaults to None, in which case every judge's records are
+        queried.
+
+    Returns:
+        dict: The `findMany` body.
+    """
+
+    result_where = {
+        'division': {
+            'tournament': {
+                'seasonId': season_id
+            },
+            'circuits': {
+                'some': {
+                    'id': circuit_id
+                }
+            }
+        }
+    }
+
+    if judge_id is not None:
+        result_where['judgeId'] = judge_id
+
+    return {
         'where': {
+            'result': result_where,
+        },
+        'include': {
             'result': {
-                'judgeId': judge_id,
-                'division': {
-                    'tournament': {
-                        'seasonId': season_id
-                    },
-                    'circuits': {
-                        'some': {
-                            'id': circuit_id
-                        }
-                    }
+                'select': {
+                    'divisionId': True
                 }
             },
-        },
-        'include': {
             'teams': {
                 'include': {
                     'rankings': {
@@ -99,11 +152,28 @@ def update_scoped_index(judge_id: str, circuit_id: int, season_id: int) -> float
                         "where": {
                             "judgeId": judge_id
                         }
-                    }
+                    } if judge_id is not None else True
                 }
             }
         }
-    }).json()
+    }
+
+def get_judge_index(judge_id: str, records: List[dict], scope_avg: float) -> JudgeIndex | None:
+    """Computes a judge's index and ranking in a scope from their records, along with the expected win probability of
+    each round they judged and the screw factor of each record.
+
+    Args:
+        judge_id (str): The judge's ID.
+        records (List[dict]): The judge's records in the scope, see `_get_records_query`.
+        scope_avg (float): The average speaker points given in the scope.
+
+    Returns:
+        JudgeIndex | None: The judge's ranking and the updates to their rounds and records, or None if they have no
+        records.
+    """
+
+    round_e_wps: Mapping[RowKey, float | None] = {}
+    record_screw_factors: Mapping[RowKey, float | None] = {}
 
     screw_sum = 0
     squirrel_sum = 0
@@ -156,7 +226,7 @@ def update_scoped_index(judge_id: str, circuit_id: int, season_id: int) -> float
                 # print(prelims, elims)
 
                 if round['speaking']:
-                    for speak in round['speaking']:
+                    for speak in filter(lambda speak: speak['judgeId'] == judge_id, round['speaking']):
                         points = speak['points']
                         speaks.append(points)
                         if round['side'] == "Pro":
@@ -169,8 +239,8 @@ def update_scoped_index(judge_id: str, circuit_id: int, season_id: int) -> float
                             team_2_speaks.append(points)
 
             if len(team_1_speaks) and len(team_2_speaks):
-                team_1_speaks = statistics.mean(team_1_speaks)
-                team_2_speaks = statistics.mean(team_2_speaks)
+                team_1_speaks = mean(team_1_speaks)
+                team_2_speaks = mean(team_2_speaks)
 
                 if team_1_speaks > team_2_speaks and record['winnerId'] == team_2:
                     low_point_wins += 1
@@ -187,9 +257,11 @@ def update_scoped_index(judge_id: str, circuit_id: int, season_id: int) -> float
             team_2_otr = record['teams'][1]['rankings'][0]['otr']
             team_2_e_wp = None
 
+            otr_delta = abs(team_1_otr - team_2_otr)
+            avg_otr = (team_1_otr + team_2_otr) / 2
+
             # Calculate & Assign EWP
-            wp_high = (1.2 * abs(team_1_otr - team_2_otr))**2 / \
-                statistics.mean([team_1_otr, team_2_otr]) + 0.5
+            wp_high = (1.2 * otr_delta)**2 / avg_otr + 0.5
             if wp_high > 0.99:
                 wp_high = 0.99
             wp_low = 1 - wp_high
@@ -204,9 +276,6 @@ def update_scoped_index(judge_id: str, circuit_id: int, season_id: int) -> float
             # Record screw factor (if any) (only given in prelim rounds with incorrect result and otr delta of gte. 0.5)
             screw_factor = 0
 
-            otr_delta = abs(team_1_otr - team_2_otr)
-            avg_otr = statistics.mean([team_1_otr, team_2_otr])
-
             wpHi = ((1.47 * pow(otr_delta, 0.8094)) * (1 /
                     (4 * avg_otr))) / (1 + pow(2, -(10 - 6))) + 0.5
             # print("WP Hi " + str(wpHi))
@@ -228,24 +297,10 @@ def update_scoped_index(judge_id: str, circuit_id: int, season_id: int) -> float
                     #       team_2, team_1_e_wp, team_2_e_wp)
                     # input("Err: ")
 
-                res = requests.post(f'{API_BASE}/rounds/advanced/update', json={
-                    'where': {
-                        'id': round['id']
-                    },
-                    'data': {
-                        'expectedWinProbability': e_wp,
-                    }
-                })
+                round_e_wps[(round['result']['divisionId'], round['resultId'], round['id'])] = e_wp
 
             # Update Judge Record with screw data
-            res = requests.post(f'{API_BASE}/judge-records/advanced/update', json={
-                'where': {
-                    'id': record['id']
-                },
-                'data': {
-                    'screwFactor': screw_factor if round['type'] == "Prelim" else None
-                }
-            })
+            record_screw_factors[(record['result']['divisionId'], record['resultId'], record['id'])] = screw_factor if round['type'] == "Prelim" else None
 
             # Update counts
             # Any nonzero screw factor counts as one screw
@@ -307,9 +362,10 @@ def update_scoped_index(judge_id: str, circuit_id: int, season_id: int) -> float
             #     "Index computation failed on round lookup for record " + str(record['id']))
             # print(e.with_traceback(None))
 
+
     # Calculate and update index
     if not len(records):
-        return print(f"No records found for judge {judge_id} on (circuit, season) = ({circuit_id}, {season_id})")
+        return None
     index = 10 - (13 * squirrel_sum + 7 * screw_sum)/len(records)
     # if index < 0:
     #     index = 0
@@ -317,24 +373,17 @@ def update_scoped_index(judge_id: str, circuit_id: int, season_id: int) -> float
     #     index = 10
 
     # Update indicies
-    print(f"{len(records)} {index}")
     index = get_index_deflator(len(records), index) * index
-    print(index)
 
     # print(screw_sum, squirrel_sum, len(records), index)
 
-    res = requests.post(f'{API_BASE}/rankings/judges/advanced/upsert', json={
-        'where': {
-            'judgeId_circuitId_seasonId': {
-                'judgeId': judge_id,
-                'circuitId': circuit_id,
-                'seasonId': season_id
-            },
-        },
-        'create': {
-            'seasonId': season_id,
-            'judgeId': judge_id,
-            'circuitId': circuit_id,
+    avg_speaks = mean(speaks)
+    std_speaks = stdev(speaks)
+    avg_pro_speaks = mean(pro_speaks)
+    avg_con_speaks = mean(con_speaks)
+
+    return {
+        'ranking': {
             'index': index,
             'tourns': len(tourns),
             'rounds': rounds,
@@ -345,39 +394,196 @@ def update_scoped_index(judge_id: str, circuit_id: int, season_id: int) -> float
             'screws': screw_sum,
             'screwPct': screw_sum/len(records),
             'squirrelAndScrewPct': (squirrel_sum + screw_sum)/len(records),
-            'avgSpks': statistics.mean(speaks) if len(speaks) else None,
-            'stdSpks': statistics.stdev(speaks) if len(speaks) > 1 else None,
+            'avgSpks': avg_speaks,
+            'stdSpks': std_speaks,
             'pctPro': pro_ballots/(pro_ballots + con_ballots) if pro_ballots + con_ballots != 0 else None,
             'lowPointWins': low_point_wins,
             'lowPointWinPct': low_point_wins/len(records),
-            'avgProSpks': statistics.mean(pro_speaks) if len(pro_speaks) else None,
-            'avgConSpks': statistics.mean(con_speaks) if len(con_speaks) else None,
-            'saa': (statistics.mean(speaks) - scope_avg) if len(speaks) and scope_avg else None
+            'avgProSpks': avg_pro_speaks,
+            'avgConSpks': avg_con_speaks,
+            'saa': (avg_speaks - scope_avg) if len(speaks) and scope_avg else None
         },
-        'update': {
-            'index': index,
-            'tourns': len(tourns),
-            'rounds': rounds,
-            'prelims': prelims,
-            'elims': elims,
-            'squirrels': squirrel_sum,
-            'squirrelPct': squirrel_sum/len(records),
-            'screws': screw_sum,
-            'screwPct': screw_sum/len(records),
-            'squirrelAndScrewPct': (squirrel_sum + screw_sum)/len(records),
-            'avgSpks': statistics.mean(speaks) if len(speaks) else None,
-            'stdSpks': statistics.stdev(speaks) if len(speaks) > 1 else None,
-            'pctPro': pro_ballots/(pro_ballots + con_ballots) if pro_ballots + con_ballots != 0 else None,
-            'lowPointWins': low_point_wins,
-            'lowPointWinPct': low_point_wins/len(records),
-            'avgProSpks': statistics.mean(pro_speaks) if len(pro_speaks) else None,
-            'avgConSpks': statistics.mean(con_speaks) if len(con_speaks) else None,
-            'saa': (statistics.mean(speaks) - scope_avg) if len(speaks) and scope_avg else None
-        }
+        'round_e_wps': round_e_wps,
+        'record_screw_factors': record_screw_factors
+    }
+
+def _collect_judge_rows(judge_indices: Mapping[str, JudgeIndex], row_writes: JudgeRowWrites) -> JudgeRowWrites:
+    """Adds the rounds' and records' fields of judge indices to `row_writes`.
+
+    Args:
+        judge_indices (Mapping[str, JudgeIndex]): The index of each judge.
+        row_writes (JudgeRowWrites): The fields collected so far.
+
+    Returns:
+        JudgeRowWrites: `row_writes`.
+    """
+
+    for judge_index in judge_indices.values():
+        row_writes['round_e_wps'].update(judge_index['round_e_wps'])
+        row_writes['record_screw_factors'].update(judge_index['record_screw_factors'])
+
+    return row_writes
+
+def _update_division_rows(job_id: int | None, relation: str, child: str, field: str, values: Mapping[RowKey, float | None]) -> int:
+    """Sets a field on many rounds or records, with each batch a single nested write of the rows' updates on their
+    division, see `_update_nested` in the uploader.
+
+    Args:
+        job_id (int | None): The job ID, for logging.
+        relation (str): The division's relation the rows' results are under, e.g. `teamResults`.
+        child (str): The results' relation the rows are under, e.g. `rounds`.
+        field (str): The field to set.
+        values (Mapping[RowKey, float | None]): The value of each row.
+
+    Returns:
+        int: The number of rows that couldn't be updated.
+    """
+
+    division_2_results: Mapping[int, Mapping[int, List[dict]]] = {}
+    for (division_id, result_id, id), value in values.items():
+        division_2_results.setdefault(division_id, {}).setdefault(result_id, []).append({
+            'where': {
+                'id': id
+            },
+            'data': {
+                field: value
+            }
+        })
+
+    # Batches of (division ID, result updates, number of rows), never splitting a result's rows
+    batches: List[Tuple[int, List[dict], int]] = []
+    for division_id, result_2_rows in division_2_results.items():
+        result_updates = []
+        num_rows = 0
+        for result_id, rows in result_2_rows.items():
+            if result_updates and num_rows + len(rows) > INDEX_BATCH_SIZE:
+                batches.append((division_id, result_updates, num_rows))
+                result_updates = []
+                num_rows = 0
+            result_updates.append({
+                'where': {
+                    'id': result_id
+                },
+                'data': {
+                    child: {
+                        'update': rows
+                    }
+                }
+            })
+            num_rows += len(rows)
+        batches.append((division_id, result_updates, num_rows))
+
+    def update_batch(batch: Tuple[int, List[dict], int]) -> int:
+        res = requests.post(f'{API_BASE}/tournaments/divisions/advanced/update', json={
+            'where': {
+                'id': batch[0]
+            },
+            'data': {
+                relation: {
+                    'update': batch[1]
+                }
+            },
+            'select': {
+                'id': True
+            }
+        })
+
+        if res.status_code != 200:
+            lprint(job_id, "Error", message=f"Could not update {batch[2]} {child} of division {batch[0]}. {res.text}")
+            return batch[2]
+
+        return 0
+
+    return sum(requests.map(update_batch, batches))
+
+def write_judge_rows(job_id: int | None, row_writes: JudgeRowWrites) -> int:
+    """Writes the rounds' expected win probabilities and the records' screw factors of judge indices, in batches.
+
+    Args:
+        job_id (int | None): The job ID, for logging.
+        row_writes (JudgeRowWrites): The fields of each round and record.
+
+    Returns:
+        int: The number of rounds and records that couldn't be updated.
+    """
+
+    return _update_division_rows(job_id, 'teamResults', 'rounds', 'expectedWinProbability', row_writes['round_e_wps']) + \
+        _update_division_rows(job_id, 'judgeResults', 'records', 'screwFactor', row_writes['record_screw_factors'])
+
+def write_judge_indices(job_id: int | None, circuit_id: int, season_id: int, judge_indices: Mapping[str, JudgeIndex], row_writes: JudgeRowWrites | None = None) -> int:
+    """Writes computed judge indices: their rankings, their rounds' expected win probabilities and their records' screw
+    factors, all in batches.
+
+    Args:
+        job_id (int | None): The job ID, for logging.
+        circuit_id (int): The circuit ID.
+        season_id (int): The season ID.
+        judge_indices (Mapping[str, JudgeIndex]): The index of each judge.
+        row_writes (JudgeRowWrites | None, optional): Collects the rounds' and records' fields instead of writing them,
+        for callers that write rounds shared between scopes once. Defaults to None.
+
+    Returns:
+        int: The number of rankings, rounds and records that couldn't be written.
+    """
+
+    # Rounds judged by a panel are shared between its judges' records
+    num_failed = 0
+    if row_writes is not None:
+        _collect_judge_rows(judge_indices, row_writes)
+    else:
+        num_failed += write_judge_rows(job_id, _collect_judge_rows(judge_indices, {'round_e_wps': {}, 'record_screw_factors': {}}))
+
+    return num_failed + upsert_rankings(job_id, circuit_id, season_id, 'judgeRankings', 'judgeId', {
+        judge_id: judge_index['ranking'] for judge_id, judge_index in judge_indices.items()
     })
 
-    if res.status_code != 200:
-        lprint(None, "Judge Ranking Error", None, res.text)
+def update_scoped_index(judge_id: str, circuit_id: int, season_id: int) -> float:
+    scope_avg = get_scope_avg(circuit_id, season_id)
+
+    records = requests.post(f'{API_BASE}/judge-records/advanced/findMany', json=_get_records_query(circuit_id, season_id, judge_id)).json()
+
+    judge_index = get_judge_index(judge_id, records, scope_avg)
+    if judge_index is None:
+        return print(f"No records found for judge {judge_id} on (circuit, season) = ({circuit_id}, {season_id})")
+
+    write_judge_indices(None, circuit_id, season_id, {judge_id: judge_index})
+
+def update_scoped_indicies(job_id: int | None, circuit_id: int, season_id: int, judge_ids: List[str] | None = None, row_writes: JudgeRowWrites | None = None) -> int:
+    """Updates the indices of every judge in a (circuit, season) scope from a single query of the scope's records.
+
+    Args:
+        job_id (int | None): The job ID, for logging.
+        circuit_id (int): The circuit ID.
+        season_id (int): The season ID.
+        judge_ids (List[str] | None, optional): The judges to update. Defaults to None, in which case every judge with
+        records in the scope is updated.
+        row_writes (JudgeRowWrites | None, optional): Collects the rounds' and records' fields instead of writing them,
+        see `write_judge_indices`. Defaults to None.
+
+    Returns:
+        int: The number of judges updated.
+    """
+
+    scope_avg = get_scope_avg(circuit_id, season_id)
+    query = _get_records_query(circuit_id, season_id)
+    if judge_ids is not None:
+        query['where']['result']['judgeId'] = {
+            'in': judge_ids
+        }
+
+    judge_2_records: Mapping[str, List[dict]] = {}
+    for record in requests.post(f'{API_BASE}/judge-records/advanced/findMany', json=query).json():
+        judge_2_records.setdefault(record['judgeId'], []).append(record)
+
+    judge_indices = {
+        judge_id: get_judge_index(judge_id, records, scope_avg) for judge_id, records in judge_2_records.items()
+    }
+    num_failed = write_judge_indices(job_id, circuit_id, season_id, judge_indices, row_writes)
+    if num_failed:
+        lprint(job_id, "Warning", message=f"Could not write {num_failed} judge rankings, rounds and records for (circuit, season) = ({circuit_id}, {season_id})")
+
+    return len(judge_indices)
+
 
 def update_indicies_for_judge(judge_id: str):
     results = requests.post(f"{API_BASE}/results/judges/advanced/findMany", json={
@@ -419,11 +625,13 @@ def update_indicies_for_judge(judge_id: str):
             update_scoped_index(judge_id, circuit, season)
 
 def update_all_indicies(job_id: int | None = None):
-    judges = requests.get(f"{API_BASE}/judges").json()
+    get_scope_avg.cache_clear()
+    circuits = requests.get(f"{API_BASE}/circuits?expand=seasons").json()
 
-    for i, judge in enumerate(judges):
-        lprint(job_id, "Info", message=f"Updating {i+1}/{len(judges)}")
-        update_indicies_for_judge(judge['id'])
+    for circuit in circuits:
+        for season in circuit['seasons']:
+            lprint(job_id, "Info", message=f"Updating (circuit, season) = ({circuit['id']}, {season['id']})")
+            update_scoped_indicies(job_id, circuit['id'], season['id'])
 
 def update_indicies(tab_event_id: int):
     """_summary_
@@ -476,12 +684,10 @@ def update_indicies(tab_event_id: int):
 
     print(f"Found {len(judges)} who judged at {tab_event_id}")
 
-    for circuit in circuits:
-        print(f"Circuit {circuit}")
+    get_scope_avg.cache_clear()
 
-        for i, judge in enumerate(judges):
-            print(f"{i+1}/{len(judges)} {judge['id']}")
-            update_scoped_index(judge['id'], circuit, season)
+    for circuit in circuits:
+        print(f"Circuit {circuit}: updated {update_scoped_indicies(None, circuit, season, list(map(lambda judge: judge['id'], judges)))} judges")
 
 if __name__ == "__main__":
     # tourns = requests.get(
@@ -1,10 +1,10 @@
 import math
-import time
-import requests
+from typing import List, Mapping
 from shared.const import API_BASE
 from shared.lprint import lprint
-from requests_cache import DO_NOT_CACHE, CachedSession
-requests = CachedSession(expire_after=DO_NOT_CACHE)
+from shared.api import get_api_session
+from .rankings import upsert_rankings
+requests = get_api_session()
 
 def get_otr_deflator(numTourns: int) -> float:
     """Gets the amount to deflate a raw OTR average by given the number of tournaments attended.
@@ -29,62 +29,107 @@ def get_otr_deflator(numTourns: int) -> float:
 
 #     return round(F/(1+math.pow(math.e, -B*numElimRoundsWon + C)) + D, 2)
 
-def update_scoped_otr(team_id: str, circuit_id: int, season_id: int):
-    results = requests.post(f'{API_BASE}/results/teams/advanced/findMany', json={
-        'where': {
-            'teamId': team_id,
-            'division': {
-                'circuits': {
-                    'some': {
-                        'id': circuit_id
-                    }
-                },
-                'tournament': {
-                    'seasonId': season_id
+def get_scoped_otrs(circuit_id: int, season_id: int, team_ids: List[str] | None = None) -> Mapping[str, float]:
+    """Computes the OTR of every team in a (circuit, season) scope from a single query of their results' OTR comps.
+
+    Args:
+        circuit_id (int): The circuit ID.
+        season_id (int): The season ID.
+        team_ids (List[str] | None, optional): The teams to compute. Defaults to None, in which case every team with
+        results in the scope is computed.
+
+    Returns:
+        Mapping[str, float]: The OTR of each team, the deflated average of its results' OTR comps. Teams without comps
+        are left out.
+    """
+
+    where = {
+        'division': {
+            'circuits': {
+                'some': {
+                    'id': circuit_id
                 }
             },
+            'tournament': {
+                'seasonId': season_id
+            }
         },
+    }
+
+    if team_ids is not None:
+        where['teamId'] = {
+            'in': team_ids
+        }
+
+    results = requests.post(f'{API_BASE}/results/teams/advanced/findMany', json={
+        'where': where,
         'select': {
-            'otrComp': True,
-            'id': True
+            'teamId': True,
+            'otrComp': True
         }
     }).json()
 
-    if not len(results):
-        return print(f"No results for team {team_id} on (circuit, season) = ({circuit_id}, {season_id})")
+    team_2_otr_comps: Mapping[str, List[float]] = {}
+    for result in results:
+        # Results without any valid opponents don't have an OTR comp
+        if result['otrComp'] is None:
+            continue
+        team_2_otr_comps.setdefault(result['teamId'], []).append(result['otrComp'])
+
+    return {
+        team_id: get_otr_deflator(len(otr_comps)) * sum(otr_comps)/len(otr_comps)
+        for team_id, otr_comps in team_2_otr_comps.items()
+    }
+
+def update_scoped_otrs(job_id: int | None, circuit_id: int, season_id: int, team_ids: List[str] | None = None) -> int:
+    """Recomputes the OTRs of a (circuit, season) scope locally and writes back the ones that changed, as batched
+    upserts of the scope's rankings, so an unchanged scope costs two queries.
+
+    Args:
+        job_id (int | None): The job ID, for logging.
+        circuit_id (int): The circuit ID.
+        season_id (int): The season ID.
+        team_ids (List[str] | None, optional): The teams to update. Defaults to None, in which case every team with
+        results in the scope is updated.
+
+    Returns:
+        int: The number of rankings created or updated. Rankings whose request failed are logged and left out.
+    """
+
+    team_2_otr = get_scoped_otrs(circuit_id, season_id, team_ids)
+
+    if not len(team_2_otr):
+        print(f"No results for (circuit, season) = ({circuit_id}, {season_id})")
+        return 0
 
-    otrs = list(map(lambda r: r['otrComp'], results))
-    updated_otr = get_otr_deflator(len(otrs)) * sum(otrs)/len(otrs)
-    rankings_res = requests.post(f'{API_BASE}/rankings/teams/advanced/upsert', json={
+    rankings = requests.post(f'{API_BASE}/rankings/teams/advanced/findMany', json={
         'where': {
-            'teamId_circuitId_seasonId': {
-                'teamId': team_id,
-                'seasonId': season_id,
-                'circuitId': circuit_id
+            'circuitId': circuit_id,
+            'seasonId': season_id,
+            'teamId': {
+                'in': list(team_2_otr.keys())
             }
         },
-        'create': {
-            'team': {
-                'connect': {
-                    'id': team_id
-                }
-            },
-            'season': {
-                'connect': {
-                    'id': season_id
-                }
-            },
-            'circuit': {
-                'connect': {
-                    'id': circuit_id
-                }
-            },
-            'otr': updated_otr
-        },
-        'update': {
-            'otr': updated_otr
+        'select': {
+            'teamId': True,
+            'otr': True
         }
-    })
+    }).json()
+    team_2_stored_otr = {ranking['teamId']: ranking['otr'] for ranking in rankings}
+
+    updates = {
+        team_id: {'otr': otr} for team_id, otr in team_2_otr.items()
+        if team_2_stored_otr.get(team_id) is None or not math.isclose(team_2_stored_otr[team_id], otr)
+    }
+
+    num_failed = upsert_rankings(job_id, circuit_id, season_id, 'teamRankings', 'teamId', updates)
+    if num_failed:
+        lprint(job_id, "Warning", message=f"Could not write {num_failed} rankings for (circuit, season) = ({circuit_id}, {season_id})")
+
+    return len(updates) - num_failed
+
+def update_scoped_otr(team_id: str, circuit_id: int, season_id: int):
+    update_scoped_otrs(None, circuit_id, season_id, [team_id])
 
 def update_otrs_for_team(team_id: str):
     results = requests.post(f"{API_BASE}/results/teams/advanced/findMany", json={
@@ -124,15 +169,15 @@ def update_otrs_for_team(team_id: str):
     for season in seasons:
         for circuit in circuits:
             print("Updating", circuit, season)
-            update_scoped_otr(team_id, circuit, season)
+            update_scoped_otrs(None, circuit, season, [team_id])
 
 def update_all_otrs(job_id: int | None = None):
-    teams = requests.get(f"{API_BASE}/teams").json()
+    circuits = requests.get(f"{API_BASE}/circuits?expand=seasons").json()
 
-    for i, team in enumerate(teams):
-        lprint(job_id if i % 250 == 0 else None, "Info", message=f"Updating {i+1}/{len(teams)}")
-        update_otrs_for_team(team['id'])
-        time.sleep(0.5)
+    for circuit in circuits:
+        for season in circuit['seasons']:
+            lprint(job_id, "Info", message=f"Updating (circuit, season) = ({circuit['id']}, {season['id']})")
+            update_scoped_otrs(job_id, circuit['id'], season['id'])
 
 def update_otrs(tab_event_id: int) -> None:
     """Updates all OTRs for all entries in an event (tab_event_id).
@@ -176,10 +221,7 @@ def update_otrs(tab_event_id: int) -> None:
     teams = list(map(lambda r: r['teamId'], event['teamResults']))
 
     for circuit in circuits:
-        print(f"Circuit {circuit}")
-        for i, team in enumerate(teams):
-            print(f"{i+1}/{len(teams)} {team}")
-            update_scoped_otr(team, circuit, season)
+        print(f"Circuit {circuit}: updated {update_scoped_otrs(None, circuit, season, teams)} rankings")
 
 if __name__ == "__main__":
     update_otrs_for_team("dfd0b582a4ef75895f07cb21")
@@ -0,0 +1,70 @@
+from typing import List, Mapping
+from shared.const import API_BASE
+from shared.lprint import lprint
+from shared.api import get_api_session
+requests = get_api_session()
+
+"""Maximum number of rankings written by a single request"""
+RANKING_BATCH_SIZE = 500
+
+
+def upsert_rankings(job_id: int | None, circuit_id: int, season_id: int, relation: str, key: str, updates: Mapping[str, dict], creates: Mapping[str, dict] | None = None) -> int:
+    """Creates or updates the rankings of a (circuit, season) scope in batches, each a single nested write of the
+    rankings' upserts on the circuit.
+
+    Args:
+        job_id (int | None): The job ID, for logging.
+        circuit_id (int): The circuit ID.
+        season_id (int): The season ID.
+        relation (str): The circuit's relation the rankings are under, `teamRankings` or `judgeRankings`.
+        key (str): The field of the ranked team or judge, `teamId` or `judgeId`.
+        updates (Mapping[str, dict]): The fields to set on each team or judge's ranking.
+        creates (Mapping[str, dict] | None, optional): Extra fields of the rankings that don't exist yet. Defaults to
+        None.
+
+    Returns:
+        int: The number of rankings that couldn't be written.
+    """
+
+    upserts = [
+        {
+            'where': {
+                f'{key}_circuitId_seasonId': {
+                    key: id,
+                    'circuitId': circuit_id,
+                    'seasonId': season_id
+                }
+            },
+            'create': {
+                key: id,
+                'seasonId': season_id,
+                **data,
+                **(creates or {}).get(id, {})
+            },
+            'update': data
+        }
+        for id, data in updates.items()
+    ]
+
+    def upsert_batch(batch: List[dict]) -> int:
+        res = requests.post(f'{API_BASE}/circuits/advanced/update', json={
+            'where': {
+                'id': circuit_id
+            },
+            'data': {
+                relation: {
+                    'upsert': batch
+                }
+            },
+            'select': {
+                'id': True
+            }
+        })
+
+        if res.status_code != 200:
+            lprint(job_id, "Error", message=f"Could not write {len(batch)} {relation} for (circuit, season) = ({circuit_id}, {season_id}). {res.text}")
+            return len(batch)
+
+        return 0
+
+    return sum(requests.map(upsert_batch, [upserts[i:i + RANKING_BATCH_SIZE] for i in range(0, len(upserts), RANKING_BATCH_SIZE)]))
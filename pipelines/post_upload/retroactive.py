@@ -0,0 +1,117 @@
+import os
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, List, Mapping, Tuple
+from shared.const import API_BASE
+from shared.lprint import lprint
+from shared.api import get_api_session, API_MAX_WORKERS
+from .otr import update_scoped_otrs
+from .index import JudgeRowWrites, update_scoped_indicies, write_judge_rows
+from .stats import update_scoped_stats
+requests = get_api_session()
+
+"""Number of (circuit, season) scopes updated at once, overridable with the `RETROACTIVE_PROCESSES` environment variable"""
+RETROACTIVE_PROCESSES = int(os.environ.get('RETROACTIVE_PROCESSES', 4))
+
+
+def update_scope_indices(job_id: int | None, circuit_id: int, season_id: int) -> JudgeRowWrites:
+    """Updates the OTRs and judge indices of a (circuit, season) scope. OTRs go first, since judge indices (and the
+    rounds' expected win probabilities) are computed from them.
+
+    Args:
+        job_id (int | None): The job ID, for logging.
+        circuit_id (int): The circuit ID.
+        season_id (int): The season ID.
+
+    Returns:
+        JudgeRowWrites: The scope's rounds' expected win probabilities and records' screw factors, left unwritten since
+        a division's rounds and records are shared by every circuit it's in.
+    """
+
+    row_writes: JudgeRowWrites = {'round_e_wps': {}, 'record_screw_factors': {}}
+    update_scoped_otrs(job_id, circuit_id, season_id)
+    update_scoped_indicies(job_id, circuit_id, season_id, row_writes=row_writes)
+
+    return row_writes
+
+
+def update_scope_stats(job_id: int | None, circuit_id: int, season_id: int) -> None:
+    """Updates the team stats of a (circuit, season) scope, once its rounds' expected win probabilities are written.
+
+    Args:
+        job_id (int | None): The job ID, for logging.
+        circuit_id (int): The circuit ID.
+        season_id (int): The season ID.
+    """
+
+    update_scoped_stats(job_id, season_id, circuit_id)
+
+
+def _init_process(max_workers: int) -> None:
+    """Rebuilds the state a spawned scope process doesn't inherit from the worker: its API session, limited to its share
+    of the worker's concurrent requests.
+
+    Args:
+        max_workers (int): The maximum number of requests the process keeps in flight.
+    """
+
+    get_api_session().max_workers = max_workers
+
+
+def _map_scopes(job_id: int | None, executor: ProcessPoolExecutor, fn: Callable, scopes: List[Tuple[int, int]], step: str) -> Mapping[Tuple[int, int], object]:
+    """Runs a step of the update on every scope in the process pool, logging each scope's outcome.
+
+    Args:
+        job_id (int | None): The job ID, for logging.
+        executor (ProcessPoolExecutor): The process pool.
+        fn (Callable): The step, called with the job ID and a scope's circuit and season IDs.
+        scopes (List[Tuple[int, int]]): The (circuit, season) scopes.
+        step (str): The step's name, for logging.
+
+    Returns:
+        Mapping[Tuple[int, int], object]: The return value of the step for each scope that didn't fail.
+    """
+
+    futures = {executor.submit(fn, job_id, circuit_id, season_id): (circuit_id, season_id) for circuit_id, season_id in scopes}
+
+    results = {}
+    for i, future in enumerate(as_completed(futures)):
+        circuit_id, season_id = futures[future]
+
+        try:
+            results[(circuit_id, season_id)] = future.result()
+            lprint(job_id, "Info", message=f"Updated {step} of (circuit, season) = ({circuit_id}, {season_id}) ({i+1}/{len(scopes)})")
+        except Exception:
+            lprint(job_id, "Error", message=f"Failed updating {step} of (circuit, season) = ({circuit_id}, {season_id})\n{traceback.format_exc()}")
+
+    return results
+
+
+def update_all_scopes(job_id: int | None = None, processes: int = RETROACTIVE_PROCESSES) -> None:
+    """Retroactively updates the OTRs, judge indices and team stats of every (circuit, season) scope, with scopes
+    spread across a process pool. Rounds and records are shared between the scopes of a division's circuits, so their
+    judge index fields are written once between the two passes, in scope order, rather than by whichever scope
+    finishes last. Team stats are computed from them, so they're updated in the second pass.
+
+    Args:
+        job_id (int | None): The job ID, for logging.
+        processes (int, optional): The number of scopes updated at once. Defaults to RETROACTIVE_PROCESSES.
+    """
+
+    circuits = requests.get(f"{API_BASE}/circuits?expand=seasons").json()
+    scopes = sorted((circuit['id'], season['id']) for circuit in circuits for season in circuit['seasons'])
+
+    # Spawned rather than forked, so scope processes don't inherit the worker's threads, locks and pooled connections
+    with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_process, initargs=(max(API_MAX_WORKERS // processes, 1),)) as executor:
+        scope_row_writes = _map_scopes(job_id, executor, update_scope_indices, scopes, "OTRs and judge indices")
+
+        row_writes: JudgeRowWrites = {'round_e_wps': {}, 'record_screw_factors': {}}
+        for scope in sorted(scope_row_writes.keys()):
+            row_writes['round_e_wps'].update(scope_row_writes[scope]['round_e_wps'])
+            row_writes['record_screw_factors'].update(scope_row_writes[scope]['record_screw_factors'])
+        num_failed = write_judge_rows(job_id, row_writes)
+        lprint(job_id, "Info", message=f"Updated {len(row_writes['round_e_wps'])} rounds and {len(row_writes['record_screw_factors'])} records ({num_failed} failed)")
+
+        _map_scopes(job_id, executor, update_scope_stats, sorted(scope_row_writes.keys()), "team stats")
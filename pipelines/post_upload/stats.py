@@ -1,11 +1,11 @@
-import statistics
-import requests
 import time
-from typing import List
+from typing import List, Mapping
 from shared.const import API_BASE
 from shared.lprint import lprint
-from requests_cache import DO_NOT_CACHE, CachedSession
-requests = CachedSession(expire_after=DO_NOT_CACHE)
+from pipelines.utils.robust_stats import mean, stdev, trimmed_mean
+from shared.api import get_api_session
+from .rankings import upsert_rankings
+requests = get_api_session()
 
 def _hi_lo_avg(speaks: List[float], trim: int) -> float | None:
     """Removes the high/low speaks from the given list after sorting
@@ -19,28 +19,16 @@ def _hi_lo_avg(speaks: List[float], trim: int) -> float | None:
         float: The trimmed average, or None if there's a fallback.
     """
 
-    # Sort the speaks list
-    sorted_speaks = sorted(speaks)
+    return trimmed_mean(speaks, trim)
 
-    # Check if the list has enough elements to trim
-    if len(sorted_speaks) <= 2 * trim:
-        return None
 
-    # Trim the highest and lowest values
-    trimmed_speaks = sorted_speaks[trim:-trim]
-
-    # Calculate the average of the remaining values
-    if trimmed_speaks:  # Check if the list is not empty
-        return sum(trimmed_speaks) / len(trimmed_speaks)
-    else:
-        return None
-
-
-def _update_scoped_stats(job_id: int | None, season: int, circuit: int):
-    """_summary_
+def update_scoped_stats(job_id: int | None, season: int, circuit: int):
+    """Updates the stats of every team in a (circuit, season) scope from a single query of the scope's results.
 
     Args:
-        tournament_division_id (int): _description_
+        job_id (int | None): The job ID, for logging.
+        season (int): The season ID.
+        circuit (int): The circuit ID.
     """
 
     # Get all the team results in the scope
@@ -177,7 +165,10 @@ def _update_scoped_stats(job_id: int | None, season: int, circuit: int):
                         team_2_speaks[result['teamId']].append(speak['points'])
                         speaks.append(speak['points'])
 
-    avg_speaks = statistics.mean(speaks) if len(speaks) else None
+    avg_speaks = mean(speaks)
+    # Averages reused for every round a team or judge appears in
+    team_2_avg_speaks = {teamId: mean(team_speaks) for teamId, team_speaks in team_2_speaks.items() if len(team_speaks) > 1}
+    judge_2_avg_speaks = {judgeId: mean(judge_speaks) for judgeId, judge_speaks in judge_2_speaks.items() if len(judge_speaks)}
 
     # with open("foo.json", "w") as f:
     #     import json
@@ -189,6 +180,8 @@ def _update_scoped_stats(job_id: int | None, season: int, circuit: int):
     #         'judge_2_speaks': judge_2_speaks,
     #         'judge_2_index': judge_2_speaks,
     #     }, f)
+    updates: Mapping[str, dict] = {}
+    creates: Mapping[str, dict] = {}
     for i, (teamId, rounds) in enumerate(team_2_rounds.items()):
         lprint(job_id if i % 250 == 0 else None, "Info", message=f"Updating {i+1}/{len(team_2_rounds.items())}")
         x_wp = []
@@ -229,8 +222,7 @@ def _update_scoped_stats(job_id: int | None, season: int, circuit: int):
         true_wp = None
         intra_team_speak_std = None
         d_sp = None
-        overall_speak_std = statistics.stdev(
-            team_2_speaks[teamId]) if teamId in team_2_speaks and len(team_2_speaks[teamId]) >= 2 else None
+        overall_speak_std = stdev(team_2_speaks[teamId]) if teamId in team_2_speaks else None
 
         for round in rounds:
             if isinstance(round, int):
@@ -322,7 +314,7 @@ def _update_scoped_stats(job_id: int | None, season: int, circuit: int):
                     judge_2_team_avg_points[judge].append(points)
 
                 for judgeId, points in judge_2_team_avg_points.items():
-                    judge_2_team_avg_points[judgeId] = statistics.mean(points)
+                    judge_2_team_avg_points[judgeId] = mean(points)
 
                 # Handle opponent speaker avg
                 opponent_round_avg = []
@@ -335,10 +327,8 @@ def _update_scoped_stats(job_id: int | None, season: int, circuit: int):
                                 opponent_round_avg.append(speak['points'])
 
                 # Record win <-> speaking stats
-                team_round_avg = statistics.mean(
-                    team_round_avg) if len(team_round_avg) else 0
-                opponent_round_avg = statistics.mean(
-                    opponent_round_avg) if len(opponent_round_avg) else 0
+                team_round_avg = mean(team_round_avg) or 0
+                opponent_round_avg = mean(opponent_round_avg) or 0
 
                 if team_round_avg > opponent_round_avg:
                     if round['outcome'] == "Win":
@@ -360,16 +350,16 @@ def _update_scoped_stats(job_id: int | None, season: int, circuit: int):
                 tourn_to_speaks[result_id].append(team_round_avg)
 
                 # Record relative stats
-                if round['opponentId'] in team_2_speaks and len(team_2_speaks[round['opponentId']]) > 1:
+                if round['opponentId'] in team_2_avg_speaks:
                     opp_speaker_impact.append(
-                        opponent_round_avg - statistics.mean(team_2_speaks[round['opponentId']]))
+                        opponent_round_avg - team_2_avg_speaks[round['opponentId']])
                 if 'records' not in round:
                     continue
                 for record in round['records']:
-                    if record['judgeId'] not in judge_2_speaks or record['judgeId'] not in judge_2_team_avg_points or not len(judge_2_speaks[record['judgeId']]):
+                    if record['judgeId'] not in judge_2_avg_speaks or record['judgeId'] not in judge_2_team_avg_points:
                         continue
                     speaks_above_judging.append(
-                        judge_2_team_avg_points[record['judgeId']] - statistics.mean(judge_2_speaks[record['judgeId']]))
+                        judge_2_team_avg_points[record['judgeId']] - judge_2_avg_speaks[record['judgeId']])
                 speaks_above_average.append(team_round_avg - avg_speaks)
 
         exp_wins = 0
@@ -383,12 +373,12 @@ def _update_scoped_stats(job_id: int | None, season: int, circuit: int):
         wins_above_replacement = wins_with_exp_wp_recorded - exp_wins
         win_pct_above_replacement = (
             wins_with_exp_wp_recorded/len(rounds)) - (exp_wins/len(rounds))
-        x_wp = statistics.mean(x_wp)
+        x_wp = mean(x_wp)
 
         if len(speaks_above_average) and len(speaks_above_judging):
-            speaks_above_average = statistics.mean(speaks_above_average) if len(speaks_above_average) else None
-            speaks_above_judging = statistics.mean(speaks_above_judging) if len(speaks_above_judging) else None
-            opp_speaker_impact = statistics.mean(opp_speaker_impact) if len(opp_speaker_impact) else None
+            speaks_above_average = mean(speaks_above_average)
+            speaks_above_judging = mean(speaks_above_judging)
+            opp_speaker_impact = mean(opp_speaker_impact)
         else:
             speaks_above_average = None
             speaks_above_judging = None
@@ -410,10 +400,10 @@ def _update_scoped_stats(job_id: int | None, season: int, circuit: int):
         if len(competitor_2_speaks.keys()) >= 2:
             intra_team_speak_std = []
             for _, speaks in competitor_2_speaks.items():
-                intra_team_speak_std.append(statistics.mean(speaks))
+                intra_team_speak_std.append(mean(speaks))
             intra_team_speak_std = sorted(intra_team_speak_std, reverse=True)
             d_sp = intra_team_speak_std[0] - intra_team_speak_std[-1]
-            intra_team_speak_std = statistics.stdev(intra_team_speak_std)
+            intra_team_speak_std = stdev(intra_team_speak_std)
 
         for tourn_speaks in tourn_to_speaks.values():
             speaks_1hl.append(_hi_lo_avg(tourn_speaks, 1))
@@ -422,8 +412,8 @@ def _update_scoped_stats(job_id: int | None, season: int, circuit: int):
         speaks_1hl = list(filter(lambda x: x != None, speaks_1hl))
         speaks_2hl = list(filter(lambda x: x != None, speaks_2hl))
 
-        speaks_1hl = statistics.mean(speaks_1hl) if len(speaks_1hl) else None
-        speaks_2hl = statistics.mean(speaks_2hl) if len(speaks_2hl) else None
+        speaks_1hl = mean(speaks_1hl)
+        speaks_2hl = mean(speaks_2hl)
 
         statistics_body = {
             'xwp': x_wp,
@@ -467,45 +457,17 @@ def _update_scoped_stats(job_id: int | None, season: int, circuit: int):
             'twp': ((prelim_wins / (prelim_wins + prelim_losses)) if prelim_wins + prelim_losses != 0 else 0) + ((0.1 * elim_wins / (elim_wins + elim_losses)) if elim_wins + elim_losses != 0 else 0)
         }
 
-        create_body = statistics_body
-        create_body['team'] = {
-            'connect': {
-                'id': teamId
-            }
-        }
-        create_body['circuit'] = {
-            'connect': {
-                'id': circuit
-            }
-        }
-        create_body['season'] = {
-            'connect': {
-                'id': season
-            }
-        }
         if teamId not in team_2_otr:
             continue
 
-        create_body['otr'] = team_2_otr[teamId]
+        updates[teamId] = statistics_body
+        creates[teamId] = {
+            'otr': team_2_otr[teamId]
+        }
 
-        res = requests.post(f'{API_BASE}/rankings/teams/advanced/upsert', json={
-            'where': {
-                'teamId_circuitId_seasonId': {
-                    'teamId': teamId,
-                    'circuitId': circuit,
-                    'seasonId': season
-                }
-            },
-            'update': statistics_body,
-            'create': create_body,
-        })
-
-        if res.status_code != 200:
-            print({
-                    'teamId': teamId,
-                    'circuitId': circuit,
-                    'seasonId': season
-                })
+    num_failed = upsert_rankings(job_id, circuit, season, 'teamRankings', 'teamId', updates, creates)
+    if num_failed:
+        lprint(job_id, "Warning", message=f"Could not write {num_failed} team rankings for (circuit, season) = ({circuit}, {season})")
 
 def update_all_stats(job_id: int | None = None):
     circuits = requests.get(f"{API_BASE}/circuits?expand=seasons").json()
@@ -514,7 +476,7 @@ def update_all_stats(job_id: int | None = None):
         for season in circuit['seasons']:
             lprint(job_id, "Info", message=f"Updating (circuit, season) = ({circuit['id']}, {season['id']})")
             try:
-                _update_scoped_stats(job_id, season['id'], circuit['id'])
+                update_scoped_stats(job_id, season['id'], circuit['id'])
                 time.sleep(0.5)
             except Exception:
                 lprint(job_id, "Error", message=f"Failed updating (circuit, season) = ({circuit['id']}, {season['id']})")
@@ -554,7 +516,7 @@ def update_stats(job_id: int | None, tab_event_id: int):
 
     for circuit in circuits:
         lprint(job_id, "Info", message=f"Updating stats for season {season} and circuit {circuit}")
-        _update_scoped_stats(job_id, season, circuit)
+        update_scoped_stats(job_id, season, circuit)
 
 
 if __name__ == "__main__":
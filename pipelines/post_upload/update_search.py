@@ -1,9 +1,11 @@
 from shared.const import API_BASE
+from shared.api import get_api_session
 
-import requests
 import meilisearch
 import os
 
+requests = get_api_session()
+
 client = meilisearch.Client(
     os.environ['MEILISEARCH_URL'], os.environ['MEILISEARCH_KEY'])
 
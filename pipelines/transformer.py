@@ -1,10 +1,12 @@
-from typing import TypedDict, List, Tuple, Mapping
+from typing import TypedDict, List, Tuple, Mapping, Iterable
 from enum import Enum
 from shared.lprint import lprint
-import statistics
+import numpy as np
 from .utils.deflator import get_deflator
-from .utils.id import get_id
-from .utils.iqr import apply_iqr
+from .utils.id import get_id, get_ids
+from .utils.robust_stats import grouped_stats
+from .utils.record_table import RecordTable
+from .utils.otr_comp import compute_division_comps
 from scraper.lib import tournament, entries, entry, paradigm
 from scraper.utils.decision import get_decision
 from scraper.utils.constants import ELIM_ROUND_NAMES
@@ -133,68 +135,82 @@ class TransformedTournamentData(TypedDict):
     paradigms: List[TransformedParadigm]
 
 
-def transform_data(job_id: int | None, tab_tourn_id: int, tab_event_id: int, nickname: str, event_name: str, tournament: tournament.Tournament, entries: List[entry.Entry], circuits: List[str], season: int, tournament_boost: float, classification: str, division_name: str, first_elim_round: str | None = None, toc_full_bid_level: str | None = None, has_partial_bids: bool = False) -> TransformedTournamentData:
-    """Transforms raw Tabroom-native output from the scraper module into a format matching Debate Land's schema for API uploading.
-    Adds in computed stats used by Debate Land.
 
-    Args:
-        tab_tourn_id (int): The unique ID assigned to the tournament, visible in the `tourn_id` query parameter.
-        tab_event_id (int): The unique ID assigned to the event, visible in the `event_id` query parameter.
-        event_name (str): The event name.
-        nickname (str): A nickname for the tournament.
-        tournament (tournament.Tournament): The scraped tournament.
-        entries (List[entry.Entry]): The scraped entries.
-        tournament_boost (float): The difficulty multiplier of the tournament.
-        classification (str): The competitive level of the division.
-        division_name (str): The name of the division on Tabroom.
-        first_elim_round (str | None, optional): The standardized name of the first elimination round. Defaults to None.
-        toc_full_bid_level (str | None, optional): The standardized name of the round awarding a full TOC bid. Defaults to None.
-        has_partial_bids (bool, optional): Whether there are silver (partial) bids. Defaults to False.
-    Returns:
-        TransformedTournamentData: Tournament data in Debate Land's upload format.
+
+class DivisionTransformer:
+    """Transforms a division's entries into Debate Land's upload format as they stream in from the scraper.
+    Everything that only depends on a single entry (tallies, speaks, speaker results) is done in `add_entry`, so raw
+    entries can be consumed as soon as they're scraped. Work that depends on every entry (round name
+    standardization, opponent links, judge merging, bids and opWpM) waits for `finalize`.
+
+    Attributes:
+        tournament (TransformedTournament): The tournament, annotated with the division's metadata.
+        team_results (List[TransformedEntryResult]): The results of every entry added so far.
+        rounds (List[TransformedRound]): The rounds of every entry added so far.
     """
-    lookup = {}
-
-    tournament['tab_tourn_id'] = tab_tourn_id
-    tournament['tab_event_id'] = tab_event_id
-    tournament['season'] = season
-    tournament['circuits'] = circuits
-    tournament['boost'] = tournament_boost
-    tournament['bid_level'] = toc_full_bid_level
-    tournament['first_elim_round'] = first_elim_round
-    tournament['event'] = event_name
-    tournament['nickname'] = nickname
-    tournament['classification'] = classification
-    tournament['division_name'] = division_name
-
-    team_results: List[TransformedEntryResult] = []
-    rounds: List[TransformedRound] = []
-    judge_results: List[TransformedJudgeResult] = []
-    records: List[TransformedRecord] = []
-
-    tab_entry_id_to_entry_uuid = {}
-    judge_uuid_to_records_and_rounds: Mapping[str,
-                                              List[Tuple[TransformedRecord, TransformedRound]]] = {}
-
-    # Assign UUIDs
-    for entry in entries:
-        entry['team_id'] = get_id(' '.join(entry['competitors']).split(' '))
-        tab_entry_id_to_entry_uuid[entry['tab_entry_id']] = entry['team_id']
 
-    # Standardize round names
-    round_to_std_name: Mapping[str, str] = {}
-    entry_uuid_to_school: Mapping[str, str] = {}
-    entry_uuid_to_last_elim: Mapping[str, TransformedRound | None] = {}
+    def __init__(self, job_id: int | None, tab_tourn_id: int, tab_event_id: int, nickname: str, event_name: str, tournament: tournament.Tournament, circuits: List[str], season: int, tournament_boost: float, classification: str, division_name: str, first_elim_round: str | None = None, toc_full_bid_level: str | None = None, has_partial_bids: bool = False, check_cache: bool = True):
+        """See `transform_data` for a description of each argument."""
+
+        self.job_id = job_id
+        self.tab_tourn_id = tab_tourn_id
+        self.tournament_boost = tournament_boost
+        self.first_elim_round = first_elim_round
+        self.toc_full_bid_level = toc_full_bid_level
+        self.has_partial_bids = has_partial_bids
+        self.check_cache = check_cache
+
+        tournament['tab_tourn_id'] = tab_tourn_id
+        tournament['tab_event_id'] = tab_event_id
+        tournament['season'] = season
+        tournament['circuits'] = circuits
+        tournament['boost'] = tournament_boost
+        tournament['bid_level'] = toc_full_bid_level
+        tournament['first_elim_round'] = first_elim_round
+        tournament['event'] = event_name
+        tournament['nickname'] = nickname
+        tournament['classification'] = classification
+        tournament['division_name'] = division_name
+        self.tournament = tournament
+
+        self.team_results: List[TransformedEntryResult] = []
+        self.rounds: List[TransformedRound] = []
+
+        self.tab_entry_id_to_entry_uuid: Mapping[int, str] = {}
+        self.entry_uuid_to_school: Mapping[str, str] = {}
+        self.entry_uuid_to_last_elim: Mapping[str, TransformedRound | None] = {}
+
+        # Per-entry state that can only be resolved once every entry has been added
+        self._entry_rounds: List[Tuple[int, List[TransformedRound], List[TransformedRound], List[TransformedRound]]] = []
+        self._pending_records: List[Tuple[TransformedRound, List[entry.Record]]] = []
+        self._speak_keys: List[Tuple[int, str]] = []
+        self._speak_points: List[float] = []
+
+    def add_entry(self, entry: entry.Entry) -> None:
+        """Transforms a single scraped entry. The entry's rounds are reused (and mutated) in the output.
+
+        Args:
+            entry (entry.Entry): The scraped entry.
+        """
+
+        first_elim_round = self.first_elim_round
+
+        # Hash every name in the entry up front, each distinct name once
+        name_to_id = get_ids(entry['competitors'] + [
+            name
+            for round in entry['rounds']
+            for record in round['judge_records']
+            for name in [record['name']] + list(map(lambda s: s['competitor'], record.get('speaking', [])))
+        ])
 
-    # Use UUIDs in links
-    # Handle Tab ID changes
+        entry['team_id'] = get_id(' '.join(entry['competitors']).split(' '))
+        self.tab_entry_id_to_entry_uuid[entry['tab_entry_id']] = entry['team_id']
 
-    for entry in entries:
         result: TransformedEntryResult = {
             'team_id': entry['team_id'],
             'competitors': list(map(
                 lambda c: {
-                    'id': get_id(c.split(' ')),
+                    'id': name_to_id[c],
                     'name': c
                 },
                 entry['competitors']
@@ -202,7 +218,7 @@ def transform_data(job_id: int | None, tab_tourn_id: int, tab_event_id: int, nic
             'tab_entry_id': entry['tab_entry_id'],
             'code': entry['code'],
             'prelim_pos': None,
-            'prelim_pool_size': len(entries),
+            'prelim_pool_size': None,
             'prelim_wins': 0,
             'prelim_losses': 0,
             'prelim_ballots_won': 0,
@@ -220,9 +236,8 @@ def transform_data(job_id: int | None, tab_tourn_id: int, tab_event_id: int, nic
         }
 
         # Log school (for ghost bid detection)
-        entry_uuid_to_school[result['team_id']] = result['school']
+        self.entry_uuid_to_school[result['team_id']] = result['school']
 
-        # Standardize round names
         prelim_rounds: List[TransformedRound] = []
         elim_rounds: List[TransformedRound] = []
 
@@ -240,12 +255,11 @@ def transform_data(job_id: int | None, tab_tourn_id: int, tab_event_id: int, nic
 
         # Log last elim round (for ghost bid detection)
         if len(elim_rounds):
-            entry_uuid_to_last_elim[result['team_id']] = elim_rounds[-1]
+            self.entry_uuid_to_last_elim[result['team_id']] = elim_rounds[-1]
         else:
-            entry_uuid_to_last_elim[result['team_id']] = None
+            self.entry_uuid_to_last_elim[result['team_id']] = None
 
-        for i, round in enumerate(prelim_rounds):
-            # Update result
+        for round in prelim_rounds:
             if round['outcome'] == "Win":
                 result['prelim_wins'] += 1
             elif round['outcome'] == "Loss":
@@ -256,13 +270,7 @@ def transform_data(job_id: int | None, tab_tourn_id: int, tab_event_id: int, nic
             result['prelim_ballots_won'] += round['ballots_won']
             result['prelim_ballots_lost'] += round['ballots_lost']
 
-            # Handle name manipulations
-            if round['name'] in round_to_std_name:
-                continue
-            round_to_std_name[round['name']] = f"Round {i + 1}"
-
-        for i, round in enumerate(elim_rounds):
-            # Update result
+        for round in elim_rounds:
             if round['outcome'] == "Win":
                 result['elim_wins'] += 1
             elif round['outcome'] == "Loss":
@@ -270,331 +278,368 @@ def transform_data(job_id: int | None, tab_tourn_id: int, tab_event_id: int, nic
             result['elim_ballots_won'] += round['ballots_won']
             result['elim_ballots_lost'] += round['ballots_lost']
 
-            # Handle name manipulations
-            if round['name'] in round_to_std_name:
-                continue
-            first_elim_round_idx = ELIM_ROUND_NAMES.index(first_elim_round)
-            round_to_std_name[round['name']
-                              ] = ELIM_ROUND_NAMES[first_elim_round_idx - i]
+        self._entry_rounds.append((entry['tab_entry_id'], entry['rounds'], prelim_rounds, elim_rounds))
 
-        for i, round in enumerate(entry['rounds']):
-            if round['opponent']:
-                round['opponent_id'] = tab_entry_id_to_entry_uuid[round['opponent']
-                                                                  ['tab_entry_id']]
-            else:
-                round['opponent_id'] = None
-            round['name_std'] = round_to_std_name[round['name']]
+        for round in entry['rounds']:
             round['team_id'] = entry['team_id']
 
             judge_records = round['judge_records']
             round['speaking'] = []
             for record in judge_records:
+                record['judge_id'] = name_to_id[record['name']]
                 if 'speaking' not in record:
                     continue
                 for speak in record['speaking']:
-                    speak['judgeId'] = get_id(record['name'].split(' '))
-                    speak['competitorId'] = get_id(
-                        speak['competitor'].split(' '))
+                    speak['judgeId'] = record['judge_id']
+                    speak['competitorId'] = name_to_id[speak['competitor']]
                     speak['points'] = speak['score']
                     del speak['reply_score']
                     del speak['score']
                     del speak['competitor']
                     round['speaking'].append(speak)
             del round['judge_records']
-            del round['opponent']
 
-            rounds.append(round)
-
-            matchup_id = get_id([round['team_id'], round['opponent_id'] or ""])
-
-            for record in judge_records:
-                uuid = get_id(record['name'].split(' '))
-                record['judge_id'] = uuid
-
-                # Register judge in the lookup if they aren't in already
-                if not uuid in judge_uuid_to_records_and_rounds:
-                    judge_uuid_to_records_and_rounds[uuid] = {}
-
-                # If the lookup has recorded the specific round for the judge, add this specific round & record to it
-                if round['name_std'] in judge_uuid_to_records_and_rounds[uuid] and matchup_id in judge_uuid_to_records_and_rounds[uuid][round['name_std']]:
-                    judge_uuid_to_records_and_rounds[uuid][round['name_std']][matchup_id]['rounds'].append(
-                        round)
-                    judge_uuid_to_records_and_rounds[uuid][round['name_std']][matchup_id]['records'].append(
-                        record)
-
-                # Register the round for the judge and initialize with the this specific round & record
-                else:
-                    # Register the round if not already done
-                    if round['name_std'] not in judge_uuid_to_records_and_rounds[uuid]:
-                        judge_uuid_to_records_and_rounds[uuid][round['name_std']] = {
-                        }
-
-                    # Register the matchup
-                    judge_uuid_to_records_and_rounds[uuid][round['name_std']][matchup_id] = {
-                        'rounds': [round],
-                        'records': [record]
-                    }
+            # Opponents may not have been added yet, so links and matchups are resolved in `finalize`
+            self._pending_records.append((round, judge_records))
+            self.rounds.append(round)
 
+        # Speaker results are computed for the whole division at once in `finalize`
         result['speaking']: List[TournamentSpeakerResult] = []
-        competitor_to_speaks: Mapping(str, List[float]) = {}
-
         for round in entry['rounds']:
             for speak in round['speaking']:
-                competitor = speak['competitorId']
-                if competitor not in competitor_to_speaks:
-                    competitor_to_speaks[competitor] = []
-                competitor_to_speaks[competitor].append(speak['points'])
+                self._speak_keys.append((len(self.team_results), speak['competitorId']))
+                self._speak_points.append(speak['points'])
+
+        self.team_results.append(result)
+
+    def _compute_speaker_results(self) -> None:
+        """Computes every competitor's average, IQR-adjusted average and standard deviation of speaks in one grouped pass."""
+
+        if not self._speak_points:
+            return
+
+        stats = grouped_stats(self._speak_keys, self._speak_points)
 
-        for competitor, speaks in competitor_to_speaks.items():
-            result['speaking'].append({
+        for i, (result_idx, competitor) in enumerate(stats['keys']):
+            self.team_results[result_idx]['speaking'].append({
                 'competitor_id': competitor,
-                'raw_avg_points': statistics.mean(speaks),
-                'adj_avg_points': statistics.mean(apply_iqr(speaks)),
-                'std_dev_points': statistics.stdev(speaks) if len(speaks) > 1 else 0
+                'raw_avg_points': float(stats['mean'][i]),
+                'adj_avg_points': float(stats['iqr_mean'][i]),
+                'std_dev_points': float(stats['stdev'][i]) if stats['count'][i] > 1 else 0
             })
 
-        team_results.append(result)
+    def _standardize_round_names(self) -> None:
+        """Assigns each round its standardized name. Entries with the most rounds name the rounds first (ties broken
+        by tab_entry_id), so the result doesn't depend on the order entries arrived in.
+        """
 
-    # Handle bids
-    for result in team_results:
-        result['bid'] = None
+        round_to_std_name: Mapping[str, str] = {}
 
-        last_elim = entry_uuid_to_last_elim[result['team_id']]
-        if not last_elim or not toc_full_bid_level:
-            continue
+        for tab_entry_id, rounds, prelim_rounds, elim_rounds in sorted(self._entry_rounds, key=lambda e: (-len(e[1]), e[0])):
+            for i, round in enumerate(prelim_rounds):
+                if round['name'] in round_to_std_name:
+                    continue
+                round_to_std_name[round['name']] = f"Round {i + 1}"
 
-        last_op_school = entry_uuid_to_school[last_elim['opponent_id']
-                                              ] if last_elim['opponent_id'] in entry_uuid_to_school else None
-        if not last_op_school:
-            lprint(job_id, "Info", message=f"Last school not detected for team '{entry['code']}'")
-            continue
+            for i, round in enumerate(elim_rounds):
+                if round['name'] in round_to_std_name:
+                    continue
+                first_elim_round_idx = ELIM_ROUND_NAMES.index(self.first_elim_round)
+                round_to_std_name[round['name']
+                                  ] = ELIM_ROUND_NAMES[first_elim_round_idx - i]
 
-        idx = ELIM_ROUND_NAMES.index(last_elim['name_std'])
+        for round in self.rounds:
+            round['name_std'] = round_to_std_name[round['name']]
 
-        if last_op_school == entry['school']:
-            lprint(job_id, "Info", message=f"Ghost bid detected for {entry['code']} (Their school is {entry['school']} and their last opponent was from {last_op_school}).")
-            is_ghost_bid = True
-        else:
-            is_ghost_bid = False
+    def _link_rounds(self) -> RecordTable:
+        """Links every round to its opponent and collects every judge record into a columnar table.
 
-        full_bid_idx = ELIM_ROUND_NAMES.index(
-            toc_full_bid_level) + (1 if is_ghost_bid else 0)
+        Returns:
+            RecordTable: The division's judge records, merged by judge, round and matchup.
+        """
 
-        if has_partial_bids:
-            partial_bid_idx = full_bid_idx + 1
-        else:
-            partial_bid_idx = None
-        if idx <= full_bid_idx:
-            result['bid'] = {
-                "value": "Full",
-                "isGhostBid": is_ghost_bid
-            }
-        elif partial_bid_idx and idx <= partial_bid_idx:
-            result['bid'] = {
-                "value": "Partial",
-                "isGhostBid": is_ghost_bid
-            }
+        table = RecordTable()
 
-    # Compute opWpM and OTR Comp
-    for entry in entries:
-        result: TransformedEntryResult | None = None
+        for round, judge_records in self._pending_records:
+            if round['opponent']:
+                round['opponent_id'] = self.tab_entry_id_to_entry_uuid[round['opponent']
+                                                                       ['tab_entry_id']]
+            else:
+                round['opponent_id'] = None
+            del round['opponent']
 
-        for _result in team_results:
-            if _result['team_id'] == tab_entry_id_to_entry_uuid[entry['tab_entry_id']]:
-                result = _result
+            matchup_id = get_id([round['team_id'], round['opponent_id'] or ""])
 
-        if not result or (result['prelim_ballots_won'] + result['prelim_ballots_lost']) == 0:
-            continue
+            for record in judge_records:
+                table.add(record['judge_id'], matchup_id, round, record)
 
-        rxr = 0
-        break_boost = (result['elim_wins'] or 0) + \
-            (result['elim_losses'] or 0) + 1
-        p_wp = result['prelim_ballots_won'] / \
-            (result['prelim_ballots_won'] + result['prelim_ballots_lost'])
-        result['uds'] = []
-        for round in entry['rounds']:
-            opponent_result: TransformedEntryResult | None = None
+        self._pending_records = []
 
-            for _result in team_results:
-                if not 'opponent_id' in round:
-                    continue
-                if _result['team_id'] == round['opponent_id']:
-                    opponent_result = _result
+        return table
+
+    def _assign_bids(self) -> None:
+        """Assigns TOC bids (including ghost bids) based on each entry's last elim round."""
 
-            if not opponent_result or (opponent_result['prelim_ballots_lost'] + opponent_result['prelim_ballots_won']) == 0:
+        toc_full_bid_level = self.toc_full_bid_level
+
+        for result in self.team_results:
+            result['bid'] = None
+
+            last_elim = self.entry_uuid_to_last_elim[result['team_id']]
+            if not last_elim or not toc_full_bid_level:
                 continue
 
-            op_pwp = opponent_result['prelim_ballots_won'] / (
-                opponent_result['prelim_ballots_won'] + opponent_result['prelim_ballots_lost'])
-            if round['outcome'] == "Win":
-                try:
-                    result['op_wp_m_winning'].append(op_pwp)
-                except Exception:
-                    result['op_wp_m_winning'] = [
-                        result['op_wp_m_winning'], op_pwp]
+            last_op_school = self.entry_uuid_to_school[last_elim['opponent_id']
+                                                       ] if last_elim['opponent_id'] in self.entry_uuid_to_school else None
+            if not last_op_school:
+                lprint(self.job_id, "Info", message=f"Last school not detected for team '{result['code']}'")
+                continue
+
+            idx = ELIM_ROUND_NAMES.index(last_elim['name_std'])
+
+            if last_op_school == result['school']:
+                lprint(self.job_id, "Info", message=f"Ghost bid detected for {result['code']} (Their school is {result['school']} and their last opponent was from {last_op_school}).")
+                is_ghost_bid = True
+            else:
+                is_ghost_bid = False
+
+            full_bid_idx = ELIM_ROUND_NAMES.index(
+                toc_full_bid_level) + (1 if is_ghost_bid else 0)
+
+            if self.has_partial_bids:
+                partial_bid_idx = full_bid_idx + 1
             else:
-                try:
-                    result['op_wp_m_losing'].append(op_pwp)
-                except Exception:
-                    result['op_wp_m_losing'] = [
-                        result['op_wp_m_losing'], op_pwp]
+                partial_bid_idx = None
+            if idx <= full_bid_idx:
+                result['bid'] = {
+                    "value": "Full",
+                    "isGhostBid": is_ghost_bid
+                }
+            elif partial_bid_idx and idx <= partial_bid_idx:
+                result['bid'] = {
+                    "value": "Partial",
+                    "isGhostBid": is_ghost_bid
+                }
+
+    def _compute_otr_comps(self) -> None:
+        """Computes opWpM, RxR and OTR Comp for every entry with prelim ballots in a single batched kernel call."""
+
+        team_id_to_result: Mapping[str, TransformedEntryResult] = {
+            result['team_id']: result for result in self.team_results}
+        team_id_to_p_wp: Mapping[str, float] = {
+            team_id: result['prelim_ballots_won'] / (result['prelim_ballots_won'] + result['prelim_ballots_lost'])
+            for team_id, result in team_id_to_result.items()
+            if result['prelim_ballots_won'] + result['prelim_ballots_lost']
+        }
+
+        # Entries sharing competitors share a result, so their rounds are pooled
+        team_id_to_rounds: Mapping[str, List[TransformedRound]] = {}
+        for tab_entry_id, rounds, _, _ in self._entry_rounds:
+            team_id = self.tab_entry_id_to_entry_uuid[tab_entry_id]
+            if team_id in team_id_to_p_wp:
+                team_id_to_rounds.setdefault(team_id, []).extend(rounds)
+
+        if not team_id_to_rounds:
+            return
+
+        team_ids = list(team_id_to_rounds.keys())
+        rounds = [round for team_id in team_ids for round in team_id_to_rounds[team_id]]
+
+        comps = compute_division_comps(
+            np.repeat(np.arange(len(team_ids)), [len(team_id_to_rounds[team_id]) for team_id in team_ids]),
+            np.array([team_id_to_p_wp.get(round['opponent_id'], np.nan) for round in rounds], dtype=float),
+            np.array([round['outcome'] == "Win" for round in rounds], dtype=bool),
+            np.array([round['type'] == "Elim" for round in rounds], dtype=bool),
+            np.array([team_id_to_p_wp[team_id] for team_id in team_ids]),
+            np.array([(team_id_to_result[team_id]['elim_wins'] or 0) + (team_id_to_result[team_id]['elim_losses'] or 0) + 1 for team_id in team_ids]),
+            self.tournament_boost
+        )
+
+        for team_id in team_ids:
+            team_id_to_result[team_id]['uds'] = []
+        for round, round_rxr in zip(rounds, comps['round_rxr'].tolist()):
+            if round_rxr:
+                team_id_to_result[round['team_id']]['uds'].append({'round': round, 'rxr': round_rxr})
+
+        for i, team_id in enumerate(team_ids):
+            result = team_id_to_result[team_id]
+            has_op_wp_m = not np.isnan(comps['op_wp_m'][i])
+
+            result['op_wp_m'] = float(comps['op_wp_m'][i]) if has_op_wp_m else None
+            result['op_wp_m_winning'] = float(comps['op_wp_m_winning'][i])
+            result['op_wp_m_losing'] = float(comps['op_wp_m_losing'][i])
+            result['p_wp'] = team_id_to_p_wp[team_id]
+            result['bb'] = (result['elim_wins'] or 0) + (result['elim_losses'] or 0) + 1
+            result['tb'] = self.tournament_boost
+            result['rxr'] = float(comps['rxr'][i])
+            result['otr_comp'] = float(comps['otr_comp'][i]) if has_op_wp_m else None
+
+    def _merge_judge_results(self, table: RecordTable) -> Tuple[List[TransformedJudgeResult], List[TransformedRecord]]:
+        """Builds the merged record of each matchup and aggregates every judge's results with group-by reductions.
+
+        Args:
+            table (RecordTable): The output of `_link_rounds`.
+
+        Returns:
+            Tuple[List[TransformedJudgeResult], List[TransformedRecord]]: The judge results and merged records.
+        """
+
+        decisions = list(map(lambda r: r['result'], table.records))
+        num_pro = table.count_by_judge(list(map(lambda d: d == "Pro", decisions)))
+        num_squirrels = table.count_by_judge(list(map(lambda r: bool(r['was_squirrel']), table.records)))
+        num_prelims = table.count_by_judge(list(map(lambda r: r['type'] == "Prelim", table.rounds)))
+        num_records = table.count_by_judge([True] * len(table))
+        avg_points = table.get_avg_points().tolist()
+        judge_point_stats = table.get_judge_point_stats()
+
+        # The first record of each judge names them, so capture it before records are rewritten
+        judge_results: List[TransformedJudgeResult] = []
+        for i, uuid in enumerate(table.judge_ids):
+            first_record = table.records[table.judge_first_row[i]]
+            result: TransformedJudgeResult = {
+                'judge_id': uuid,
+                'name': first_record['name'],
+                'tab_judge_id': first_record['tab_judge_id'],
+                'avg_raw_points': None,
+                'avg_adj_points': None,
+                'std_dev_points': None,
+                'num_prelims': int(num_prelims[i]),
+                'num_elims': int(num_records[i] - num_prelims[i]),
+                'num_squirrels': int(num_squirrels[i]),
+                'num_screws': None,
+                'num_pro': int(num_pro[i]),
+                'num_con': int(num_records[i] - num_pro[i])
+            }
+
+            if i in judge_point_stats and judge_point_stats[i][4] > 1:
+                raw, adj, std, one_hl, _ = judge_point_stats[i]
+                result['avg_adj_points'] = float(adj)
+                result['std_dev_points'] = float(std)
+                result['points_1HL'] = None if np.isnan(one_hl) else float(one_hl)
+                result['avg_raw_points'] = float(raw)
+
+            judge_results.append(result)
+
+        records: List[TransformedRecord] = []
+        for row in table.get_order().tolist():
+            matchup_record = table.records[row]
+            matchup_round = table.rounds[row]
+
+            matchup_record['speaking'] = table.speaking[row]
+
+            del matchup_record['name']
+            del matchup_record['tab_judge_id']
+            matchup_record['type'] = matchup_round['type']
+            matchup_record['avg_points'] = None if np.isnan(avg_points[row]) else avg_points[row]
+            matchup_record['teams'] = table.teams[row]
+
+            if matchup_round['outcome'] == "Win":
+                matchup_record['winner_id'] = matchup_round['team_id']
+            elif matchup_round['outcome'] != "Split":
+                matchup_record['winner_id'] = matchup_round['opponent_id']
+            else:
+                matchup_record['winner_id'] = None
+
+            matchup_record['round_name_std'] = matchup_round['name_std']
+            matchup_record['decision'] = matchup_record['result']
+            del matchup_record['result']
+
+            records.append(matchup_record)
 
-            try:
-                result['op_wp_m'].append(op_pwp)
-            except Exception:
-                result['op_wp_m'] = [
-                    result['op_wp_m'], op_pwp]
+        return judge_results, records
 
-            delta_pwp = op_pwp - p_wp
+    def _get_paradigms(self, judge_results: List[TransformedJudgeResult]) -> List[TransformedParadigm]:
+        """Scrapes and classifies the paradigms of every judge in the division.
 
-            if round['type'] == "Elim" or delta_pwp <= 0 or round['outcome'] != "Win":
+        Args:
+            judge_results (List[TransformedJudgeResult]): The division's judge results.
+
+        Returns:
+            List[TransformedParadigm]: The paradigms not already stored by the API (unless `check_cache` is off).
+        """
+
+        paradigms: List[TransformedParadigm] = []
+        raw_paradigms = paradigm.scrape_paradigms(
+            self.tab_tourn_id, list(map(lambda r: r['tab_judge_id'], judge_results)))
+        for result, raw_paradigm in zip(judge_results, raw_paradigms):
+            if not raw_paradigm or (self.check_cache and paradigm.check_paradigm_cache(raw_paradigm['hash'])):
                 continue
-            result['uds'].append(
-                {'round': round, 'rxr': .12 * ((delta_pwp + 0.7)**16 / (0.5 + (delta_pwp + 0.7)**10))**(1/2)})
-            rxr += .12 * ((delta_pwp + 0.7)**16 /
-                          (0.5 + (delta_pwp + 0.7)**10))**(1/2)
-
-        result['op_wp_m'] = statistics.mean(result['op_wp_m'])
-        result['op_wp_m_winning'] = statistics.mean(
-            result['op_wp_m_winning']) if type(result['op_wp_m_winning']) is list and len(result['op_wp_m_winning']) else 0
-        result['op_wp_m_losing'] = statistics.mean(
-            result['op_wp_m_losing']) if type(result['op_wp_m_losing']) is list and len(result['op_wp_m_losing']) else 0
-        result['p_wp'] = p_wp
-        result['bb'] = break_boost
-        result['tb'] = tournament_boost
-        result['rxr'] = rxr
-        result['otr_comp'] = (p_wp * break_boost *
-                              (result['op_wp_m'] + 0.625) * tournament_boost + rxr) / 3
-
-    # Sort results by OTR Comp, using OpWpM as a tiebreaker
-    team_results = list(
-        filter(lambda r: r['op_wp_m'] is not None and r['otr_comp'] is not None, team_results))
-    team_results.sort(key=lambda r: (
-        r['otr_comp'], r['op_wp_m']), reverse=True)
-
-    # Assign prelim seeds based on index
-    for i, result in enumerate(team_results):
-        result['prelim_pos'] = i + 1
-
-    # Create judge results
-    for uuid, data in judge_uuid_to_records_and_rounds.items():
-        first_record = list(list(data.values())[0].values())[0]['records'][0]
-
-        result: TransformedJudgeResult = {
-            'judge_id': uuid,
-            'name': first_record['name'],
-            'tab_judge_id': first_record['tab_judge_id'],
-            'avg_raw_points': [],
-            'avg_adj_points': [],
-            'std_dev_points': [],
-            'num_prelims': 0,
-            'num_elims': 0,
-            'num_squirrels': 0,
-            'num_screws': None,
-            'num_pro': 0,
-            'num_con': 0
+            raw_paradigm['tab_tourn_id'] = self.tab_tourn_id
+            raw_paradigm['judge_id'] = result['judge_id']
+            # result = paradigm.classify_paradigm(
+            #     raw_paradigm['text'])
+            # if not result:
+            #     continue
+            raw_paradigm['flow_confidence'] = -1 #result[0]
+            raw_paradigm['progressive_confidence'] = -1 #result[1]
+            paradigms.append(raw_paradigm)
+
+        return paradigms
+
+    def finalize(self) -> TransformedTournamentData:
+        """Runs the cross-entry steps once every entry has been added.
+
+        Returns:
+            TransformedTournamentData: Tournament data in Debate Land's upload format.
+        """
+
+        for result in self.team_results:
+            result['prelim_pool_size'] = len(self.team_results)
+
+        self._compute_speaker_results()
+        self._standardize_round_names()
+        record_table = self._link_rounds()
+        self._assign_bids()
+        self._compute_otr_comps()
+
+        # Sort results by OTR Comp, using OpWpM as a tiebreaker
+        team_results = list(
+            filter(lambda r: r['op_wp_m'] is not None and r['otr_comp'] is not None, self.team_results))
+        team_results.sort(key=lambda r: (
+            r['otr_comp'], r['op_wp_m']), reverse=True)
+
+        # Assign prelim seeds based on index
+        for i, result in enumerate(team_results):
+            result['prelim_pos'] = i + 1
+
+        judge_results, records = self._merge_judge_results(record_table)
+
+        return {
+            'tournament': self.tournament,
+            'team_results': team_results,
+            'rounds': self.rounds,
+            'judge_results': judge_results,
+            'records': records,
+            'paradigms': self._get_paradigms(judge_results)
         }
 
-        for round_matchups in data.values():
-            for matchup in round_matchups.values():
-                matchup_records = matchup['records']
-                matchup_rounds = matchup['rounds']
-
-                # Merge rounds
-                matchup_round = matchup_rounds[0]
-
-                # Merge records
-                matchup_record = matchup_records[0]
-                all_speaks = []
-                for _record in matchup_records:
-                    for speak in _record['speaking']:
-                        all_speaks.append(speak)
-
-                matchup_record['speaking'] = all_speaks
-
-                del matchup_record['name']
-                del matchup_record['tab_judge_id']
-                matchup_record['type'] = matchup_round['type']
-
-                if matchup_record['speaking']:
-                    matchup_record['avg_points'] = statistics.mean(
-                        list(map(lambda s: s['points'], matchup_record['speaking'])))
-                else:
-                    matchup_record['avg_points'] = None
-
-                matchup_record['teams'] = list(
-                    map(lambda r: r['team_id'], matchup_rounds))
-
-                if matchup_round['outcome'] == "Win":
-                    matchup_record['winner_id'] = matchup_round['team_id']
-                elif matchup_round['outcome'] != "Split":
-                    matchup_record['winner_id'] = matchup_round['opponent_id']
-                else:
-                    matchup_record['winner_id'] = None
-
-                matchup_record['round_name_std'] = matchup_round['name_std']
-                matchup_record['decision'] = matchup_record['result']
-                del matchup_record['result']
-
-                if matchup_record['decision'] == "Pro":
-                    result['num_pro'] += 1
-                else:
-                    result['num_con'] += 1
-                if matchup_record['was_squirrel']:
-                    result['num_squirrels'] += 1
-                if matchup_record['type'] == "Prelim":
-                    result['num_prelims'] += 1
-                else:
-                    result['num_elims'] += 1
-
-                if matchup_record['speaking']:
-                    for speak in matchup_record['speaking']:
-                        result['avg_raw_points'].append(speak['points'])
-
-                records.append(matchup_record)
-
-        if result['avg_raw_points'] and len(result['avg_raw_points']) > 1:
-            result['avg_adj_points'] = statistics.mean(
-                apply_iqr(result['avg_raw_points']))
-            result['std_dev_points'] = statistics.stdev(
-                result['avg_raw_points'])
-            try:
-                result['points_1HL'] = statistics.mean(
-                    sorted(result['avg_raw_points'])[1:-1])
-            except Exception:
-                result['points_1HL'] = None
-            result['avg_raw_points'] = statistics.mean(
-                result['avg_raw_points'])
 
-        else:
-            result['avg_raw_points'] = None
-            result['avg_adj_points'] = None
-            result['std_dev_points'] = None
-
-        judge_results.append(result)
-
-    # Scrape and classify paradigms
-    paradigms: List[TransformedParadigm] = []
-    for i, result in enumerate(judge_results):
-        raw_paradigm: TransformedParadigm | None = paradigm.scrape_paradigm(
-            tab_tourn_id, result['tab_judge_id'])
-        if not raw_paradigm or paradigm.check_paradigm_cache(raw_paradigm['hash']):
-            continue
-        raw_paradigm['tab_tourn_id'] = tab_tourn_id
-        raw_paradigm['judge_id'] = result['judge_id']
-        # result = paradigm.classify_paradigm(
-        #     raw_paradigm['text'])
-        # if not result:
-        #     continue
-        raw_paradigm['flow_confidence'] = -1 #result[0]
-        raw_paradigm['progressive_confidence'] = -1 #result[1]
-        paradigms.append(raw_paradigm)
-
-    return {
-        'tournament': tournament,
-        'team_results': team_results,
-        'rounds': rounds,
-        'judge_results': judge_results,
-        'records': records,
-        'paradigms': paradigms
-    }
+def transform_data(job_id: int | None, tab_tourn_id: int, tab_event_id: int, nickname: str, event_name: str, tournament: tournament.Tournament, entries: Iterable[entry.Entry], circuits: List[str], season: int, tournament_boost: float, classification: str, division_name: str, first_elim_round: str | None = None, toc_full_bid_level: str | None = None, has_partial_bids: bool = False, check_cache: bool = True) -> TransformedTournamentData:
+    """Transforms raw Tabroom-native output from the scraper module into a format matching Debate Land's schema for API uploading.
+    Adds in computed stats used by Debate Land.
+
+    Args:
+        tab_tourn_id (int): The unique ID assigned to the tournament, visible in the `tourn_id` query parameter.
+        tab_event_id (int): The unique ID assigned to the event, visible in the `event_id` query parameter.
+        event_name (str): The event name.
+        nickname (str): A nickname for the tournament.
+        tournament (tournament.Tournament): The scraped tournament.
+        entries (Iterable[entry.Entry]): The scraped entries, which may be a generator yielding entries as they're scraped.
+        tournament_boost (float): The difficulty multiplier of the tournament.
+        classification (str): The competitive level of the division.
+        division_name (str): The name of the division on Tabroom.
+        first_elim_round (str | None, optional): The standardized name of the first elimination round. Defaults to None.
+        toc_full_bid_level (str | None, optional): The standardized name of the round awarding a full TOC bid. Defaults to None.
+        has_partial_bids (bool, optional): Whether there are silver (partial) bids. Defaults to False.
+        check_cache (bool, optional): Whether to skip paradigms already stored by the API. Defaults to True, pass False to transform offline.
+    Returns:
+        TransformedTournamentData: Tournament data in Debate Land's upload format.
+    """
+
+    transformer = DivisionTransformer(job_id, tab_tourn_id, tab_event_id, nickname, event_name, tournament, circuits, season,
+                                      tournament_boost, classification, division_name, first_elim_round, toc_full_bid_level, has_partial_bids, check_cache)
+
+    for _entry in entries:
+        transformer.add_entry(_entry)
+
+    return transformer.finalize()
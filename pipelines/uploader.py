@@ -1,12 +1,33 @@
-import requests
+import json
 from shared.lprint import lprint
 from shared.const import API_BASE
-from typing import Mapping
-from .transformer import TransformedTournamentData
-from requests_cache import DO_NOT_CACHE, CachedSession
+from typing import Iterator, List, Mapping, Set, Tuple
+from .transformer import TransformedTournamentData, TransformedEntryResult, TransformedRound, TransformedJudgeResult, TransformedRecord, TransformedParadigm
+from .utils.upload_stages import UploadStage, run_stages
+from .utils.upload_journal import UploadJournal, get_upload_journal
+from .utils.division_diff import RowMatch, diff_fields, match_rows, same_rows
+from shared.api import get_api_session
 from random import random
 from tests.runtime import process_runtime_tests
-requests = CachedSession(expire_after=DO_NOT_CACHE)
+requests = get_api_session()
+
+"""Maximum number of rows created by a single bulk request"""
+BULK_MAX_ROWS = 100
+
+"""Maximum serialized size of the rows in a single bulk request, kept well under the API's body limit"""
+BULK_MAX_BYTES = 512 * 1024
+
+"""Fields compared between stored and scraped rows when re-uploading a division"""
+TEAM_RESULT_FIELDS = ['tabEntryId', 'aliasId', 'schoolId', 'prelimPos', 'prelimPoolSize', 'prelimWins', 'prelimLosses',
+                      'prelimBallotsWon', 'prelimBallotsLost', 'elimWins', 'elimLosses', 'elimBallotsWon', 'elimBallotsLost',
+                      'opWpM', 'otrComp']
+TOURNAMENT_SPEAK_FIELDS = ['competitorId', 'rawAvgPoints', 'adjAvgPoints', 'stdDevPoints']
+BID_FIELDS = ['value', 'isGhostBid']
+ROUND_FIELDS = ['name', 'type', 'side', 'outcome', 'ballotsWon', 'ballotsLost', 'opponentId']
+ROUND_SPEAK_FIELDS = ['judgeId', 'competitorId', 'points']
+JUDGE_RESULT_FIELDS = ['tabJudgeId', 'avgRawPoints', 'avgAdjPoints', 'stdDevPoints', 'numPrelims', 'numScrews', 'numElims',
+                       'numSquirrels', 'numPro', 'numCon']
+RECORD_FIELDS = ['decision', 'avgPoints', 'wasSquirrel', 'winnerId', 'type', 'event']
 
 def clear():
     TABLES = [
@@ -53,7 +74,23 @@ def clear():
             quit()
 
 
-def upload_data(job_id: int | None, data: TransformedTournamentData):
+def upload_data(job_id: int | None, data: TransformedTournamentData, bulk: bool = True, max_workers: int | None = None, school_ids: Mapping[str, int] | None = None):
+    """Uploads a transformed division to the API. Uploaded rows are recorded in the upload journal until the whole
+    division has been uploaded, so retrying a failed upload skips the rows that were already uploaded.
+
+    Args:
+        job_id (int | None): The job ID, for logging.
+        data (TransformedTournamentData): The transformed division.
+        bulk (bool, optional): Whether to create results, rounds, judge results and records in batches, and only
+        upload the rows that changed if the division was already uploaded. Defaults to True, pass False to upload one
+        row per request.
+        max_workers (int | None, optional): The maximum number of concurrent requests per upload stage. Defaults to
+        None, in which case the API session's limit is used.
+        school_ids (Mapping[str, int] | None, optional): The ID of each school name already seen in this job, shared
+        across its divisions so each school's ID is only selected once per job. Defaults to None, in which case the
+        cache only lasts for this division.
+    """
+
     # Process Tournament
     tournament = data['tournament']
 
@@ -280,309 +317,1415 @@ def upload_data(job_id: int | None, data: TransformedTournamentData):
         # raise TypeError("Invalid API Response. " + message)
 
     tournament_division_id = tournament_division_res.json()['id']
-    competing_school_ids = []
 
-    team_id_to_result_id: Mapping[str, int] = {}
-    judge_id_to_result_id: Mapping[str, int] = {}
+    # Resume from the last attempt at uploading the division, if it failed partway
+    journal = get_upload_journal()
+    school_ids = {} if school_ids is None else school_ids
 
-    team_upload_messages = []
+    # Divisions that were already uploaded (e.g. re-scraped after Tabroom corrections) only get what changed
+    snapshot = _get_division_snapshot(tournament['tab_event_id']) if bulk else None
 
-    # Create teams & all schools/aliases
-    for result in data['team_results']:
-        # Create team and upsert and/or connect school and alias
-        team_body = {
-            'id': result['team_id'],
-            'competitors': {
-                'connectOrCreate': list(map(
-                    lambda c: {
-                        'where': {
-                            'id': c['id']
-                        },
-                        'create': c
-                    },
-                    result['competitors']
-                ))
-            },
-            'schools': {
-                'connectOrCreate': {
+    if snapshot and (snapshot['teamResults'] or snapshot['judgeResults']):
+        failures = _upload_results_diff(job_id, data, tournament_division_id, snapshot, journal, school_ids, max_workers)
+    elif bulk:
+        failures = _upload_results_bulk(job_id, data, tournament_division_id, journal, school_ids, max_workers)
+    else:
+        failures = _upload_results(job_id, data, tournament_division_id, journal, school_ids, max_workers)
+
+    if failures:
+        lprint(job_id, "Warning", message=f"Could not upload {failures} rows of division {tournament['tab_event_id']}, retry the job to resume the upload.")
+    else:
+        journal.clear(tournament['tab_event_id'])
+
+    # Runtime tests
+    # process_runtime_tests(job_id, data)
+
+
+def _chunk_rows(rows: List[dict], max_rows: int = BULK_MAX_ROWS, max_bytes: int = BULK_MAX_BYTES) -> Iterator[List[dict]]:
+    """Splits rows into batches that fit in a single API request.
+
+    Args:
+        rows (List[dict]): The rows to upload.
+        max_rows (int, optional): The maximum number of rows per batch. Defaults to BULK_MAX_ROWS.
+        max_bytes (int, optional): The maximum serialized size of a batch. Defaults to BULK_MAX_BYTES.
+
+    Yields:
+        List[dict]: The next batch of rows. A single row larger than `max_bytes` is sent in a batch of its own.
+    """
+
+    chunk = []
+    chunk_bytes = 0
+
+    for row in rows:
+        row_bytes = len(json.dumps(row, default=str))
+        if chunk and (len(chunk) >= max_rows or chunk_bytes + row_bytes > max_bytes):
+            yield chunk
+            chunk = []
+            chunk_bytes = 0
+        chunk.append(row)
+        chunk_bytes += row_bytes
+
+    if chunk:
+        yield chunk
+
+
+def _get_team_body(result: TransformedEntryResult) -> dict:
+    """Builds the upsert body of a team, creating or connecting its competitors, school and alias.
+
+    Args:
+        result (TransformedEntryResult): The team's result.
+
+    Returns:
+        dict: The team body.
+    """
+
+    return {
+        'id': result['team_id'],
+        'competitors': {
+            'connectOrCreate': list(map(
+                lambda c: {
                     'where': {
-                        'name': result['school']
+                        'id': c['id']
                     },
-                    'create': {
-                        'name': result['school'],
-                        # TODO: Add country support
-                        'state': result['location']['state'] if result['location'] else None
-                    }
+                    'create': c
+                },
+                result['competitors']
+            ))
+        },
+        'schools': {
+            'connectOrCreate': {
+                'where': {
+                    'name': result['school']
+                },
+                'create': {
+                    'name': result['school'],
+                    # TODO: Add country support
+                    'state': result['location']['state'] if result['location'] else None
                 }
-            },
-            'aliases': {
-                'connectOrCreate': {
-                    'where': {
-                        'code_teamId': {
-                            'code': result['code'],
-                            'teamId': result['team_id']
-                        }
-                    },
-                    'create': {
-                        'code': result['code']
+            }
+        },
+        'aliases': {
+            'connectOrCreate': {
+                'where': {
+                    'code_teamId': {
+                        'code': result['code'],
+                        'teamId': result['team_id']
                     }
+                },
+                'create': {
+                    'code': result['code']
                 }
             }
         }
-        team_res = requests.post(f'{API_BASE}/teams/advanced/upsert', json={
+    }
+
+
+def _upload_team(job_id: int | None, result: TransformedEntryResult, school_ids: Mapping[str, int]) -> Tuple[int, int] | None:
+    """Upserts a team along with its competitors, school and alias, reading the alias and school IDs off the upsert
+    response.
+
+    Args:
+        job_id (int | None): The job ID, for logging.
+        result (TransformedEntryResult): The team's result.
+        school_ids (Mapping[str, int]): The ID of each school name already seen in this job, which is updated with the
+        team's school.
+
+    Returns:
+        Tuple[int, int] | None: The IDs of the team's alias and school, or None if the team couldn't be upserted.
+    """
+
+    team_body = _get_team_body(result)
+    select = {
+        'aliases': {
             'where': {
-                'id': result['team_id']
+                'code': result['code']
             },
-            'create': team_body,
-            'update': team_body,
             'select': {
-                'aliases': {
-                    'where': {
-                        'code': result['code']
-                    },
-                    'select': {
-                        'id': True
-                    }
-                },
-                'schools': {
-                    'where': {
-                        'name': result['school']
-                    },
-                    'select': {
-                        'id': True
-                    }
-                }
+                'id': True
             }
-        })
+        }
+    }
 
-        school_id = requests.get(
-            f'{API_BASE}/schools?where="name":"{result["school"]}"').json()[0]['id']
-        # alias_id = requests.get(
-        #     f'{API_BASE}/aliases?where="code":"{result["code"]}","teamId":"{result["team_id"]}"').json()[0]['id']
-        alias_id = requests.post(f'{API_BASE}/aliases/advanced/findFirst', data={
+    # Other teams from the same school already returned its ID
+    if result['school'] not in school_ids:
+        select['schools'] = {
             'where': {
-                'code': result['code'],
-                'teamId': result['team_id']
-            }
-        }).json()['id']
-
-        # Create team result
-        result_body = {
-            'divisionId': tournament_division_id,
-            'teamId': result['team_id'],
-            'tabEntryId': result['tab_entry_id'],
-            'aliasId': alias_id,
-            'schoolId': school_id,
-            'prelimPos': result['prelim_pos'],
-            'prelimPoolSize': result['prelim_pool_size'],
-            'prelimWins': result['prelim_wins'],
-            'prelimLosses': result['prelim_losses'],
-            'prelimBallotsWon': result['prelim_ballots_won'],
-            'prelimBallotsLost': result['prelim_ballots_lost'],
-            'elimWins': result['elim_wins'],
-            'elimLosses': result['elim_losses'],
-            'elimBallotsWon': result['elim_ballots_won'],
-            'elimBallotsLost': result['elim_ballots_lost'],
-            'opWpM': result['op_wp_m'],
-            'otrComp': result['otr_comp'],
-            'speaking': {
-                'create': list(map(
-                    lambda speak: {
-                        'competitorId': speak['competitor_id'],
-                        'rawAvgPoints': speak['raw_avg_points'],
-                        'adjAvgPoints': speak['adj_avg_points'],
-                        'stdDevPoints': speak['std_dev_points']
-                    },
-                    result['speaking']
-                ))
+                'name': result['school']
             },
+            'select': {
+                'id': True
+            }
+        }
+
+    team_res = requests.post(f'{API_BASE}/teams/advanced/upsert', json={
+        'where': {
+            'id': result['team_id']
+        },
+        'create': team_body,
+        'update': team_body,
+        'select': select
+    })
+
+    if team_res.status_code != 200:
+        lprint(job_id, "Error", message=f"Could not upsert team {result['team_id']}. {team_res.text}")
+        return None
+
+    team = team_res.json()
+    if 'schools' in team:
+        school_ids[result['school']] = team['schools'][0]['id']
+
+    return team['aliases'][0]['id'], school_ids[result['school']]
+
+
+def _get_result_body(result: TransformedEntryResult, alias_id: int, school_id: int) -> dict:
+    """Builds the create body of a team result, including its tournament speaks and bid.
+
+    Args:
+        result (TransformedEntryResult): The team's result.
+        alias_id (int): The ID of the team's alias.
+        school_id (int): The ID of the team's school.
+
+    Returns:
+        dict: The result body, without its division.
+    """
+
+    result_body = {
+        'teamId': result['team_id'],
+        'tabEntryId': result['tab_entry_id'],
+        'aliasId': alias_id,
+        'schoolId': school_id,
+        'prelimPos': result['prelim_pos'],
+        'prelimPoolSize': result['prelim_pool_size'],
+        'prelimWins': result['prelim_wins'],
+        'prelimLosses': result['prelim_losses'],
+        'prelimBallotsWon': result['prelim_ballots_won'],
+        'prelimBallotsLost': result['prelim_ballots_lost'],
+        'elimWins': result['elim_wins'],
+        'elimLosses': result['elim_losses'],
+        'elimBallotsWon': result['elim_ballots_won'],
+        'elimBallotsLost': result['elim_ballots_lost'],
+        'opWpM': result['op_wp_m'],
+        'otrComp': result['otr_comp'],
+        'speaking': {
+            'create': list(map(
+                lambda speak: {
+                    'competitorId': speak['competitor_id'],
+                    'rawAvgPoints': speak['raw_avg_points'],
+                    'adjAvgPoints': speak['adj_avg_points'],
+                    'stdDevPoints': speak['std_dev_points']
+                },
+                result['speaking']
+            ))
+        },
+    }
+
+    if result['bid']:
+        result_body['bid'] = {
+            'create': {
+                'value': result['bid']['value'],
+                'isGhostBid': result['bid']['is_ghost_bid'] if 'is_ghost_bid' in result['bid'] else False,
+                'team': {
+                    'connect': {
+                        'id': result['team_id']
+                    }
+                },
+            }
+        }
+
+    return result_body
+
+
+def _get_round_body(_round: TransformedRound) -> dict:
+    """Builds the create body of a round, including its speaks.
+
+    Args:
+        _round (TransformedRound): The round.
+
+    Returns:
+        dict: The round body, without its result.
+    """
+
+    return {
+        'name': _round['name'],
+        'nameStd': _round['name_std'],
+        'type': _round['type'],
+        'side': _round['side'],
+        'outcome': _round['outcome'],
+        'ballotsWon': _round['ballots_won'],
+        'ballotsLost': _round['ballots_lost'],
+        'opponentId': _round['opponent_id'],
+        'speaking': {
+            'create': _round['speaking']
+        }
+    }
+
+
+def _get_judge_result_body(result: TransformedJudgeResult) -> dict:
+    """Builds the create body of a judge result.
+
+    Args:
+        result (TransformedJudgeResult): The judge's result.
+
+    Returns:
+        dict: The judge result body, without its division.
+    """
+
+    return {
+        'judgeId': result['judge_id'],
+        'tabJudgeId': result['tab_judge_id'],
+        'avgRawPoints': result['avg_raw_points'],
+        'avgAdjPoints': result['avg_adj_points'],
+        'stdDevPoints': result['std_dev_points'],
+        'numPrelims': result['num_prelims'],
+        'numScrews': result['num_screws'],
+        'numElims': result['num_elims'],
+        'numSquirrels': result['num_squirrels'],
+        'numPro': result['num_pro'],
+        'numCon': result['num_con'],
+    }
+
+
+def _get_record_body(record: TransformedRecord, event: str, team_id_to_result_id: Mapping[str, int]) -> dict:
+    """Builds the create body of a judge record, connecting it to the teams and rounds it decided.
+
+    Args:
+        record (TransformedRecord): The record.
+        event (str): The division's event.
+        team_id_to_result_id (Mapping[str, int]): The ID of each team's result in the division.
+
+    Returns:
+        dict: The record body, without its judge result.
+    """
+
+    return {
+        'decision': record['decision'],
+        'avgPoints': record['avg_points'],
+        'wasSquirrel': record['was_squirrel'],
+        'judgeId': record['judge_id'],
+        'teams': {
+            'connect': list(map(
+                lambda id: {'id': id},
+                record['teams']
+            ))
+        },
+        'winnerId': record['winner_id'],
+        'type': record['type'],
+        'event': event,
+        'rounds': {
+            'connect': list(map(
+                lambda team_id: {
+                    'nameStd_resultId': {
+                        'nameStd': record['round_name_std'],
+                        'resultId': team_id_to_result_id[team_id]
+                    }
+                },
+                record['teams']
+            ))
         }
+    }
+
+
+def _get_paradigm_body(paradigm: TransformedParadigm) -> dict:
+    """Builds the create body of a paradigm.
+
+    Args:
+        paradigm (TransformedParadigm): The paradigm.
 
-        if result['bid']:
-            result_body['bid'] = {
+    Returns:
+        dict: The paradigm body.
+    """
+
+    return {
+        'id': paradigm['hash'],
+        'scrapedAt': paradigm['scraped_at'],
+        'text': paradigm['text'],
+        'html': paradigm['html'],
+        'judge': {
+            'connect': {
+                'id': paradigm['judge_id']
+            }
+        },
+        'flowRating': paradigm['flow_confidence'],
+        'progressiveRating': paradigm['progressive_confidence'],
+        'emails': {
+            'connectOrCreate': list(map(lambda e: {
                 'create': {
-                    'value': result['bid']['value'],
-                    'isGhostBid': result['bid']['is_ghost_bid'] if 'is_ghost_bid' in result['bid'] else False,
-                    'team': {
-                        'connect': {
-                            'id': result['team_id']
-                        }
-                    },
+                    'email': e
+                },
+                'where': {
+                    'email': e
+                }
+            }, paradigm['emails']))
+        },
+        'links': {
+            'connectOrCreate': list(map(lambda l: {
+                'create': {
+                    'href': l
+                },
+                'where': {
+                    'href': l
+                }
+            }, paradigm['links']))
+        }
+    }
+
+
+def _get_round_key(_round: TransformedRound) -> str:
+    """Gets the natural key of a round, under which it is recorded in the upload journal.
+
+    Args:
+        _round (TransformedRound): The round.
+
+    Returns:
+        str: The team's ID and the round's standardized name.
+    """
+
+    return f"{_round['team_id']}|{_round['name_std']}"
+
+
+def _get_record_key(record: TransformedRecord) -> str:
+    """Gets the natural key of a judge record, under which it is recorded in the upload journal.
+
+    Args:
+        record (TransformedRecord): The record.
+
+    Returns:
+        str: The judge's ID, the round's standardized name and the teams' IDs.
+    """
+
+    return f"{record['judge_id']}|{record['round_name_std']}|{','.join(sorted(record['teams']))}"
+
+
+def _upload_paradigms(data: TransformedTournamentData, journal: UploadJournal, max_workers: int | None = None) -> int:
+    """Creates every paradigm not already in the upload journal or the API (judges often keep the same paradigm across
+    tournaments), one request each since their emails and links are connected or created.
+
+    Args:
+        data (TransformedTournamentData): The transformed division.
+        journal (UploadJournal): The upload journal.
+        max_workers (int | None, optional): The maximum number of concurrent requests. Defaults to None.
+
+    Returns:
+        int: The number of paradigms that couldn't be created.
+    """
+
+    tab_event_id = data['tournament']['tab_event_id']
+    uploaded = journal.get(tab_event_id, 'paradigms')
+
+    hashes = [paradigm['hash'] for paradigm in data['paradigms'] if paradigm['hash'] not in uploaded]
+    if hashes:
+        existing_res = requests.post(f'{API_BASE}/paradigms/advanced/findMany', json={
+            'where': {
+                'id': {
+                    'in': hashes
                 }
+            },
+            'select': {
+                'id': True
             }
+        })
 
-        result_res = requests.post(
-            f'{API_BASE}/results/teams', json=result_body)
+        if existing_res.status_code == 200:
+            uploaded = {**uploaded, **dict.fromkeys(map(lambda paradigm: paradigm['id'], existing_res.json()))}
 
-        if result_res.status_code != 200:
-            team_upload_messages.append(f"Could not upsert team result. {result_res.text}")
-            # raise TypeError("Invalid API Response. " + message)
-        else:
-            team_id_to_result_id[result['team_id']] = result_res.json()['id']
+    def upload_paradigm(paradigm: TransformedParadigm) -> bool:
+        paradigm_res = requests.post(f'{API_BASE}/paradigms', json=_get_paradigm_body(paradigm))
+
+        if paradigm_res.status_code != 200:
+            return False
+
+        journal.put(tab_event_id, 'paradigms', {paradigm['hash']: None})
+        return True
+
+    return requests.map(upload_paradigm, filter(lambda p: p['hash'] not in uploaded, data['paradigms']), max_workers).count(False)
+
+
+def _upload_teams(job_id: int | None, results: List[TransformedEntryResult], school_ids: Mapping[str, int], journal: UploadJournal, tab_event_id: int, max_workers: int | None = None) -> List[Tuple[int, int] | None]:
+    """Upserts teams concurrently, skipping those in the upload journal. The first team from each school is upserted
+    before the rest, so every school is created by a single request instead of racing concurrent creates, and later
+    teams read its ID from the cache.
+
+    Args:
+        job_id (int | None): The job ID, for logging.
+        results (List[TransformedEntryResult]): The teams' results.
+        school_ids (Mapping[str, int]): The ID of each school name already seen in this job, see `_upload_team`.
+        journal (UploadJournal): The upload journal.
+        tab_event_id (int): The unique ID assigned to the event, visible in the `event_id` query parameter.
+        max_workers (int | None, optional): The maximum number of concurrent requests. Defaults to None.
+
+    Returns:
+        List[Tuple[int, int] | None]: The IDs of each team's alias and school, in the same order as `results`, None for
+        the teams that couldn't be upserted.
+    """
+
+    school_ids.update(journal.get(tab_event_id, 'schools'))
+    alias_ids = journal.get(tab_event_id, 'teams')
+
+    ids: List[Tuple[int, int] | None] = [None] * len(results)
+    first_from_school = []
+    rest = []
+    schools = set()
+    for i, result in enumerate(results):
+        if result['team_id'] in alias_ids and result['school'] in school_ids:
+            ids[i] = (alias_ids[result['team_id']], school_ids[result['school']])
+            continue
+
+        (rest if result['school'] in schools else first_from_school).append(i)
+        schools.add(result['school'])
+
+    def upload_team(i: int) -> Tuple[int, int] | None:
+        team_ids = _upload_team(job_id, results[i], school_ids)
+        if team_ids is None:
+            return None
+
+        alias_id, school_id = team_ids
+        journal.put(tab_event_id, 'schools', {results[i]['school']: school_id})
+        journal.put(tab_event_id, 'teams', {results[i]['team_id']: alias_id})
+
+        return alias_id, school_id
+
+    for wave in [first_from_school, rest]:
+        for i, team_ids in zip(wave, requests.map(upload_team, wave, max_workers)):
+            ids[i] = team_ids
+
+    return ids
+
+
+def _get_unique_judge_results(job_id: int | None, data: TransformedTournamentData) -> Mapping[str, TransformedJudgeResult]:
+    """Gets the first result of every judge in the division.
+
+    Args:
+        job_id (int | None): The job ID, for logging.
+        data (TransformedTournamentData): The transformed division.
+
+    Returns:
+        Mapping[str, TransformedJudgeResult]: The result of each judge.
+    """
+
+    judge_results: Mapping[str, TransformedJudgeResult] = {}
+    for result in data['judge_results']:
+        if result['judge_id'] in judge_results:
+            lprint(job_id, "Warning", message=f"Already scraped {result['judge_id']}")
+            continue
+        judge_results[result['judge_id']] = result
+
+    return judge_results
+
+
+def _upload_results(job_id: int | None, data: TransformedTournamentData, tournament_division_id: int, journal: UploadJournal, school_ids: Mapping[str, int], max_workers: int | None = None) -> int:
+    """Uploads a division's teams, results, judges, rounds, records and paradigms one row at a time. Each stage's
+    rows are uploaded concurrently, and stages start as soon as the IDs they need exist. Rows in the upload journal
+    are skipped, and uploaded rows are added to it.
+
+    Args:
+        job_id (int | None): The job ID, for logging.
+        data (TransformedTournamentData): The transformed division.
+        tournament_division_id (int): The ID of the uploaded division.
+        journal (UploadJournal): The upload journal.
+        school_ids (Mapping[str, int]): The ID of each school name already seen in this job, see `_upload_team`.
+        max_workers (int | None, optional): The maximum number of concurrent requests per stage. Defaults to None.
+
+    Returns:
+        int: The number of rows that couldn't be uploaded.
+    """
+
+    tab_event_id = data['tournament']['tab_event_id']
+
+    team_ids: List[Tuple[int, int] | None] = []
+    competing_school_ids = []
+
+    team_id_to_result_id = _get_journaled_result_ids(job_id, journal, tab_event_id, tournament_division_id, 'teamResults', 'results/teams', 'teamId')
+    judge_id_to_result_id = _get_journaled_result_ids(job_id, journal, tab_event_id, tournament_division_id, 'judgeResults', 'results/judges', 'judgeId')
+    failures: List[int] = []
+
+    # Create teams & all schools/aliases
+    def upload_teams():
+        team_ids.extend(_upload_teams(job_id, data['team_results'], school_ids, journal, tab_event_id, max_workers))
+        failures.append(team_ids.count(None))
 
         # Add schools to list if not already in
-        if school_id not in competing_school_ids:
-            competing_school_ids.append(school_id)
+        for _, school_id in filter(None, team_ids):
+            if school_id not in competing_school_ids:
+                competing_school_ids.append(school_id)
+
+    # Create team results
+    def upload_team_results():
+        def upload_team_result(i: int) -> str | None:
+            result = data['team_results'][i]
+            result_body = _get_result_body(result, *team_ids[i])
+            result_body['divisionId'] = tournament_division_id
 
-    if len(team_upload_messages):
-        lprint(job_id, "Error", message="\n".join(team_upload_messages))
+            result_res = requests.post(
+                f'{API_BASE}/results/teams', json=result_body)
+
+            if result_res.status_code != 200:
+                # raise TypeError("Invalid API Response. " + message)
+                return f"Could not upsert team result. {result_res.text}"
+
+            team_id_to_result_id[result['team_id']] = result_res.json()['id']
+            journal.put(tab_event_id, 'teamResults', {result['team_id']: team_id_to_result_id[result['team_id']]})
+
+        team_upload_messages = list(filter(None, requests.map(upload_team_result, filter(
+            lambda i: team_ids[i] and data['team_results'][i]['team_id'] not in team_id_to_result_id, range(len(data['team_results']))), max_workers)))
+
+        if len(team_upload_messages):
+            failures.append(len(team_upload_messages))
+            lprint(job_id, "Error", message="\n".join(team_upload_messages))
 
     # TODO: connect all schools to the tournament event
-    for school_id in competing_school_ids:
-        requests.patch(f"{API_BASE}/schools/{school_id}", json={
+    def connect_schools():
+        requests.map(lambda school_id: requests.patch(f"{API_BASE}/schools/{school_id}", json={
             "divisions": {
                 "connect": {
-                    "tabEventId": tournament_division_body['tabEventId']
+                    "tabEventId": tab_event_id
                 }
             }
-        })
+        }), competing_school_ids, max_workers)
 
     #  Create all judges and their results
-    for result in data['judge_results']:
-        if result['judge_id'] in judge_id_to_result_id:
-            lprint(job_id, "Warning", message=f"Already scraped {result['judge_id']}")
-            continue
+    def upload_judges():
+        def upload_judge(result: TransformedJudgeResult) -> bool:
+            judge_body = {
+                'id': result['judge_id'],
+                'name': result['name']
+            }
 
-        judge_body = {
-            'id': result['judge_id'],
-            'name': result['name']
-        }
+            # TODO: School affiliation
+            judge_res = requests.post(f'{API_BASE}/judges/advanced/upsert', json={
+                'where': {
+                    'id': result['judge_id']
+                },
+                'create': judge_body,
+                'update': {}
+            })
+
+            result_body = _get_judge_result_body(result)
+            result_body['divisionId'] = tournament_division_id
+
+            result_res = requests.post(
+                f'{API_BASE}/results/judges', json=result_body)
+            try:
+                judge_id_to_result_id[result['judge_id']] = result_res.json()['id']
+            except Exception:
+                return False  # Merge results a second time by tabJudgeId in transformer
+
+            journal.put(tab_event_id, 'judgeResults', {result['judge_id']: judge_id_to_result_id[result['judge_id']]})
+            return True
+
+        failures.append(requests.map(upload_judge, filter(
+            lambda r: r['judge_id'] not in judge_id_to_result_id, _get_unique_judge_results(job_id, data).values()), max_workers).count(False))
+
+    # Create rounds
+    def upload_rounds():
+        uploaded = journal.get(tab_event_id, 'rounds')
+
+        def upload_round(_round: TransformedRound) -> bool:
+            round_body = _get_round_body(_round)
+            round_body['resultId'] = team_id_to_result_id[_round['team_id']]
+
+            round_res = requests.post(f'{API_BASE}/rounds/advanced/create', json={
+                "data": round_body
+            })
+            if round_res.status_code != 200:
+                print(round_body)
+                # input("Continue: ")
+                return False
+
+            journal.put(tab_event_id, 'rounds', {_get_round_key(_round): round_res.json()['id']})
+            return True
+
+        failures.append(requests.map(upload_round, filter(
+            lambda r: r['team_id'] in team_id_to_result_id and _get_round_key(r) not in uploaded, data['rounds']), max_workers).count(False))
+
+    # Create records
+    def upload_records():
+        uploaded = journal.get(tab_event_id, 'records')
+
+        def upload_record(record: TransformedRecord) -> bool:
+            record_body = _get_record_body(record, data['tournament']['event'], team_id_to_result_id)
+            record_body['resultId'] = judge_id_to_result_id[record['judge_id']]
+
+            record_res = requests.post(
+                f'{API_BASE}/judge-records', json=record_body)
+            if record_res.status_code != 200:
+                # input("Err: ")
+                return False
 
-        # TODO: School affiliation
-        judge_res = requests.post(f'{API_BASE}/judges/advanced/upsert', json={
+            journal.put(tab_event_id, 'records', {_get_record_key(record): record_res.json()['id']})
+            return True
+
+        records = [
+            record for record in data['records']
+            if record['judge_id'] in judge_id_to_result_id and _get_record_key(record) not in uploaded
+            and all(map(lambda id: id in team_id_to_result_id, record['teams']))
+        ]
+
+        failures.append(requests.map(upload_record, records, max_workers).count(False))
+
+    def upload_paradigms():
+        failures.append(_upload_paradigms(data, journal, max_workers))
+
+    run_stages([
+        UploadStage('teams', upload_teams),
+        UploadStage('team_results', upload_team_results, ['teams']),
+        UploadStage('schools', connect_schools, ['teams']),
+        UploadStage('judges', upload_judges),
+        UploadStage('rounds', upload_rounds, ['team_results']),
+        # Records connect the rounds they decided
+        UploadStage('records', upload_records, ['rounds', 'judges']),
+        UploadStage('paradigms', upload_paradigms, ['judges'])
+    ])
+
+    return sum(failures)
+
+
+def _create_nested(job_id: int | None, tab_event_id: int, relation: str, rows: List[dict], keys: List[str], journal: UploadJournal, children: Tuple[str, List[List[str]]] | None = None, max_workers: int | None = None) -> int:
+    """Creates rows related to a division (with any nested creates/connects) in size-limited batches, each a single
+    nested write on the division. Each batch is created atomically, and recorded in the upload journal under the
+    relation once created, without IDs (see `_get_journaled_result_ids`). Their nested children are recorded too, so
+    that resuming one row at a time doesn't create them again.
+
+    Args:
+        job_id (int | None): The job ID, for logging.
+        tab_event_id (int): The unique ID assigned to the event, visible in the `event_id` query parameter.
+        relation (str): The division's relation to create the rows under, e.g. `teamResults`.
+        rows (List[dict]): The create bodies of the rows, without their division.
+        keys (List[str]): The natural key of each row.
+        journal (UploadJournal): The upload journal.
+        children (Tuple[str, List[List[str]]] | None, optional): The journal kind of the rows' nested children (e.g.
+        `rounds`) and the natural keys of each row's children. Defaults to None.
+        max_workers (int | None, optional): The maximum number of concurrent batches. Defaults to None.
+
+    Returns:
+        int: The number of rows that couldn't be created.
+    """
+
+    chunks = list(_chunk_rows(rows))
+    starts = [0]
+    for chunk in chunks[:-1]:
+        starts.append(starts[-1] + len(chunk))
+
+    def create_chunk(i: int) -> int:
+        res = requests.post(f'{API_BASE}/tournaments/divisions/advanced/update', json={
             'where': {
-                'id': result['judge_id']
+                'tabEventId': tab_event_id
             },
-            'create': judge_body,
-            'update': {}
+            'data': {
+                relation: {
+                    'create': chunks[i]
+                }
+            },
+            'select': {
+                'id': True
+            }
         })
 
-        result_body = {
-            'judgeId': result['judge_id'],
-            'tabJudgeId': result['tab_judge_id'],
-            'avgRawPoints': result['avg_raw_points'],
-            'avgAdjPoints': result['avg_adj_points'],
-            'stdDevPoints': result['std_dev_points'],
-            'numPrelims': result['num_prelims'],
-            'numScrews': result['num_screws'],
-            'numElims': result['num_elims'],
-            'numSquirrels': result['num_squirrels'],
-            'numPro': result['num_pro'],
-            'numCon': result['num_con'],
+        if res.status_code != 200:
+            lprint(job_id, "Error", message=f"Could not create {len(chunks[i])} {relation}. {res.text}")
+            return len(chunks[i])
+
+        journal.put(tab_event_id, relation, dict.fromkeys(keys[starts[i]:starts[i] + len(chunks[i])]))
+        if children:
+            kind, child_keys = children
+            journal.put(tab_event_id, kind, dict.fromkeys(
+                key for row_keys in child_keys[starts[i]:starts[i] + len(chunks[i])] for key in row_keys))
+
+        return 0
+
+    return sum(requests.map(create_chunk, range(len(chunks)), max_workers))
+
+
+def _find_result_ids(job_id: int | None, table: str, key: str, tournament_division_id: int) -> Mapping[str, int] | None:
+    """Gets the IDs of a division's stored team or judge results, e.g. after creating them in batches.
+
+    Args:
+        job_id (int | None): The job ID, for logging.
+        table (str): The API path of the results, `results/teams` or `results/judges`.
+        key (str): The results' natural key, `teamId` or `judgeId`.
+        tournament_division_id (int): The ID of the uploaded division.
+
+    Returns:
+        Mapping[str, int] | None: The result ID of each team or judge ID, or None if they couldn't be read.
+    """
+
+    res = requests.post(f'{API_BASE}/{table}/advanced/findMany', json={
+        'where': {
             'divisionId': tournament_division_id
+        },
+        'select': {
+            'id': True,
+            key: True
         }
+    })
 
-        result_res = requests.post(
-            f'{API_BASE}/results/judges', json=result_body)
-        try:
-            judge_id_to_result_id[result['judge_id']] = result_res.json()['id']
-        except Exception:
-            ...  # Merge results a second time by tabJudgeId in transformer
+    if res.status_code != 200:
+        lprint(job_id, "Error", message=f"Could not find {table}. {res.text}")
+        return None
 
-    # Create rounds
+    return {result[key]: result['id'] for result in res.json()}
+
+
+def _get_journaled_result_ids(job_id: int | None, journal: UploadJournal, tab_event_id: int, tournament_division_id: int, kind: str, table: str, key: str) -> Mapping[str, int]:
+    """Gets the IDs of the team or judge results in the upload journal. Results created in batches are journaled
+    before their IDs are known, so those are read back from the API.
+
+    Args:
+        job_id (int | None): The job ID, for logging.
+        journal (UploadJournal): The upload journal.
+        tab_event_id (int): The unique ID assigned to the event, visible in the `event_id` query parameter.
+        tournament_division_id (int): The ID of the uploaded division.
+        kind (str): The journal kind of the results, `teamResults` or `judgeResults`.
+        table (str): The API path of the results, see `_find_result_ids`.
+        key (str): The results' natural key, see `_find_result_ids`.
+
+    Raises:
+        Exception: Thrown if the unknown IDs couldn't be read, since resuming without them would duplicate results.
+
+    Returns:
+        Mapping[str, int]: The result ID of each journaled team or judge ID.
+    """
+
+    ids = journal.get(tab_event_id, kind)
+    unknown = [id for id, result_id in ids.items() if result_id is None]
+
+    if unknown:
+        stored = _find_result_ids(job_id, table, key, tournament_division_id)
+        if stored is None:
+            raise Exception(f"Could not resume uploading the {kind} of division {tab_event_id}.")
+
+        ids = {id: result_id if result_id is not None else stored.get(id) for id, result_id in ids.items()}
+        ids = {id: result_id for id, result_id in ids.items() if result_id is not None}
+        journal.put(tab_event_id, kind, {id: ids[id] for id in unknown if id in ids})
+
+    return ids
+
+
+def _get_waiting_judge_ids(data: TransformedTournamentData, team_id_to_result_id: Mapping[str, int]) -> Set[str]:
+    """Gets the judges with records against a team of the division whose result hasn't been uploaded (yet).
+
+    Args:
+        data (TransformedTournamentData): The transformed division.
+        team_id_to_result_id (Mapping[str, int]): The result ID of each uploaded team.
+
+    Returns:
+        Set[str]: The judges' IDs.
+    """
+
+    team_ids = set(map(lambda result: result['team_id'], data['team_results']))
+
+    return {
+        record['judge_id'] for record in data['records']
+        if any(map(lambda id: id in team_ids and id not in team_id_to_result_id, record['teams']))
+    }
+
+
+def _upload_results_bulk(job_id: int | None, data: TransformedTournamentData, tournament_division_id: int, journal: UploadJournal, school_ids: Mapping[str, int], max_workers: int | None = None) -> int:
+    """Uploads a division's teams, results, judges, rounds, records and paradigms in batches. Results are created
+    with their speaks, bid and rounds, and judge results with their records, as batched nested writes on the
+    division, so an upload takes a few dozen requests beyond the team upserts. Each stage's requests run
+    concurrently, and stages start as soon as the IDs they need exist. Rows in the upload journal are skipped, and
+    uploaded rows are added to it.
+
+    Args:
+        job_id (int | None): The job ID, for logging.
+        data (TransformedTournamentData): The transformed division.
+        tournament_division_id (int): The ID of the uploaded division.
+        journal (UploadJournal): The upload journal.
+        school_ids (Mapping[str, int]): The ID of each school name already seen in this job, see `_upload_team`.
+        max_workers (int | None, optional): The maximum number of concurrent requests per stage. Defaults to None.
+
+    Returns:
+        int: The number of rows that couldn't be uploaded.
+    """
+
+    tab_event_id = data['tournament']['tab_event_id']
+    event = data['tournament']['event']
+
+    team_id_to_rounds: Mapping[str, List[TransformedRound]] = {}
     for _round in data['rounds']:
-        if _round['team_id'] not in team_id_to_result_id:
-            continue
+        team_id_to_rounds.setdefault(_round['team_id'], []).append(_round)
+
+    judge_results = _get_unique_judge_results(job_id, data)
+
+    competing_school_ids = []
+    result_bodies = []
+    result_keys = []
+    result_round_keys = []
+    team_id_to_result_id: Mapping[str, int] = {}
+    failures: List[int] = []
 
-        round_body = {
-            'name': _round['name'],
-            'nameStd': _round['name_std'],
-            'type': _round['type'],
-            'side': _round['side'],
-            'outcome': _round['outcome'],
-            'ballotsWon': _round['ballots_won'],
-            'ballotsLost': _round['ballots_lost'],
-            'opponentId': _round['opponent_id'],
-            'resultId': team_id_to_result_id[_round['team_id']],
-            'speaking': {
-                'create': _round['speaking']
+    # Teams connect competitors, schools and aliases, which can't be batched
+    def upload_teams():
+        uploaded = journal.get(tab_event_id, 'teamResults')
+
+        for result, team_ids in zip(data['team_results'], _upload_teams(job_id, data['team_results'], school_ids, journal, tab_event_id, max_workers)):
+            if team_ids is None:
+                failures.append(1)
+                continue
+
+            alias_id, school_id = team_ids
+            if school_id not in competing_school_ids:
+                competing_school_ids.append(school_id)
+
+            if result['team_id'] in uploaded:
+                continue
+
+            rounds = team_id_to_rounds.get(result['team_id'], [])
+            result_body = _get_result_body(result, alias_id, school_id)
+            result_body['rounds'] = {
+                'create': list(map(_get_round_body, rounds))
             }
-        }
+            result_bodies.append(result_body)
+            result_keys.append(result['team_id'])
+            result_round_keys.append(list(map(_get_round_key, rounds)))
+
+    # Results, with their speaks, bids, rounds and round speaks
+    def upload_team_results():
+        failures.append(_create_nested(job_id, tab_event_id, 'teamResults', result_bodies, result_keys, journal, ('rounds', result_round_keys), max_workers))
+
+        result_ids = _find_result_ids(job_id, 'results/teams', 'teamId', tournament_division_id)
+        if result_ids is None:
+            failures.append(len(data['team_results']))
+            return
 
-        round_res = requests.post(f'{API_BASE}/rounds/advanced/create', json={
-            "data": round_body
+        team_id_to_result_id.update(result_ids)
+        journal.put(tab_event_id, 'teamResults', team_id_to_result_id)
+
+    def connect_schools():
+        requests.post(f'{API_BASE}/tournaments/divisions/advanced/update', json={
+            'where': {
+                'tabEventId': tab_event_id
+            },
+            'data': {
+                'schools': {
+                    'connect': list(map(lambda id: {'id': id}, competing_school_ids))
+                }
+            },
+            'select': {
+                'id': True
+            }
         })
-        if round_res.status_code != 200:
-            print(round_body)
-            # input("Continue: ")
 
-    # Create records
-    for record in data['records']:
-        if record['judge_id'] not in judge_id_to_result_id:
+    def upload_judges():
+        failures.append(_create_judges(tab_event_id, list(judge_results.values()), journal, max_workers))
+
+    # Judge results with their records, which connect both teams' results and rounds
+    def upload_judge_results():
+        uploaded = journal.get(tab_event_id, 'judgeResults')
+
+        # Judge results are created with all their records at once, so those waiting on a team result that wasn't
+        # uploaded are held back until a retry uploads it
+        waiting = _get_waiting_judge_ids(data, team_id_to_result_id)
+
+        judge_id_to_records: Mapping[str, List[TransformedRecord]] = {}
+        for record in data['records']:
+            if record['judge_id'] not in judge_results or any(map(lambda id: id not in team_id_to_result_id, record['teams'])):
+                continue
+            judge_id_to_records.setdefault(record['judge_id'], []).append(record)
+
+        judge_result_bodies = []
+        judge_result_keys = []
+        judge_result_record_keys = []
+        for judge_id, result in judge_results.items():
+            if judge_id in uploaded:
+                continue
+            if judge_id in waiting:
+                failures.append(1)
+                continue
+
+            records = judge_id_to_records.get(judge_id, [])
+            result_body = _get_judge_result_body(result)
+            result_body['records'] = {
+                'create': list(map(lambda record: _get_record_body(record, event, team_id_to_result_id), records))
+            }
+            judge_result_bodies.append(result_body)
+            judge_result_keys.append(judge_id)
+            judge_result_record_keys.append(list(map(_get_record_key, records)))
+
+        failures.append(_create_nested(job_id, tab_event_id, 'judgeResults', judge_result_bodies, judge_result_keys, journal, ('records', judge_result_record_keys), max_workers))
+
+    def upload_paradigms():
+        failures.append(_upload_paradigms(data, journal, max_workers))
+
+    run_stages([
+        UploadStage('teams', upload_teams),
+        UploadStage('team_results', upload_team_results, ['teams']),
+        UploadStage('schools', connect_schools, ['teams']),
+        UploadStage('judges', upload_judges),
+        UploadStage('judge_results', upload_judge_results, ['team_results', 'judges']),
+        UploadStage('paradigms', upload_paradigms, ['judges'])
+    ])
+
+    return sum(failures)
+
+
+def _create_judges(tab_event_id: int, results: List[TransformedJudgeResult], journal: UploadJournal, max_workers: int | None = None) -> int:
+    """Creates the judges of judge results in batches, skipping those in the upload journal or already created.
+
+    Args:
+        tab_event_id (int): The unique ID assigned to the event, visible in the `event_id` query parameter.
+        results (List[TransformedJudgeResult]): The judges' results.
+        journal (UploadJournal): The upload journal.
+        max_workers (int | None, optional): The maximum number of concurrent batches. Defaults to None.
+
+    Returns:
+        int: The number of judges that couldn't be created.
+    """
+
+    uploaded = journal.get(tab_event_id, 'judges')
+    judges = [{'id': r['judge_id'], 'name': r['name']} for r in results if r['judge_id'] not in uploaded]
+
+    def create_judges(chunk: List[dict]) -> int:
+        res = requests.post(f'{API_BASE}/judges/advanced/createMany', json={
+            'data': chunk,
+            'skipDuplicates': True
+        })
+
+        if res.status_code != 200:
+            return len(chunk)
+
+        journal.put(tab_event_id, 'judges', dict.fromkeys(map(lambda judge: judge['id'], chunk)))
+        return 0
+
+    return sum(requests.map(create_judges, _chunk_rows(judges), max_workers))
+
+
+def _select(fields: List[str], **relations: dict) -> dict:
+    """Builds a select of scalar fields and related rows.
+
+    Args:
+        fields (List[str]): The scalar fields.
+        relations (dict): The select of each relation.
+
+    Returns:
+        dict: The select.
+    """
+
+    return {
+        'select': {
+            **dict.fromkeys(fields, True),
+            **relations
+        }
+    }
+
+
+def _get_division_snapshot(tab_event_id: int) -> dict | None:
+    """Gets everything stored for a division that the uploader can diff against, in a single request.
+
+    Args:
+        tab_event_id (int): The unique ID assigned to the event, visible in the `event_id` query parameter.
+
+    Returns:
+        dict | None: The division's connected schools, and its team and judge results with their speaks, bids, rounds
+        and records, or None if the division isn't stored.
+    """
+
+    res = requests.post(f'{API_BASE}/tournaments/divisions/advanced/findUnique', json={
+        'where': {
+            'tabEventId': tab_event_id
+        },
+        **_select(['id'],
+            schools=_select(['id']),
+            teamResults=_select(['id', 'teamId'] + TEAM_RESULT_FIELDS,
+                alias=_select(['code']),
+                school=_select(['name']),
+                speaking=_select(TOURNAMENT_SPEAK_FIELDS),
+                bid=_select(BID_FIELDS),
+                rounds=_select(['id', 'nameStd'] + ROUND_FIELDS,
+                    speaking=_select(ROUND_SPEAK_FIELDS)
+                )
+            ),
+            judgeResults=_select(['id', 'judgeId'] + JUDGE_RESULT_FIELDS,
+                records=_select(['id', 'judgeId'] + RECORD_FIELDS,
+                    teams=_select(['id']),
+                    rounds=_select(['nameStd'])
+                )
+            )
+        )
+    })
+
+    if res.status_code != 200:
+        return None
+
+    return res.json() or None
+
+
+def _get_stored_record_key(record: dict) -> str:
+    """Gets the natural key of a stored judge record, see `_get_record_key`.
+
+    Args:
+        record (dict): The stored record, from the division snapshot.
+
+    Returns:
+        str: The judge's ID, the round's standardized name and the teams' IDs.
+    """
+
+    name_std = record['rounds'][0]['nameStd'] if record['rounds'] else None
+
+    return f"{record['judgeId']}|{name_std}|{','.join(sorted(map(lambda team: team['id'], record['teams'])))}"
+
+
+def _get_result_update(stored: dict, result_body: dict, round_match: RowMatch) -> dict:
+    """Builds the update of a stored team result from its new create body, including its speaks, bid and rounds.
+
+    Args:
+        stored (dict): The stored result, from the division snapshot.
+        result_body (dict): The result's create body, including its rounds.
+        round_match (RowMatch): The result's rounds matched with the stored rounds by standardized name.
+
+    Returns:
+        dict: The changed fields and nested writes, empty if nothing changed.
+    """
+
+    data = diff_fields(stored, result_body, TEAM_RESULT_FIELDS)
+
+    speaks = result_body['speaking']['create']
+    if not same_rows(stored['speaking'], speaks, TOURNAMENT_SPEAK_FIELDS):
+        data['speaking'] = {
+            'deleteMany': {},
+            'create': speaks
+        }
+
+    bid = result_body['bid']['create'] if 'bid' in result_body else None
+    if bid is None and stored['bid']:
+        data['bid'] = {
+            'delete': True
+        }
+    elif bid is not None and (not stored['bid'] or diff_fields(stored['bid'], bid, BID_FIELDS)):
+        data['bid'] = {
+            'upsert': {
+                'create': bid,
+                'update': {field: bid[field] for field in BID_FIELDS}
+            }
+        }
+
+    round_bodies = result_body['rounds']['create']
+    round_creates = [round_bodies[i] for i in round_match['inserts']]
+    round_updates = []
+    for round_body in round_bodies:
+        stored_round = round_match['matches'].get(round_body['nameStd'])
+        if stored_round is None:
             continue
 
-        record_body = {
-            'decision': record['decision'],
-            'avgPoints': record['avg_points'],
-            'wasSquirrel': record['was_squirrel'],
-            'judgeId': record['judge_id'],
-            'teams': {
-                'connect': list(map(
-                    lambda id: {'id': id},
-                    record['teams']
-                ))
-            },
-            'winnerId': record['winner_id'],
-            'type': record['type'],
-            'event': data['tournament']['event'],
-            'resultId': judge_id_to_result_id[record['judge_id']],
-            'rounds': {
-                'connect': list(map(
-                    lambda team_id: {
-                        'nameStd_resultId': {
-                            'nameStd': record['round_name_std'],
-                            'resultId': team_id_to_result_id[team_id]
-                        }
-                    },
-                    record['teams']
-                ))
+        round_data = diff_fields(stored_round, round_body, ROUND_FIELDS)
+        if not same_rows(stored_round['speaking'], round_body['speaking']['create'], ROUND_SPEAK_FIELDS):
+            round_data['speaking'] = {
+                'deleteMany': {},
+                'create': round_body['speaking']['create']
             }
+
+        if round_data:
+            round_updates.append({
+                'where': {
+                    'id': stored_round['id']
+                },
+                'data': round_data
+            })
+
+    if round_creates or round_updates:
+        data['rounds'] = {
+            'create': round_creates,
+            'update': round_updates
         }
 
-        record_res = requests.post(
-            f'{API_BASE}/judge-records', json=record_body)
-        if record_res.status_code != 200:
-            # input("Err: ")
-            ...
-
-    # Create paradigms
-    for paradigm in data['paradigms']:
-        paradigm_body = {
-            'id': paradigm['hash'],
-            'scrapedAt': paradigm['scraped_at'],
-            'text': paradigm['text'],
-            'html': paradigm['html'],
-            'judge': {
-                'connect': {
-                    'id': paradigm['judge_id']
+    return data
+
+
+def _update_nested(job_id: int | None, tab_event_id: int, relation: str, updates: List[dict], max_workers: int | None = None) -> int:
+    """Updates rows related to a division (with any nested writes) in size-limited batches, each a single nested
+    write on the division, see `_create_nested`.
+
+    Args:
+        job_id (int | None): The job ID, for logging.
+        tab_event_id (int): The unique ID assigned to the event, visible in the `event_id` query parameter.
+        relation (str): The division's relation the rows are under, e.g. `teamResults`.
+        updates (List[dict]): The `where` and `data` of each row's update.
+        max_workers (int | None, optional): The maximum number of concurrent batches. Defaults to None.
+
+    Returns:
+        int: The number of rows that couldn't be updated.
+    """
+
+    def update_chunk(chunk: List[dict]) -> int:
+        res = requests.post(f'{API_BASE}/tournaments/divisions/advanced/update', json={
+            'where': {
+                'tabEventId': tab_event_id
+            },
+            'data': {
+                relation: {
+                    'update': chunk
                 }
             },
-            'flowRating': paradigm['flow_confidence'],
-            'progressiveRating': paradigm['progressive_confidence'],
-            'emails': {
-                'connectOrCreate': list(map(lambda e: {
-                    'create': {
-                        'email': e
-                    },
+            'select': {
+                'id': True
+            }
+        })
+
+        if res.status_code != 200:
+            lprint(job_id, "Error", message=f"Could not update {len(chunk)} {relation}. {res.text}")
+            return len(chunk)
+
+        return 0
+
+    return sum(requests.map(update_chunk, _chunk_rows(updates), max_workers))
+
+
+def _delete_many(job_id: int | None, table: str, where: dict, count: int) -> int:
+    """Deletes rows matching a filter.
+
+    Args:
+        job_id (int | None): The job ID, for logging.
+        table (str): The API path of the table, e.g. `rounds`.
+        where (dict): The filter.
+        count (int): The number of parent rows the filter selects by, for reporting failures.
+
+    Returns:
+        int: `count` if the rows couldn't be deleted, otherwise 0.
+    """
+
+    res = requests.post(f'{API_BASE}/{table}/advanced/deleteMany', json={
+        'where': where
+    })
+
+    if res.status_code != 200:
+        lprint(job_id, "Error", message=f"Could not delete {table}. {res.text}")
+        return count
+
+    return 0
+
+
+def _upload_results_diff(job_id: int | None, data: TransformedTournamentData, tournament_division_id: int, snapshot: dict, journal: UploadJournal, school_ids: Mapping[str, int], max_workers: int | None = None) -> int:
+    """Re-uploads a division that is already stored, matching team results by team, rounds by standardized name,
+    judge results by judge and records by round and teams, and sending only the rows that were inserted, changed or
+    deleted since the last upload. Teams are only upserted if their alias or school changed.
+
+    Args:
+        job_id (int | None): The job ID, for logging.
+        data (TransformedTournamentData): The transformed division.
+        tournament_division_id (int): The ID of the uploaded division.
+        snapshot (dict): The stored division, see `_get_division_snapshot`.
+        journal (UploadJournal): The upload journal.
+        school_ids (Mapping[str, int]): The ID of each school name already seen in this job, see `_upload_team`.
+        max_workers (int | None, optional): The maximum number of concurrent requests per stage. Defaults to None.
+
+    Returns:
+        int: The number of rows that couldn't be uploaded.
+    """
+
+    tab_event_id = data['tournament']['tab_event_id']
+    event = data['tournament']['event']
+
+    # Rounds are unique by standardized name within a result, so only the first round of each name is uploaded, as
+    # `match_rows` keeps the first stored round of each name
+    team_id_to_rounds: Mapping[str, List[TransformedRound]] = {}
+    round_names = set()
+    for _round in data['rounds']:
+        if (_round['team_id'], _round['name_std']) in round_names:
+            continue
+        round_names.add((_round['team_id'], _round['name_std']))
+        team_id_to_rounds.setdefault(_round['team_id'], []).append(_round)
+
+    judge_results = _get_unique_judge_results(job_id, data)
+    judge_id_to_records: Mapping[str, List[TransformedRecord]] = {}
+    for record in data['records']:
+        judge_id_to_records.setdefault(record['judge_id'], []).append(record)
+
+    # Match everything up front, so rows can be deleted while teams are upserted
+    team_match = match_rows(snapshot['teamResults'], [r['team_id'] for r in data['team_results']], lambda r: r['teamId'])
+    round_matches: Mapping[str, RowMatch] = {
+        team_id: match_rows(stored['rounds'], [r['name_std'] for r in team_id_to_rounds.get(team_id, [])], lambda r: r['nameStd'])
+        for team_id, stored in team_match['matches'].items()
+    }
+    judge_match = match_rows(snapshot['judgeResults'], list(judge_results.keys()), lambda r: r['judgeId'])
+    record_matches: Mapping[str, RowMatch] = {
+        judge_id: match_rows(stored['records'], list(map(_get_record_key, judge_id_to_records.get(judge_id, []))), _get_stored_record_key)
+        for judge_id, stored in judge_match['matches'].items()
+    }
+
+    deleted_team_results = set(team_match['deletes'])
+    deleted_judge_results = set(judge_match['deletes'])
+    deleted_rounds = [r['id'] for stored in snapshot['teamResults'] if stored['id'] in deleted_team_results for r in stored['rounds']] + \
+        [id for match in round_matches.values() for id in match['deletes']]
+    deleted_records = [r['id'] for stored in snapshot['judgeResults'] if stored['id'] in deleted_judge_results for r in stored['records']] + \
+        [id for match in record_matches.values() for id in match['deletes']]
+
+    stored_school_ids = set(map(lambda school: school['id'], snapshot['schools']))
+    competing_school_ids = []
+    result_bodies = []
+    result_keys = []
+    result_round_keys = []
+    result_updates = []
+    team_id_to_result_id: Mapping[str, int] = {team_id: stored['id'] for team_id, stored in team_match['matches'].items()}
+    failures: List[int] = []
+
+    # Children go before their parents
+    def delete_rows():
+        for table, where, ids in [
+            ('judge-records', lambda ids: {'id': {'in': ids}}, deleted_records),
+            ('speaking/rounds', lambda ids: {'round': {'id': {'in': ids}}}, deleted_rounds),
+            ('rounds', lambda ids: {'id': {'in': ids}}, deleted_rounds),
+            ('speaking/tournaments', lambda ids: {'result': {'id': {'in': ids}}}, list(deleted_team_results)),
+            ('bids', lambda ids: {'result': {'id': {'in': ids}}}, list(deleted_team_results)),
+            ('results/teams', lambda ids: {'id': {'in': ids}}, list(deleted_team_results)),
+            ('results/judges', lambda ids: {'id': {'in': ids}}, list(deleted_judge_results)),
+        ]:
+            if ids:
+                failures.append(_delete_many(job_id, table, where(ids), len(ids)))
+
+    # Teams whose alias and school are unchanged keep their stored IDs
+    def upload_teams():
+        team_ids: List[Tuple[int, int] | None] = []
+        changed = []
+        for result in data['team_results']:
+            stored = team_match['matches'].get(result['team_id'])
+            if stored and stored['alias'] and stored['alias']['code'] == result['code'] and stored['school'] and stored['school']['name'] == result['school']:
+                team_ids.append((stored['aliasId'], stored['schoolId']))
+            else:
+                team_ids.append(None)
+                changed.append(result)
+
+        changed_ids = iter(_upload_teams(job_id, changed, school_ids, journal, tab_event_id, max_workers))
+
+        for result, ids in zip(data['team_results'], team_ids):
+            ids = ids or next(changed_ids)
+            if ids is None:
+                failures.append(1)
+                continue
+
+            alias_id, school_id = ids
+            if school_id not in competing_school_ids:
+                competing_school_ids.append(school_id)
+
+            result_body = _get_result_body(result, alias_id, school_id)
+            result_body['rounds'] = {
+                'create': list(map(_get_round_body, team_id_to_rounds.get(result['team_id'], [])))
+            }
+
+            stored = team_match['matches'].get(result['team_id'])
+            if stored is None:
+                result_bodies.append(result_body)
+                result_keys.append(result['team_id'])
+                result_round_keys.append(list(map(_get_round_key, team_id_to_rounds.get(result['team_id'], []))))
+                continue
+
+            result_update = _get_result_update(stored, result_body, round_matches[result['team_id']])
+            if result_update:
+                result_updates.append({
                     'where': {
-                        'email': e
-                    }
-                }, paradigm['emails']))
-            },
-            'links': {
-                'connectOrCreate': list(map(lambda l: {
-                    'create': {
-                        'href': l
+                        'id': stored['id']
                     },
-                    'where': {
-                        'href': l
-                    }
-                }, paradigm['links']))
+                    'data': result_update
+                })
+
+    def upload_team_results():
+        failures.append(_create_nested(job_id, tab_event_id, 'teamResults', result_bodies, result_keys, journal, ('rounds', result_round_keys), max_workers))
+        failures.append(_update_nested(job_id, tab_event_id, 'teamResults', result_updates, max_workers))
+
+        if result_bodies:
+            result_ids = _find_result_ids(job_id, 'results/teams', 'teamId', tournament_division_id)
+            if result_ids is None:
+                failures.append(len(result_bodies))
+                return
+
+            team_id_to_result_id.update(result_ids)
+
+    def connect_schools():
+        new_school_ids = [id for id in competing_school_ids if id not in stored_school_ids]
+        if not new_school_ids:
+            return
+
+        requests.post(f'{API_BASE}/tournaments/divisions/advanced/update', json={
+            'where': {
+                'tabEventId': tab_event_id
+            },
+            'data': {
+                'schools': {
+                    'connect': list(map(lambda id: {'id': id}, new_school_ids))
+                }
+            },
+            'select': {
+                'id': True
             }
-        }
+        })
 
-        paradigm_res = requests.post(
-            f'{API_BASE}/paradigms', json=paradigm_body)
+    # Judges of stored judge results already exist
+    def upload_judges():
+        failures.append(_create_judges(tab_event_id, [r for r in judge_results.values() if r['judge_id'] not in judge_match['matches']], journal, max_workers))
 
-    # Runtime tests
-    # process_runtime_tests(job_id, data)
\ No newline at end of file
+    def upload_judge_results():
+        # Judges with records against a team result that wasn't uploaded are left for a retry to diff again
+        waiting = _get_waiting_judge_ids(data, team_id_to_result_id)
+
+        judge_result_bodies = []
+        judge_result_keys = []
+        judge_result_record_keys = []
+        judge_result_updates = []
+        for judge_id, result in judge_results.items():
+            if judge_id in waiting:
+                failures.append(1)
+                continue
+
+            records = [
+                record for record in judge_id_to_records.get(judge_id, [])
+                if all(map(lambda id: id in team_id_to_result_id, record['teams']))
+            ]
+            result_body = _get_judge_result_body(result)
+
+            stored = judge_match['matches'].get(judge_id)
+            if stored is None:
+                result_body['records'] = {
+                    'create': list(map(lambda record: _get_record_body(record, event, team_id_to_result_id), records))
+                }
+                judge_result_bodies.append(result_body)
+                judge_result_keys.append(judge_id)
+                judge_result_record_keys.append(list(map(_get_record_key, records)))
+                continue
+
+            result_update = diff_fields(stored, result_body, JUDGE_RESULT_FIELDS)
+            record_creates = []
+            record_updates = []
+            for record in records:
+                record_body = _get_record_body(record, event, team_id_to_result_id)
+                stored_record = record_matches[judge_id]['matches'].get(_get_record_key(record))
+
+                if stored_record is None:
+                    record_creates.append(record_body)
+                elif record_data := diff_fields(stored_record, record_body, RECORD_FIELDS):
+                    record_updates.append({
+                        'where': {
+                            'id': stored_record['id']
+                        },
+                        'data': record_data
+                    })
+
+            if record_creates or record_updates:
+                result_update['records'] = {
+                    'create': record_creates,
+                    'update': record_updates
+                }
+
+            if result_update:
+                judge_result_updates.append({
+                    'where': {
+                        'id': stored['id']
+                    },
+                    'data': result_update
+                })
+
+        failures.append(_create_nested(job_id, tab_event_id, 'judgeResults', judge_result_bodies, judge_result_keys, journal, ('records', judge_result_record_keys), max_workers))
+        failures.append(_update_nested(job_id, tab_event_id, 'judgeResults', judge_result_updates, max_workers))
+
+    def upload_paradigms():
+        failures.append(_upload_paradigms(data, journal, max_workers))
+
+    run_stages([
+        UploadStage('deletes', delete_rows),
+        UploadStage('teams', upload_teams),
+        UploadStage('team_results', upload_team_results, ['teams', 'deletes']),
+        UploadStage('schools', connect_schools, ['teams']),
+        UploadStage('judges', upload_judges),
+        UploadStage('judge_results', upload_judge_results, ['team_results', 'judges', 'deletes']),
+        UploadStage('paradigms', upload_paradigms, ['judges'])
+    ])
+
+    return sum(failures)
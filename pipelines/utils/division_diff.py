@@ -0,0 +1,100 @@
+from typing import Callable, Hashable, List, Mapping, Sequence, Tuple, TypedDict
+
+"""Decimal places floats are compared to, so values recomputed in a different order don't count as changes"""
+FLOAT_PLACES = 9
+
+
+class RowMatch(TypedDict):
+    matches: Mapping[Hashable, dict]
+    inserts: List[int]
+    deletes: List[int]
+
+
+def _normalize(value):
+    """Normalizes a field's value for comparison, rounding numbers so that ints, floats and floats a few ulps apart
+    compare equal.
+
+    Args:
+        value: The value.
+
+    Returns:
+        The normalized value.
+    """
+
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return round(float(value), FLOAT_PLACES)
+
+    return value
+
+
+def match_rows(stored: Sequence[dict], keys: Sequence[Hashable], stored_key: Callable[[dict], Hashable]) -> RowMatch:
+    """Matches the rows to upload with the stored rows by their natural keys.
+
+    Args:
+        stored (Sequence[dict]): The stored rows, each with an `id`.
+        keys (Sequence[Hashable]): The natural key of each row to upload.
+        stored_key (Callable[[dict], Hashable]): Gets the natural key of a stored row.
+
+    Returns:
+        RowMatch: The stored row of each key that is already stored, the indices of the rows to insert and the IDs of
+        the stored rows to delete. When several stored rows share a key, all but the first are deleted, and when
+        several rows to upload share a key, only the first is inserted.
+    """
+
+    key_to_stored: Mapping[Hashable, dict] = {}
+    deletes = []
+    for row in stored:
+        key = stored_key(row)
+        if key in key_to_stored:
+            deletes.append(row['id'])
+        else:
+            key_to_stored[key] = row
+
+    upload_keys = set(keys)
+    deletes.extend(row['id'] for key, row in key_to_stored.items() if key not in upload_keys)
+
+    inserts = []
+    inserted_keys = set()
+    for i, key in enumerate(keys):
+        if key not in key_to_stored and key not in inserted_keys:
+            inserts.append(i)
+            inserted_keys.add(key)
+
+    return {
+        'matches': {key: row for key, row in key_to_stored.items() if key in upload_keys},
+        'inserts': inserts,
+        'deletes': deletes
+    }
+
+
+def diff_fields(stored: dict, body: dict, fields: Sequence[str]) -> dict:
+    """Gets the fields of a row that changed since it was stored.
+
+    Args:
+        stored (dict): The stored row.
+        body (dict): The row to upload.
+        fields (Sequence[str]): The fields to compare.
+
+    Returns:
+        dict: The new value of every changed field.
+    """
+
+    return {field: body[field] for field in fields if _normalize(stored.get(field)) != _normalize(body.get(field))}
+
+
+def same_rows(stored: Sequence[dict], rows: Sequence[dict], fields: Sequence[str]) -> bool:
+    """Checks whether two unordered lists of child rows (e.g. a round's speaks) are the same.
+
+    Args:
+        stored (Sequence[dict]): The stored rows.
+        rows (Sequence[dict]): The rows to upload.
+        fields (Sequence[str]): The fields to compare.
+
+    Returns:
+        bool: Whether the lists hold the same rows, ignoring order.
+    """
+
+    def get_values(row: dict) -> Tuple:
+        return tuple(map(lambda field: _normalize(row.get(field)), fields))
+
+    return sorted(map(get_values, stored), key=repr) == sorted(map(get_values, rows), key=repr)
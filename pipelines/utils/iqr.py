@@ -1,4 +1,5 @@
 import numpy as np
+from .robust_stats import iqr_mask
 
 def apply_iqr(x: list) -> list:
     """Filters a list by removing outliers
@@ -9,13 +10,5 @@ def apply_iqr(x: list) -> list:
         list: The outlier-filtered list.
     """
 
-    a = np.array(x)
-    upper_quartile = np.percentile(a, 75)
-    lower_quartile = np.percentile(a, 25)
-    IQR = (upper_quartile - lower_quartile) * 1.5
-    quartileSet = (lower_quartile - IQR, upper_quartile + IQR)
-    resultList = []
-    for y in a.tolist():
-        if y >= quartileSet[0] and y <= quartileSet[1]:
-            resultList.append(y)
-    return resultList
\ No newline at end of file
+    a = np.asarray(x, dtype=float)
+    return a[iqr_mask(a)].tolist()
@@ -0,0 +1,115 @@
+import numpy as np
+from typing import TypedDict
+
+
+class DivisionComps(TypedDict):
+    op_wp_m: np.ndarray
+    op_wp_m_winning: np.ndarray
+    op_wp_m_losing: np.ndarray
+    round_rxr: np.ndarray
+    rxr: np.ndarray
+    otr_comp: np.ndarray
+
+
+def get_rxr(delta_pwp: np.ndarray) -> np.ndarray:
+    """Gets the RxR (round-by-round upset) contribution of a win over a stronger opponent.
+
+    Args:
+        delta_pwp (np.ndarray): The opponent's prelim win percentage minus the team's.
+
+    Returns:
+        np.ndarray: The RxR contribution of each round.
+    """
+
+    return .12 * np.sqrt((delta_pwp + 0.7)**16 / (0.5 + (delta_pwp + 0.7)**10))
+
+
+def get_round_rxrs(p_wp: np.ndarray, op_p_wp: np.ndarray, won: np.ndarray, is_elim: np.ndarray) -> np.ndarray:
+    """Gets the RxR contribution of every round. Only prelim wins over opponents with a higher pWp count.
+
+    Args:
+        p_wp (np.ndarray): The prelim win percentage of the team that debated each round.
+        op_p_wp (np.ndarray): The prelim win percentage of each round's opponent, NaN if unknown.
+        won (np.ndarray): Whether each round was won.
+        is_elim (np.ndarray): Whether each round was an elim.
+
+    Returns:
+        np.ndarray: The RxR contribution of each round, 0 for rounds that don't qualify.
+    """
+
+    delta_pwp = op_p_wp - p_wp
+    qualifies = ~np.isnan(delta_pwp) & (delta_pwp > 0) & won & ~is_elim
+
+    return np.where(qualifies, get_rxr(np.where(qualifies, delta_pwp, 0)), 0)
+
+
+def get_otr_comps(p_wp: np.ndarray, break_boost: np.ndarray, op_wp_m: np.ndarray, tournament_boost: np.ndarray | float, rxr: np.ndarray) -> np.ndarray:
+    """Gets the OTR Comp of every team.
+
+    Args:
+        p_wp (np.ndarray): Each team's prelim win percentage.
+        break_boost (np.ndarray): Each team's break boost (elim rounds debated + 1).
+        op_wp_m (np.ndarray): Each team's opWpM, NaN if unknown.
+        tournament_boost (np.ndarray | float): The difficulty multiplier of each team's tournament.
+        rxr (np.ndarray): Each team's total RxR.
+
+    Returns:
+        np.ndarray: Each team's OTR Comp, NaN where opWpM is unknown.
+    """
+
+    return (p_wp * break_boost * (op_wp_m + 0.625) * tournament_boost + rxr) / 3
+
+
+def _group_mean(team_idx: np.ndarray, values: np.ndarray, mask: np.ndarray, num_teams: int, empty: float) -> np.ndarray:
+    """Averages per-round values by team.
+
+    Args:
+        team_idx (np.ndarray): The team each round belongs to.
+        values (np.ndarray): The value of each round.
+        mask (np.ndarray): Which rounds to include.
+        num_teams (int): The number of teams.
+        empty (float): The mean of teams without any included rounds.
+
+    Returns:
+        np.ndarray: The mean of each team's included rounds.
+    """
+
+    counts = np.bincount(team_idx[mask], minlength=num_teams)
+    sums = np.bincount(team_idx[mask], weights=values[mask], minlength=num_teams)
+
+    return np.divide(sums, counts, out=np.full(num_teams, empty, dtype=float), where=counts > 0)
+
+
+def compute_division_comps(team_idx: np.ndarray, op_p_wp: np.ndarray, won: np.ndarray, is_elim: np.ndarray, p_wp: np.ndarray, break_boost: np.ndarray, tournament_boost: float) -> DivisionComps:
+    """Computes opWpM, opWpM in wins and losses, RxR and OTR Comp for a whole division in one batched pass.
+
+    Args:
+        team_idx (np.ndarray): For each round, the index of the team that debated it.
+        op_p_wp (np.ndarray): For each round, the opponent's prelim win percentage, NaN if there is no opponent with
+        prelim ballots (such rounds are ignored).
+        won (np.ndarray): For each round, whether it was won.
+        is_elim (np.ndarray): For each round, whether it was an elim.
+        p_wp (np.ndarray): For each team, its prelim win percentage.
+        break_boost (np.ndarray): For each team, its break boost (elim rounds debated + 1).
+        tournament_boost (float): The difficulty multiplier of the tournament.
+
+    Returns:
+        DivisionComps: Per-team stats (opWpM is NaN for teams without any valid rounds, opWpM in wins and losses
+        default to 0) and each round's RxR contribution.
+    """
+
+    num_teams = len(p_wp)
+    valid = ~np.isnan(op_p_wp)
+
+    op_wp_m = _group_mean(team_idx, op_p_wp, valid, num_teams, np.nan)
+    round_rxr = get_round_rxrs(p_wp[team_idx], op_p_wp, won, is_elim)
+    rxr = np.bincount(team_idx, weights=round_rxr, minlength=num_teams)
+
+    return {
+        'op_wp_m': op_wp_m,
+        'op_wp_m_winning': _group_mean(team_idx, op_p_wp, valid & won, num_teams, 0),
+        'op_wp_m_losing': _group_mean(team_idx, op_p_wp, valid & ~won, num_teams, 0),
+        'round_rxr': round_rxr,
+        'rxr': rxr,
+        'otr_comp': get_otr_comps(p_wp, break_boost, op_wp_m, tournament_boost, rxr)
+    }
@@ -0,0 +1,131 @@
+import numpy as np
+from typing import List, Mapping, Tuple
+from .robust_stats import grouped_stats
+
+
+class RecordTable:
+    """A columnar table of a division's judge records, with one row per judge, round and matchup. Ballots from the
+    same judge in the same matchup (one from each team's entry page) are merged into a single row.
+
+    Attributes:
+        judge_ids (List[str]): The UUID of each judge, in order of first appearance.
+        judge_first_row (List[int]): The first row of each judge.
+        judge_idx (List[int]): The judge (index into `judge_ids`) of each row.
+        judge_round_idx (List[int]): The first appearance of each row's (judge, round) pair, used to order rows.
+        records (List[dict]): The first record of each row, which becomes the merged record.
+        rounds (List[dict]): The first round of each row.
+        teams (List[List[str]]): The UUIDs of the teams whose ballots were merged into each row.
+        speaking (List[List[dict]]): The speaks of every ballot merged into each row.
+        speak_row (List[int]): The row of each speak.
+        speak_points (List[float]): The points of each speak.
+    """
+
+    def __init__(self):
+        self.judge_ids: List[str] = []
+        self.judge_first_row: List[int] = []
+        self.judge_idx: List[int] = []
+        self.judge_round_idx: List[int] = []
+        self.records: List[dict] = []
+        self.rounds: List[dict] = []
+        self.teams: List[List[str]] = []
+        self.speaking: List[List[dict]] = []
+        self.speak_row: List[int] = []
+        self.speak_points: List[float] = []
+
+        self._judge_to_idx: Mapping[str, int] = {}
+        self._judge_round_to_idx: Mapping[Tuple[str, str], int] = {}
+        self._key_to_row: Mapping[Tuple[str, str, str], int] = {}
+
+    def add(self, judge_id: str, matchup_id: str, round: dict, record: dict) -> None:
+        """Adds a ballot, merging it into its matchup's row if the judge's ballot from the other team was already added.
+
+        Args:
+            judge_id (str): The UUID of the judge.
+            matchup_id (str): The UUID of the two teams in the round.
+            round (dict): The transformed round the ballot was found in.
+            record (dict): The ballot.
+        """
+
+        key = (judge_id, round['name_std'], matchup_id)
+        row = self._key_to_row.get(key)
+
+        if row is None:
+            row = len(self.records)
+            self._key_to_row[key] = row
+
+            if judge_id not in self._judge_to_idx:
+                self._judge_to_idx[judge_id] = len(self.judge_ids)
+                self.judge_ids.append(judge_id)
+                self.judge_first_row.append(row)
+            self.judge_idx.append(self._judge_to_idx[judge_id])
+            self.judge_round_idx.append(self._judge_round_to_idx.setdefault(
+                (judge_id, round['name_std']), len(self._judge_round_to_idx)))
+
+            self.records.append(record)
+            self.rounds.append(round)
+            self.teams.append([])
+            self.speaking.append([])
+
+        self.teams[row].append(round['team_id'])
+        for speak in record.get('speaking', []):
+            self.speaking[row].append(speak)
+            self.speak_row.append(row)
+            self.speak_points.append(speak['points'])
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def get_order(self) -> np.ndarray:
+        """Gets the order rows are output in: grouped by judge, then by round, then by matchup, each in order of first
+        appearance.
+
+        Returns:
+            np.ndarray: The row indices in output order.
+        """
+
+        return np.lexsort((np.arange(len(self)), self.judge_round_idx, self.judge_idx))
+
+    def get_avg_points(self) -> np.ndarray:
+        """Gets the average points given in each row.
+
+        Returns:
+            np.ndarray: The average points of each row, NaN for rows without speaks.
+        """
+
+        counts = np.bincount(np.asarray(self.speak_row, dtype=int), minlength=len(self))
+        sums = np.bincount(np.asarray(self.speak_row, dtype=int), weights=np.asarray(self.speak_points, dtype=float), minlength=len(self))
+
+        return np.divide(sums, counts, out=np.full(len(self), np.nan), where=counts > 0)
+
+    def count_by_judge(self, mask: List[bool]) -> np.ndarray:
+        """Counts the rows of each judge matching a condition.
+
+        Args:
+            mask (List[bool]): Whether each row matches.
+
+        Returns:
+            np.ndarray: The number of matching rows of each judge.
+        """
+
+        judge_idx = np.asarray(self.judge_idx, dtype=int)
+
+        return np.bincount(judge_idx[np.asarray(mask, dtype=bool)], minlength=len(self.judge_ids))
+
+    def get_judge_point_stats(self) -> Mapping[int, Tuple[float, float, float, float, int]]:
+        """Gets the speaker point stats of every judge that gave points.
+
+        Returns:
+            Mapping[int, Tuple[float, float, float, float, int]]: The mean, IQR-adjusted mean, standard deviation,
+            1HL mean and number of speaks of each judge (by index into `judge_ids`).
+        """
+
+        if not self.speak_points:
+            return {}
+
+        judge_idx = np.asarray(self.judge_idx, dtype=int)
+        stats = grouped_stats(judge_idx[np.asarray(self.speak_row, dtype=int)].tolist(), self.speak_points)
+
+        return {
+            judge: (stats['mean'][i], stats['iqr_mean'][i], stats['stdev'][i], stats['mean_1hl'][i], stats['count'][i])
+            for i, judge in enumerate(stats['keys'])
+        }
@@ -0,0 +1,180 @@
+import numpy as np
+from typing import Hashable, List, Sequence, TypedDict
+
+
+class GroupedStats(TypedDict):
+    keys: List[Hashable]
+    count: np.ndarray
+    mean: np.ndarray
+    iqr_mean: np.ndarray
+    stdev: np.ndarray
+    mean_1hl: np.ndarray
+    mean_2hl: np.ndarray
+
+
+def iqr_mask(a: np.ndarray) -> np.ndarray:
+    """Finds the values of an array that aren't outliers under the standard IQR of 1.5.
+
+    Args:
+        a (np.ndarray): The values.
+
+    Returns:
+        np.ndarray: A boolean mask of the values within 1.5 IQRs of the quartiles.
+    """
+
+    lower_quartile, upper_quartile = np.percentile(a, [25, 75])
+    iqr = (upper_quartile - lower_quartile) * 1.5
+
+    return (a >= lower_quartile - iqr) & (a <= upper_quartile + iqr)
+
+
+def mean(x: Sequence[float]) -> float | None:
+    """Gets the mean of a list.
+
+    Args:
+        x (Sequence[float]): The values.
+
+    Returns:
+        float | None: The mean, or None if there are no values.
+    """
+
+    return float(np.mean(x)) if len(x) else None
+
+
+def stdev(x: Sequence[float]) -> float | None:
+    """Gets the sample standard deviation of a list (matches `statistics.stdev`).
+
+    Args:
+        x (Sequence[float]): The values.
+
+    Returns:
+        float | None: The standard deviation, or None if there are fewer than two values.
+    """
+
+    return float(np.std(x, ddof=1)) if len(x) > 1 else None
+
+
+def iqr_mean(x: Sequence[float]) -> float | None:
+    """Gets the mean of a list after removing outliers under the standard IQR of 1.5.
+
+    Args:
+        x (Sequence[float]): The values.
+
+    Returns:
+        float | None: The outlier-filtered mean, or None if there are no values.
+    """
+
+    if not len(x):
+        return None
+
+    a = np.asarray(x, dtype=float)
+
+    return float(a[iqr_mask(a)].mean())
+
+
+def trimmed_mean(x: Sequence[float], trim: int) -> float | None:
+    """Gets the mean of a list after dropping its `trim` highest and lowest values (e.g. 1HL, 2HL).
+
+    Args:
+        x (Sequence[float]): The values.
+        trim (int): The number of values to remove from each end.
+
+    Returns:
+        float | None: The trimmed mean, or None if nothing would be left after trimming.
+    """
+
+    if len(x) <= 2 * trim:
+        return None
+
+    return float(np.sort(np.asarray(x, dtype=float))[trim:len(x) - trim].mean())
+
+
+def _group_quantile(sorted_values: np.ndarray, starts: np.ndarray, counts: np.ndarray, q: float) -> np.ndarray:
+    """Gets a quantile of every group of a group-sorted array, interpolating linearly like `np.percentile`.
+
+    Args:
+        sorted_values (np.ndarray): The values, sorted by group and then by value.
+        starts (np.ndarray): The index each group starts at.
+        counts (np.ndarray): The size of each group.
+        q (float): The quantile, from 0 to 1.
+
+    Returns:
+        np.ndarray: The quantile of each group.
+    """
+
+    position = (counts - 1) * q
+    lower = np.floor(position).astype(int)
+    upper = np.minimum(lower + 1, counts - 1)
+    fraction = position - lower
+
+    return sorted_values[starts + lower] * (1 - fraction) + sorted_values[starts + upper] * fraction
+
+
+def _group_trimmed_mean(sorted_values: np.ndarray, group: np.ndarray, rank: np.ndarray, counts: np.ndarray, trim: int) -> np.ndarray:
+    """Gets the trimmed mean of every group of a group-sorted array, see `trimmed_mean`.
+
+    Args:
+        sorted_values (np.ndarray): The values, sorted by group and then by value.
+        group (np.ndarray): The group of each value.
+        rank (np.ndarray): The rank of each value within its group.
+        counts (np.ndarray): The size of each group.
+        trim (int): The number of values to remove from each end of each group.
+
+    Returns:
+        np.ndarray: The trimmed mean of each group, NaN where nothing would be left after trimming.
+    """
+
+    kept = (rank >= trim) & (rank < counts[group] - trim)
+    kept_counts = np.bincount(group[kept], minlength=len(counts))
+    kept_sums = np.bincount(group[kept], weights=sorted_values[kept], minlength=len(counts))
+
+    return np.divide(kept_sums, kept_counts, out=np.full(len(counts), np.nan), where=kept_counts > 0)
+
+
+def grouped_stats(keys: Sequence[Hashable], values: Sequence[float]) -> GroupedStats:
+    """Computes the mean, IQR-filtered mean, standard deviation and 1HL/2HL means of every group of a flat list of
+    values in a single pass.
+
+    Args:
+        keys (Sequence[Hashable]): The group of each value, e.g. a competitor or judge ID.
+        values (Sequence[float]): The values.
+
+    Returns:
+        GroupedStats: The distinct keys in order of first appearance, and the stats of each key's values. The standard
+        deviation is NaN for groups of one, and the trimmed means are NaN for groups too small to trim.
+    """
+
+    key_to_group = {}
+    group = np.fromiter((key_to_group.setdefault(key, len(key_to_group)) for key in keys), dtype=int, count=len(keys))
+    values = np.asarray(values, dtype=float)
+    num_groups = len(key_to_group)
+
+    order = np.lexsort((values, group))
+    sorted_values = values[order]
+    sorted_group = group[order]
+
+    counts = np.bincount(group, minlength=num_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(int)
+    rank = np.arange(len(sorted_values)) - starts[sorted_group]
+
+    sums = np.bincount(group, weights=values, minlength=num_groups)
+    means = sums / counts
+    squared_deviations = np.bincount(group, weights=(values - means[group])**2, minlength=num_groups)
+    stdevs = np.sqrt(np.divide(squared_deviations, counts - 1, out=np.full(num_groups, np.nan), where=counts > 1))
+
+    lower_quartile = _group_quantile(sorted_values, starts, counts, 0.25)
+    upper_quartile = _group_quantile(sorted_values, starts, counts, 0.75)
+    iqr = (upper_quartile - lower_quartile) * 1.5
+    kept = (sorted_values >= (lower_quartile - iqr)[sorted_group]) & (sorted_values <= (upper_quartile + iqr)[sorted_group])
+    iqr_means = np.bincount(sorted_group[kept], weights=sorted_values[kept], minlength=num_groups) / \
+        np.bincount(sorted_group[kept], minlength=num_groups)
+
+    return {
+        'keys': list(key_to_group.keys()),
+        'count': counts,
+        'mean': means,
+        'iqr_mean': iqr_means,
+        'stdev': stdevs,
+        'mean_1hl': _group_trimmed_mean(sorted_values, sorted_group, rank, counts, 1),
+        'mean_2hl': _group_trimmed_mean(sorted_values, sorted_group, rank, counts, 2)
+    }
@@ -0,0 +1,89 @@
+import os
+import sqlite3
+import threading
+from typing import Mapping
+
+"""Path of the SQLite upload journal, overridable with the `UPLOAD_JOURNAL` environment variable"""
+JOURNAL_PATH = os.environ.get('UPLOAD_JOURNAL', "upload_journal.sqlite")
+
+
+class UploadJournal:
+    """An on-disk record of the objects uploaded for each division, keyed by their natural keys (e.g. a team result by
+    its team's ID), so that a failed upload can be retried without recreating what was already uploaded.
+
+    Attributes:
+        path (str): The path of the SQLite database.
+    """
+
+    def __init__(self, path: str = JOURNAL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS uploads (tab_event_id INTEGER, kind TEXT, key TEXT, id INTEGER, PRIMARY KEY (tab_event_id, kind, key))")
+        self._connection.commit()
+
+    def get(self, tab_event_id: int, kind: str) -> Mapping[str, int | None]:
+        """Gets every uploaded object of a kind in a division.
+
+        Args:
+            tab_event_id (int): The unique ID assigned to the event, visible in the `event_id` query parameter.
+            kind (str): The kind of object, e.g. `teamResults`.
+
+        Returns:
+            Mapping[str, int | None]: The ID of each uploaded object by natural key, None if its ID isn't known.
+        """
+
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT key, id FROM uploads WHERE tab_event_id = ? AND kind = ?", (tab_event_id, kind)).fetchall()
+
+        return dict(rows)
+
+    def put(self, tab_event_id: int, kind: str, ids: Mapping[str, int | None]) -> None:
+        """Records uploaded objects of a kind in a division.
+
+        Args:
+            tab_event_id (int): The unique ID assigned to the event, visible in the `event_id` query parameter.
+            kind (str): The kind of object, e.g. `teamResults`.
+            ids (Mapping[str, int | None]): The ID of each uploaded object by natural key, None if its ID isn't known.
+        """
+
+        if not ids:
+            return
+
+        with self._lock:
+            self._connection.executemany("INSERT OR REPLACE INTO uploads VALUES (?, ?, ?, ?)", [
+                (tab_event_id, kind, key, id) for key, id in ids.items()])
+            self._connection.commit()
+
+    def clear(self, tab_event_id: int) -> None:
+        """Forgets a division's uploaded objects, once its upload has completed.
+
+        Args:
+            tab_event_id (int): The unique ID assigned to the event, visible in the `event_id` query parameter.
+        """
+
+        with self._lock:
+            self._connection.execute("DELETE FROM uploads WHERE tab_event_id = ?", (tab_event_id,))
+            self._connection.commit()
+
+
+_journal: UploadJournal | None = None
+_journal_lock = threading.Lock()
+
+
+def get_upload_journal() -> UploadJournal:
+    """Gets the upload journal, opening it on first use.
+
+    Returns:
+        UploadJournal: The journal.
+    """
+
+    global _journal
+
+    with _journal_lock:
+        if _journal is None:
+            _journal = UploadJournal()
+
+    return _journal
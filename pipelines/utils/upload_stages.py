@@ -0,0 +1,56 @@
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, List, Mapping
+
+
+class UploadStage:
+    """A step of an upload that can start once the stages it depends on (i.e. whose IDs it needs) have finished.
+
+    Attributes:
+        name (str): The name of the stage, referenced by the stages depending on it.
+        run (Callable[[], None]): Runs the stage's requests.
+        depends_on (List[str]): The names of the stages that must finish first.
+    """
+
+    def __init__(self, name: str, run: Callable[[], None], depends_on: List[str] = []):
+        self.name = name
+        self.run = run
+        self.depends_on = list(depends_on)
+
+
+def run_stages(stages: List[UploadStage]) -> None:
+    """Runs upload stages, each as soon as all of its dependencies have finished, so independent stages overlap and
+    the upload takes about as long as its slowest chain of dependent stages.
+
+    Args:
+        stages (List[UploadStage]): The stages.
+
+    Raises:
+        ValueError: If a stage depends on a stage that doesn't exist or the dependencies are circular.
+    """
+
+    names = {stage.name for stage in stages}
+    for stage in stages:
+        missing = [name for name in stage.depends_on if name not in names]
+        if missing:
+            raise ValueError(f"Upload stage {stage.name} depends on unknown stages {missing}")
+
+    pending: Mapping[str, UploadStage] = {stage.name: stage for stage in stages}
+    running: Mapping[Future, str] = {}
+    finished = set()
+
+    with ThreadPoolExecutor(max_workers=max(len(stages), 1)) as executor:
+        while pending or running:
+            for name, stage in list(pending.items()):
+                if all(dependency in finished for dependency in stage.depends_on):
+                    running[executor.submit(stage.run)] = name
+                    del pending[name]
+
+            if not running:
+                raise ValueError(f"Upload stages {list(pending.keys())} have circular dependencies")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                # Re-raises the stage's exception, skipping every stage that depends on it
+                future.result()
+                finished.add(name)
@@ -1,26 +1,68 @@
-from ..utils.soup import get_soup
+from functools import cached_property
+from bs4 import BeautifulSoup
+from ..utils.soup import get_soup, get_soups
 from ..utils.clean import clean_element
 
 
-def get_division_name(tab_tourn_id: int, tab_event_id: int) -> str:
+class DivisionPages:
+    """The "Entries" and "Prelim Records" pages of a division, each fetched and parsed at most once.
+
+    Attributes:
+        tab_tourn_id (int): The unique ID assigned to the tournament, visible in the `tourn_id` query parameter.
+        tab_event_id (int): The unique ID assigned to the event, visible in the `event_id` query parameter.
+    """
+
+    def __init__(self, tab_tourn_id: int, tab_event_id: int):
+        self.tab_tourn_id = tab_tourn_id
+        self.tab_event_id = tab_event_id
+
+    @property
+    def fields_url(self) -> str:
+        """str: The URL of the "Entries" page."""
+        return f"https://www.tabroom.com/index/tourn/fields.mhtml?tourn_id={self.tab_tourn_id}&event_id={self.tab_event_id}"
+
+    @property
+    def ranked_list_url(self) -> str:
+        """str: The URL of the "Prelim Records" page."""
+        return f"https://www.tabroom.com/index/tourn/results/ranked_list.mhtml?event_id={self.tab_event_id}&tourn_id={self.tab_tourn_id}"
+
+    @cached_property
+    def fields(self) -> BeautifulSoup:
+        """BeautifulSoup: The "Entries" page."""
+        return get_soup(self.fields_url)
+
+    @cached_property
+    def ranked_list(self) -> BeautifulSoup:
+        """BeautifulSoup: The "Prelim Records" page."""
+        return get_soup(self.ranked_list_url)
+
+    def prefetch(self) -> None:
+        """Fetches whichever pages haven't been loaded yet in a single concurrent batch."""
+
+        missing = [name for name in ['fields', 'ranked_list'] if name not in self.__dict__]
+        soups = get_soups(list(map(lambda name: getattr(self, f"{name}_url"), missing)))
+
+        for name, soup in zip(missing, soups):
+            self.__dict__[name] = soup
+
+
+def get_division_name(tab_tourn_id: int, tab_event_id: int, pages: DivisionPages | None = None) -> str:
     """Gets the name of a divsion.
 
     Args:
         tab_tourn_id (int): The unique ID assigned to the tournament, visible in the `tourn_id` query parameter.
         tab_event_id (int): The unique ID assigned to the event, visible in the `event_id` query parameter.
+        pages (DivisionPages | None, optional): The division's pages, to share with `scrape_entries`. Defaults to None.
 
     Returns:
         str: The name of the division, as assigned by Tabroom.
     """
 
-    soup = get_soup(
-        f"https://www.tabroom.com/index/tourn/fields.mhtml?tourn_id={tab_tourn_id}&event_id={tab_event_id}")
-    h4s = soup.find_all('h4')
+    pages = pages or DivisionPages(tab_tourn_id, tab_event_id)
+    h4s = pages.fields.find_all('h4')
 
     # Fall back to prelim records page if event field page wasn't published
     if len(h4s) < 2:
-        soup = get_soup(
-            f"https://www.tabroom.com/index/tourn/results/ranked_list.mhtml?event_id={tab_event_id}&tourn_id={tab_tourn_id}")
-        h4s = soup.find_all('h4')
+        h4s = pages.ranked_list.find_all('h4')
 
     return clean_element(h4s[1]).replace(" Results", "")
@@ -0,0 +1,211 @@
+import json
+from typing import List, Mapping
+from shared.lprint import lprint
+from ..utils.fetch import fetch
+from ..utils.clean import clean_text
+from ..utils.decision import get_decision
+from ..utils.side import get_side
+from ..utils.round_type import get_round_type
+from .entry import Entry, Round, Record, tally_round, infer_elims
+
+# Tabroom ballot sides, labelled with the event's `aff_label`/`neg_label` settings (or these defaults) on entry pages
+SIDE_LABELS = {
+    1: ('aff_label', "Aff"),
+    2: ('neg_label', "Neg")
+}
+
+
+def get_download_data(job_id: int | None, tab_tourn_id: int) -> dict | None:
+    """Gets Tabroom's structured JSON export of a tournament.
+
+    Args:
+        job_id (int | None): The job ID, for logging.
+        tab_tourn_id (int): The unique ID assigned to the tournament, visible in the `tourn_id` query parameter.
+
+    Returns:
+        dict | None: The export, or None if Tabroom did not serve one.
+    """
+
+    try:
+        return json.loads(fetch(f"https://www.tabroom.com/api/download_data?tourn_id={tab_tourn_id}"))
+    except Exception as e:
+        lprint(job_id, "Warning", message=f"Could not get the JSON export of tournament {tab_tourn_id}, scraping entry pages instead ({type(e).__name__}: {e})")
+        return None
+
+
+def _get_name(person: dict) -> str:
+    """Formats a student or judge from the export the same way their name appears on entry pages.
+
+    Args:
+        person (dict): The student or judge.
+
+    Returns:
+        str: The cleaned "First Last" name.
+    """
+
+    return clean_text(f"{person['first']} {person['last']}")
+
+
+def get_entries_from_download_data(job_id: int | None, download_data: dict, tab_event_id: int) -> List[Entry] | None:
+    """Builds every entry in an event, including rounds, ballots and judges, from a tournament's JSON export.
+
+    Args:
+        job_id (int | None): The job ID, for logging.
+        download_data (dict): The tournament's JSON export, as returned by `get_download_data`.
+        tab_event_id (int): The unique ID assigned to the event, visible in the `event_id` query parameter.
+
+    Returns:
+        List[Entry] | None: The entries, in the same shape `parse_entry` produces, or None if they can't be built
+        from the export (in which case the HTML pages should be scraped instead, and the reason is logged).
+    """
+
+    try:
+        return _build_entries(download_data, tab_event_id)
+    except Exception as e:
+        lprint(job_id, "Warning", message=f"Could not build event {tab_event_id} from the JSON export, scraping entry pages instead ({type(e).__name__}: {e})")
+        return None
+
+
+def _get_side(event: dict, side: int) -> str:
+    """Gets the standardized side of a ballot, as `parse_entry` reads it off an entry page.
+
+    Args:
+        event (dict): The event from the export.
+        side (int): The ballot's side, 1 (affirmative) or 2 (negative).
+
+    Raises:
+        Exception: Thrown if the side's label cannot be standardized.
+
+    Returns:
+        str: The standardized side.
+    """
+
+    setting, default = SIDE_LABELS[side]
+
+    return get_side(clean_text(event.get('settings', {}).get(setting) or default))
+
+
+def _build_entries(download_data: dict, tab_event_id: int) -> List[Entry]:
+    """Builds the entries of an event, see `get_entries_from_download_data`.
+
+    Args:
+        download_data (dict): The tournament's JSON export.
+        tab_event_id (int): The unique ID assigned to the event, visible in the `event_id` query parameter.
+
+    Raises:
+        ValueError: Thrown if the export doesn't hold the event or its rounds.
+        KeyError: Thrown if the export is missing a field the entries need.
+
+    Returns:
+        List[Entry]: The entries.
+    """
+
+    event = None
+    tab_judge_id_to_name: Mapping[int, str] = {}
+
+    for category in download_data['categories']:
+        for judge in category.get('judges', []):
+            tab_judge_id_to_name[judge['id']] = _get_name(judge)
+        for _event in category['events']:
+            if _event['id'] == tab_event_id:
+                event = _event
+
+    if not event:
+        raise ValueError("the event isn't in the export")
+    if not event.get('rounds'):
+        raise ValueError("the export holds no rounds for the event")
+
+    tab_student_id_to_name: Mapping[int, str] = {}
+    tab_entry_id_to_entry: Mapping[int, Entry] = {}
+
+    for school in download_data['schools']:
+        for student in school.get('students', []):
+            tab_student_id_to_name[student['id']] = _get_name(student)
+
+        for _entry in school.get('entries', []):
+            if _entry['event'] != tab_event_id or _entry.get('waitlist') or _entry.get('dropped'):
+                continue
+
+            students = list(map(
+                lambda s: s if isinstance(s, dict) else {'id': s}, _entry.get('students', [])))
+            for student in students:
+                if 'first' in student:
+                    tab_student_id_to_name[student['id']] = _get_name(student)
+
+            tab_entry_id_to_entry[_entry['id']] = {
+                'tab_entry_id': _entry['id'],
+                'code': clean_text(_entry['code']),
+                'school': clean_text(school['name']),
+                'location': {
+                    'state': school.get('state') or None,
+                    'country': school.get('country') or "US"
+                } if school.get('state') or school.get('country') else None,
+                'tab_competitor_ids': list(map(lambda s: s['id'], students)),
+                'rounds': [],
+                'competitors': []
+            }
+
+    for entry in tab_entry_id_to_entry.values():
+        entry['competitors'] = list(map(
+            lambda tab_student_id: tab_student_id_to_name[tab_student_id], entry['tab_competitor_ids']))
+
+    # Entry pages list rounds most recent first, under their label or "Round <number>"
+    for _round in sorted(event['rounds'], key=lambda r: int(r['name']), reverse=True):
+        name = clean_text(_round.get('label') or f"Round {_round['name']}")
+        round_type = str(get_round_type(name))
+
+        for section in _round.get('sections', []):
+            tab_entry_id_to_ballots: Mapping[int, List[dict]] = {}
+            for ballot in section.get('ballots', []):
+                tab_entry_id_to_ballots.setdefault(ballot['entry'], []).append(ballot)
+
+            for tab_entry_id, ballots in tab_entry_id_to_ballots.items():
+                if tab_entry_id not in tab_entry_id_to_entry:
+                    continue
+                entry = tab_entry_id_to_entry[tab_entry_id]
+                opponent_ids = [id for id in tab_entry_id_to_ballots if id != tab_entry_id]
+                is_bye = section.get('bye') or any(map(lambda b: b.get('bye'), ballots)) or not opponent_ids
+
+                round: Round = {
+                    'name': name,
+                    'type': round_type,
+                    'side': "Bye" if is_bye else _get_side(event, ballots[0]['side']),
+                    'opponent': None,
+                    'judge_records': []
+                }
+
+                if opponent_ids:
+                    opponent_id = opponent_ids[0]
+                    round['opponent'] = {
+                        'code': tab_entry_id_to_entry[opponent_id]['code'] if opponent_id in tab_entry_id_to_entry else None,
+                        'tab_entry_id': opponent_id
+                    }
+
+                for ballot in ballots:
+                    scores = ballot.get('scores', [])
+                    decisions = list(filter(lambda s: s['tag'] == "winloss", scores))
+                    if not ballot.get('judge') or not decisions:
+                        continue
+
+                    record: Record = {
+                        'name': tab_judge_id_to_name[ballot['judge']],
+                        'tab_judge_id': ballot['judge'],
+                        'result': get_decision(round['side'], "W" if int(decisions[0]['value']) == 1 else "L"),
+                        'speaking': list(map(
+                            lambda s: {
+                                'competitor': tab_student_id_to_name[s['student']],
+                                'score': float(s['value']),
+                                'reply_score': None
+                            },
+                            filter(lambda s: s['tag'] == "point" and s.get('student'), scores)
+                        ))
+                    }
+                    round['judge_records'].append(record)
+
+                tally_round(round)
+                entry['rounds'].append(round)
+
+    for entry in tab_entry_id_to_entry.values():
+        infer_elims(entry)
+
+    return list(tab_entry_id_to_entry.values())
@@ -1,6 +1,10 @@
-from typing import List, TypedDict
+from typing import List, Mapping, Tuple, TypedDict
+from collections import Counter
 from urllib.parse import urlparse, parse_qs
-from ..utils.soup import get_soup
+from bs4 import BeautifulSoup
+from shared.indexed_list import IndexedList
+from shared.lprint import lprint
+from .division import DivisionPages
 from ..utils.clean import clean_element
 
 
@@ -17,28 +21,52 @@ class EntryFragment(TypedDict):
     tab_competitor_ids: List[int]
 
 
-def scrape_entries(tab_tourn_id: int, tab_event_id: int) -> List[EntryFragment]:
+class RankedEntry(TypedDict):
+    code: str
+    school: str | None
+    tab_entry_id: int
+
+
+def scrape_entries(tab_tourn_id: int, tab_event_id: int, pages: DivisionPages | None = None) -> List[EntryFragment]:
     """Gets a list of all entries in a tournament using the "Entries" and "Prelim Records" pages.
 
     Args:
         tab_tourn_id (int): The unique ID assigned to the tournament, visible in the `tourn_id` query parameter.
         tab_event_id (int): The unique ID assigned to the event, visible in the `event_id` query parameter.
+        pages (DivisionPages | None, optional): The division's pages, to share with `get_division_name`. Defaults to None.
 
     Returns:
         List[EntryFragment]: All pertinent entry information for each team.
     """
 
+    pages = pages or DivisionPages(tab_tourn_id, tab_event_id)
+    pages.prefetch()
+
     # Try scraping event field page
-    soup = get_soup(
-        f"https://www.tabroom.com/index/tourn/fields.mhtml?tourn_id={tab_tourn_id}&event_id={tab_event_id}")
-    rows = soup.find_all('tr')
+    soup = pages.fields
 
     # Fall back to prelim records page (no location data) if event field page wasn't published
-    if not len(rows):
-        soup = get_soup(
-            f"https://www.tabroom.com/index/tourn/results/ranked_list.mhtml?event_id={tab_event_id}&tourn_id={tab_tourn_id}")
-        rows = soup.find_all('tr')
+    if not len(soup.find_all('tr')):
+        soup = pages.ranked_list
+
+    fragments = parse_entry_fragments(soup)
+
+    assign_tab_entry_ids(fragments, pages.ranked_list)
+
+    return fragments
 
+
+def parse_entry_fragments(soup: BeautifulSoup) -> List[EntryFragment]:
+    """Parses the entries table of an "Entries" or "Prelim Records" page.
+
+    Args:
+        soup (BeautifulSoup): The soup of the page.
+
+    Returns:
+        List[EntryFragment]: All pertinent entry information for each team, without their tab_entry_id.
+    """
+
+    rows = soup.find_all('tr')
     headers = list(map(lambda e: clean_element(e), rows[0].find_all('th')))
     fragments: List[EntryFragment] = []
 
@@ -79,20 +107,79 @@ def scrape_entries(tab_tourn_id: int, tab_event_id: int) -> List[EntryFragment]:
         if not isWaitlisted:
             fragments.append(fragment)
 
-    soup = get_soup(
-        f'https://www.tabroom.com/index/tourn/results/ranked_list.mhtml?event_id={tab_event_id}&tourn_id={tab_tourn_id}').find('table', {'id': 'ranked_list'})
-    rows = soup.find_all('tr')
+    return fragments
+
+
+def parse_tab_entry_ids(soup: BeautifulSoup) -> List[RankedEntry]:
+    """Parses the code, school and tab_entry_id of every entry on the "Prelim Records" page.
+
+    Args:
+        soup (BeautifulSoup): The soup of the "Prelim Records" page.
+
+    Returns:
+        List[RankedEntry]: Each entry's code, school (None if the page has no school column) and tab_entry_id, in
+        page order.
+    """
+
+    rows = soup.find('table', {'id': 'ranked_list'}).find_all('tr')
     headers = list(map(lambda e: clean_element(e), rows[0].find_all('th')))
+    ranked_entries: List[RankedEntry] = []
 
     for row in rows[1:]:
+        ranked_entry: RankedEntry = {'school': None}
         for i, cell in enumerate(row.find_all('td')):
-            if headers[i] != "Code":
-                continue
-            tab_entry_id = int(parse_qs(urlparse(
-                f"https://www.tabroom.com{cell.find('a')['href']}").query)['entry_id'][0])
-            code = clean_element(cell)
-            for fragment in fragments:
-                if fragment['code'] == code:
-                    fragment['tab_entry_id'] = tab_entry_id
+            match headers[i]:
+                case "Code":
+                    ranked_entry['code'] = clean_element(cell)
+                    ranked_entry['tab_entry_id'] = int(parse_qs(urlparse(
+                        f"https://www.tabroom.com{cell.find('a')['href']}").query)['entry_id'][0])
+                case "School":
+                    ranked_entry['school'] = clean_element(cell)
 
-    return fragments
+        if 'tab_entry_id' in ranked_entry:
+            ranked_entries.append(ranked_entry)
+
+    return ranked_entries
+
+
+def assign_tab_entry_ids(fragments: List[EntryFragment], soup: BeautifulSoup) -> None:
+    """Sets the tab_entry_id of each fragment by matching codes against the "Prelim Records" page.
+
+    Codes shared by several fragments are told apart by school. Fragments that still can't be matched to a single row
+    are reported and removed rather than guessed at, since they are picked up again as unscraped opponents.
+
+    Args:
+        fragments (List[EntryFragment]): The fragments to update in place.
+        soup (BeautifulSoup): The soup of the "Prelim Records" page.
+    """
+
+    coded_fragments = [f for f in fragments if f.get('code')]
+    code_counts = Counter(map(lambda f: f['code'], coded_fragments))
+    code_to_fragment: IndexedList[EntryFragment] = IndexedList(
+        lambda f: f['code'], [f for f in coded_fragments if code_counts[f['code']] == 1])
+
+    # Shared codes are matched on (code, school), only where that pair is unique on both pages
+    key_to_ambiguous_fragments: Mapping[Tuple[str, str | None], List[EntryFragment]] = {}
+    for fragment in coded_fragments:
+        if code_counts[fragment['code']] > 1:
+            key_to_ambiguous_fragments.setdefault((fragment['code'], fragment.get('school')), []).append(fragment)
+
+    key_to_ambiguous_ids: Mapping[Tuple[str, str | None], List[int]] = {}
+    for ranked_entry in parse_tab_entry_ids(soup):
+        if ranked_entry['code'] in code_to_fragment.lookup:
+            code_to_fragment[ranked_entry['code']]['tab_entry_id'] = ranked_entry['tab_entry_id']
+        elif code_counts[ranked_entry['code']] > 1:
+            key_to_ambiguous_ids.setdefault((ranked_entry['code'], ranked_entry['school']), []).append(ranked_entry['tab_entry_id'])
+
+    skipped: List[EntryFragment] = []
+    for key, ambiguous_fragments in key_to_ambiguous_fragments.items():
+        tab_entry_ids = key_to_ambiguous_ids.get(key, [])
+        if len(ambiguous_fragments) == 1 and len(tab_entry_ids) == 1:
+            ambiguous_fragments[0]['tab_entry_id'] = tab_entry_ids[0]
+        else:
+            skipped += ambiguous_fragments
+
+    if skipped:
+        lprint(None, "Warning", message=f"Skipped {len(skipped)} entries sharing codes that couldn't be told apart by school: {', '.join(sorted(set(map(lambda f: f['code'], skipped))))}")
+        skipped_ids = set(map(id, skipped))
+        fragments[:] = [f for f in fragments if id(f) not in skipped_ids]
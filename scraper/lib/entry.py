@@ -1,13 +1,14 @@
-from typing import List, TypedDict
+from typing import Iterator, List, TypedDict
 from enum import Enum
 from urllib.parse import urlparse, parse_qs
-from ..utils.soup import get_soup
+from bs4 import BeautifulSoup
+from ..utils.soup import get_soup, iter_soups
+from ..utils.fetch import MAX_WORKERS
 from ..utils.round_type import get_round_type, RoundType
 from ..utils.side import get_side
 from ..utils.clean import clean_element
 from ..utils.decision import get_decision
 from .entries import EntryFragment
-from urllib.parse import urlparse, parse_qs
 
 
 class Opponent(TypedDict):
@@ -68,6 +69,57 @@ class Entry(EntryFragment):
     competitors: List[str]
 
 
+def tally_round(round: Round) -> None:
+    """Sets a round's ballot counts and outcome from its judge records, and flags squirrel records.
+
+    Args:
+        round (Round): The round to update in place.
+    """
+
+    winningBallots = 0
+    losingBallots = 0
+
+    for record in round['judge_records']:
+        if record['result'] == round['side']:
+            winningBallots += 1
+        else:
+            losingBallots += 1
+
+    round['ballots_won'] = winningBallots
+    round['ballots_lost'] = losingBallots
+
+    if winningBallots > losingBallots or round['side'] == "Bye":
+        round['outcome'] = "Win"
+    elif winningBallots == losingBallots and winningBallots:
+        round['outcome'] = "Split"
+    elif winningBallots == losingBallots:
+        round['outcome'] = "Win"
+    else:
+        round['outcome'] = "Loss"
+
+    for record in round['judge_records']:
+        if record['result'] == round['side'] and round['outcome'] == "Loss":
+            record['was_squirrel'] = True
+        elif record['result'] != round['side'] and round['outcome'] == "Win":
+            record['was_squirrel'] = True
+        else:
+            record['was_squirrel'] = False
+
+
+def get_entry_url(tab_tourn_id: int, tab_entry_id: int) -> str:
+    """Gets the URL of an entry's "Entry" page.
+
+    Args:
+        tab_tourn_id (int): The unique ID assigned to the tournament, visible in the `tourn_id` query parameter.
+        tab_entry_id (int): The unique ID assigned to the entry, visible in the `entry_id` query parameter.
+
+    Returns:
+        str: The entry record URL.
+    """
+
+    return f"https://www.tabroom.com/index/tourn/postings/entry_record.mhtml?tourn_id={tab_tourn_id}&entry_id={tab_entry_id}"
+
+
 def scrape_entry(tab_tourn_id: int, entry_fragment: EntryFragment) -> Entry:
     """Scrapes the "Entry" page on Tabroom to gather round data.
 
@@ -79,9 +131,40 @@ def scrape_entry(tab_tourn_id: int, entry_fragment: EntryFragment) -> Entry:
         Entry: The fully populated Entry with all pertinent information from Tabroom.
     """
 
+    return parse_entry(entry_fragment, get_soup(get_entry_url(tab_tourn_id, entry_fragment['tab_entry_id'])))
+
+
+def iter_entry_batch(tab_tourn_id: int, entry_fragments: List[EntryFragment], max_workers: int = MAX_WORKERS) -> Iterator[Entry]:
+    """Scrapes the "Entry" pages of many entries, yielding each entry as soon as its page arrives. Each page's soup
+    is discarded once parsed, so only the entries themselves are held in memory.
+
+    Args:
+        tab_tourn_id (int): The unique ID assigned to the tournament, visible in the `tourn_id` query parameter.
+        entry_fragments (List[EntryFragment]): Basic information about each entry.
+        max_workers (int, optional): The maximum number of pages fetched at once. Defaults to MAX_WORKERS.
+
+    Yields:
+        Entry: The fully populated Entries, in the order their pages finished downloading.
+    """
+
+    urls = list(map(lambda fragment: get_entry_url(tab_tourn_id, fragment['tab_entry_id']), entry_fragments))
+
+    for i, soup in iter_soups(urls, max_workers):
+        yield parse_entry(entry_fragments[i], soup)
+
+
+def parse_entry(entry_fragment: EntryFragment, soup: BeautifulSoup) -> Entry:
+    """Parses the "Entry" page on Tabroom to gather round data.
+
+    Args:
+        entry_fragment (EntryFragment): Basic information about the entry.
+        soup (BeautifulSoup): The soup of the entry's "Entry" page.
+
+    Returns:
+        Entry: The fully populated Entry with all pertinent information from Tabroom.
+    """
+
     entry: Entry = entry_fragment
-    soup = get_soup(
-        f"https://www.tabroom.com/index/tourn/postings/entry_record.mhtml?tourn_id={tab_tourn_id}&entry_id={entry_fragment['tab_entry_id']}")
 
     entry['rounds'] = []
     entry['competitors'] = clean_element(
@@ -205,35 +288,21 @@ def scrape_entry(tab_tourn_id: int, entry_fragment: EntryFragment) -> Entry:
 
             round['judge_records'].append(record)
 
-        winningBallots = 0
-        losingBallots = 0
+        tally_round(round)
+        entry['rounds'].append(round)
 
-        for record in round['judge_records']:
-            if record['result'] == round['side']:
-                winningBallots += 1
-            else:
-                losingBallots += 1
+    infer_elims(entry)
 
-        round['ballots_won'] = winningBallots
-        round['ballots_lost'] = losingBallots
+    return entry
 
-        if winningBallots > losingBallots or round['side'] == "Bye":
-            round['outcome'] = "Win"
-        elif winningBallots == losingBallots and winningBallots:
-            round['outcome'] = "Split"
-        elif winningBallots == losingBallots:
-            round['outcome'] = "Win"
-        else:
-            round['outcome'] = "Loss"
 
-        for record in round['judge_records']:
-            if record['result'] == round['side'] and round['outcome'] == "Loss":
-                record['was_squirrel'] = True
-            elif record['result'] != round['side'] and round['outcome'] == "Win":
-                record['was_squirrel'] = True
-            else:
-                record['was_squirrel'] = False
-        entry['rounds'].append(round)
+def infer_elims(entry: Entry) -> None:
+    """Marks every round from an entry's earliest paneled round onwards (with any byes just before it) as an elim, for
+    tournaments that name their elims like prelims (e.g. "Round 7").
+
+    Args:
+        entry (Entry): The entry to update in place, with its rounds most recent first.
+    """
 
     has_elim = False
     first_panel = None
@@ -266,4 +335,3 @@ def scrape_entry(tab_tourn_id: int, entry_fragment: EntryFragment) -> Entry:
             i += 1
     # print("After algo", list(map(lambda x: f"{x['name']} ({x['type']})", entry['rounds'])))
     # print()
-    return entry
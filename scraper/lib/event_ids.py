@@ -1,9 +1,9 @@
-import requests
+from .download_data import get_download_data
 
 def get_event_ids(tab_tourn_id: int):
-    res = requests.get(f"https://tabroom.com/api/download_data?tourn_id={tab_tourn_id}")
+    download_data = get_download_data(None, tab_tourn_id)
 
-    for category in res.json()['categories']:
+    for category in download_data['categories']:
         print(f"{category['abbr']} Events")
 
         for i, event in enumerate(category['events']):
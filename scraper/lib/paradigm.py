@@ -1,18 +1,18 @@
 import re
 import os
-import requests
-from requests_cache import DO_NOT_CACHE, CachedSession
 from langchain_openai.chat_models import ChatOpenAI
 from langchain.schema import HumanMessage, SystemMessage
 from typing import Tuple
+from bs4 import BeautifulSoup
 from typing import List, TypedDict
 from datetime import datetime
 from shared.const import API_BASE
-from ..utils.soup import get_soup
+from shared.api import get_api_session
+from ..utils.soup import get_soup, get_soups
 from ..utils.clean import clean_element
 from ..utils.id import get_id
 
-requests = CachedSession(expire_after=DO_NOT_CACHE)
+requests = get_api_session()
 
 NOW = datetime.now().isoformat() + "Z"
 FLOW_MODEL = "ft:gpt-3.5-turbo-0613:debate-land::8OClXt5D"
@@ -45,19 +45,29 @@ class Paradigm(TypedDict):
     scraped_at: str
 
 
-def scrape_paradigm(tab_tourn_id: int, tab_judge_id: int) -> Paradigm | None:
-    """Gets a judge's paradigm and includes link information.
+def get_paradigm_url(tab_tourn_id: int, tab_judge_id: int) -> str:
+    """Gets the URL of a judge's paradigm page.
 
     Args:
         tab_tourn_id (int): The unique ID assigned to the tournament, visible in the `tourn_id` query parameter.
         tab_judge_id (int): The unique ID assigned to the judge, visible in the `judge_id` query parameter.
 
     Returns:
-        Paradigm: All data from the judge's paradigm.
+        str: The paradigm page URL.
     """
 
-    soup = get_soup(
-        f'https://www.tabroom.com/index/tourn/postings/judge.mhtml?tourn_id={tab_tourn_id}&judge_id={tab_judge_id}')
+    return f'https://www.tabroom.com/index/tourn/postings/judge.mhtml?tourn_id={tab_tourn_id}&judge_id={tab_judge_id}'
+
+
+def parse_paradigm(soup: BeautifulSoup) -> Paradigm | None:
+    """Parses a judge's paradigm page and includes link information.
+
+    Args:
+        soup (BeautifulSoup): The soup of the judge's paradigm page.
+
+    Returns:
+        Paradigm: All data from the judge's paradigm.
+    """
 
     paradigm_elem = soup.find('div', class_='paradigm ltborderbottom')
     if not paradigm_elem:
@@ -80,6 +90,37 @@ def scrape_paradigm(tab_tourn_id: int, tab_judge_id: int) -> Paradigm | None:
     return paradigm
 
 
+def scrape_paradigm(tab_tourn_id: int, tab_judge_id: int) -> Paradigm | None:
+    """Gets a judge's paradigm and includes link information.
+
+    Args:
+        tab_tourn_id (int): The unique ID assigned to the tournament, visible in the `tourn_id` query parameter.
+        tab_judge_id (int): The unique ID assigned to the judge, visible in the `judge_id` query parameter.
+
+    Returns:
+        Paradigm: All data from the judge's paradigm.
+    """
+
+    return parse_paradigm(get_soup(get_paradigm_url(tab_tourn_id, tab_judge_id)))
+
+
+def scrape_paradigms(tab_tourn_id: int, tab_judge_ids: List[int]) -> List[Paradigm | None]:
+    """Gets the paradigms of many judges, fetching their pages concurrently.
+
+    Args:
+        tab_tourn_id (int): The unique ID assigned to the tournament, visible in the `tourn_id` query parameter.
+        tab_judge_ids (List[int]): The unique IDs assigned to the judges, visible in the `judge_id` query parameter.
+
+    Returns:
+        List[Paradigm | None]: All data from each judge's paradigm, in the same order as `tab_judge_ids`.
+    """
+
+    soups = get_soups(list(map(
+        lambda tab_judge_id: get_paradigm_url(tab_tourn_id, tab_judge_id), tab_judge_ids)))
+
+    return list(map(parse_paradigm, soups))
+
+
 def check_paradigm_cache(hash: str) -> bool:
     paradigm = requests.get(f"{API_BASE}/paradigms/{hash}")
     return True if paradigm.status_code == 200 else False
@@ -1,11 +1,21 @@
+import copy
+import time
+import threading
 from bs4 import BeautifulSoup
-from ..utils.soup import get_soup
+from ..utils.soup import get_soup, get_soups, make_soup
 from ..utils.clean import clean_element
-from typing import TypedDict, List
+from ..utils.fetch import mark_finished
+from typing import TypedDict, List, Mapping, Tuple
 from urllib.parse import urlparse, parse_qs
-from datetime import datetime
+from datetime import datetime, timedelta
 from shared.lprint import lprint
 
+"""Number of seconds a scraped tournament snapshot may be reused, including by later jobs"""
+TOURNAMENT_SNAPSHOT_TTL = 6 * 60 * 60
+
+"""Maximum number of tournament snapshots memoized at once, the oldest being dropped first"""
+MAX_TOURNAMENT_SNAPSHOTS = 64
+
 
 class TournamentSite(TypedDict):
     tab_site_id: int
@@ -90,12 +100,26 @@ class Tournament(TypedDict):
     past_results: List[TournamentPastResult]
 
 
-def scrape_tournament_page(tab_tourn_id: int, tab_webpage_id: int | None = None) -> TournamentPage:
-    """Scrapes a tournament page.
+def get_tournament_page_url(tab_tourn_id: int, tab_webpage_id: int | None = None) -> str:
+    """Gets the URL of a tournament page.
 
     Args:
         tab_tourn_id (int): The unique ID assigned to the tournament, visible in the `tourn_id` query parameter.
-        tab_webpage_id (int | None, optional): The unique ID assigned to the webpage, visible in the `webpage_id` query parameter. Defaults to None, in which case the home (invite) page will be scraped.
+        tab_webpage_id (int | None, optional): The unique ID assigned to the webpage, visible in the `webpage_id` query parameter. Defaults to None, in which case the home (invite) page URL is returned.
+
+    Returns:
+        str: The page URL.
+    """
+
+    return f'https://www.tabroom.com/index/tourn/index.mhtml?tourn_id={tab_tourn_id}{f"&webpage_id={tab_webpage_id}" if tab_webpage_id else ""}'
+
+
+def parse_tournament_page(soup: BeautifulSoup, tab_webpage_id: int | None = None) -> TournamentPage:
+    """Parses a tournament page.
+
+    Args:
+        soup (BeautifulSoup): The soup of the page.
+        tab_webpage_id (int | None, optional): The unique ID assigned to the webpage, visible in the `webpage_id` query parameter. Defaults to None, in which case the page is the home (invite) page.
 
     Returns:
         TournamentPage: All pertinent information gathered from the page.
@@ -103,26 +127,51 @@ def scrape_tournament_page(tab_tourn_id: int, tab_webpage_id: int | None = None)
 
     page: TournamentPage = {}
 
-    soup = get_soup(
-        f'https://www.tabroom.com/index/tourn/index.mhtml?tourn_id={tab_tourn_id}{f"&webpage_id={tab_webpage_id}" if tab_webpage_id else ""}')
     elements = soup.find(class_="main index").find('ul').find_next_siblings()
 
     page['title'] = clean_element(elements[0]) if tab_webpage_id else "Invite"
     page['tab_webpage_id'] = tab_webpage_id
     page['html'] = ''.join(
         list(map(lambda element: str(element), elements[1:])))
-    page['text'] = BeautifulSoup(page['html'], 'html.parser').get_text()
+    page['text'] = make_soup(page['html']).get_text()
 
     return page
 
 
-def scrape_event_metadata(tab_tourn_id: int, tab_event_id: int) -> tournamentDivisionMetadata:
-    """Scrapes the event metadata.
+def scrape_tournament_page(tab_tourn_id: int, tab_webpage_id: int | None = None) -> TournamentPage:
+    """Scrapes a tournament page.
+
+    Args:
+        tab_tourn_id (int): The unique ID assigned to the tournament, visible in the `tourn_id` query parameter.
+        tab_webpage_id (int | None, optional): The unique ID assigned to the webpage, visible in the `webpage_id` query parameter. Defaults to None, in which case the home (invite) page will be scraped.
+
+    Returns:
+        TournamentPage: All pertinent information gathered from the page.
+    """
+
+    return parse_tournament_page(get_soup(get_tournament_page_url(tab_tourn_id, tab_webpage_id)), tab_webpage_id)
+
+
+def get_event_metadata_url(tab_tourn_id: int, tab_event_id: int) -> str:
+    """Gets the URL of an event's metadata page.
 
     Args:
         tab_tourn_id (int): The unique ID assigned to the tournament, visible in the `tourn_id` query parameter.
         tab_event_id (int): The unique ID assigned to the event, visible in the `event_id` query parameter.
 
+    Returns:
+        str: The event page URL.
+    """
+
+    return f'https://www.tabroom.com/index/tourn/events.mhtml?event_id={tab_event_id}&tourn_id={tab_tourn_id}'
+
+
+def parse_event_metadata(soup: BeautifulSoup) -> tournamentDivisionMetadata:
+    """Parses the event metadata.
+
+    Args:
+        soup (BeautifulSoup): The soup of the event's metadata page.
+
     Returns:
         tournamentDivisionMetadata: All pertinent information gathered about the event.
     """
@@ -138,8 +187,6 @@ def scrape_event_metadata(tab_tourn_id: int, tab_event_id: int) -> tournamentDiv
         'school_entry_limit': None
     }
 
-    soup = get_soup(
-        f'https://www.tabroom.com/index/tourn/events.mhtml?event_id={tab_event_id}&tourn_id={tab_tourn_id}')
     for row in soup.find_all(class_="row"):
         if not 'full' in row['class']:
             continue
@@ -174,20 +221,45 @@ def scrape_event_metadata(tab_tourn_id: int, tab_event_id: int) -> tournamentDiv
     return metadata
 
 
-def scrape_tournament_email(tab_tourn_id: int, tab_email_id: int) -> TournamentEmail:
-    """Scrapes an email sent by a tournament.
+def scrape_event_metadata(tab_tourn_id: int, tab_event_id: int) -> tournamentDivisionMetadata:
+    """Scrapes the event metadata.
+
+    Args:
+        tab_tourn_id (int): The unique ID assigned to the tournament, visible in the `tourn_id` query parameter.
+        tab_event_id (int): The unique ID assigned to the event, visible in the `event_id` query parameter.
+
+    Returns:
+        tournamentDivisionMetadata: All pertinent information gathered about the event.
+    """
+
+    return parse_event_metadata(get_soup(get_event_metadata_url(tab_tourn_id, tab_event_id)))
+
+
+def get_tournament_email_url(tab_tourn_id: int, tab_email_id: int) -> str:
+    """Gets the URL of an email sent by a tournament.
 
     Args:
         tab_tourn_id (int): The unique ID assigned to the tournament, visible in the `tourn_id` query parameter.
         tab_email_id (int): The unique ID assigned to the email, visible in the `email_id` query parameter.
 
+    Returns:
+        str: The email page URL.
+    """
+
+    return f'https://www.tabroom.com/index/tourn/emails.mhtml?tourn_id={tab_tourn_id}&email_id={tab_email_id}'
+
+
+def parse_tournament_email(soup: BeautifulSoup) -> TournamentEmail:
+    """Parses an email sent by a tournament.
+
+    Args:
+        soup (BeautifulSoup): The soup of the email page.
+
     Returns:
         TournamentEmail: All pertinent information gathered about the email.
     """
 
     email: TournamentEmail = {}
-    soup = get_soup(
-        f'https://www.tabroom.com/index/tourn/emails.mhtml?tourn_id={tab_tourn_id}&email_id={tab_email_id}')
 
     for row in soup.find_all(class_="row"):
         if 'bigger' not in row['class']:
@@ -210,20 +282,46 @@ def scrape_tournament_email(tab_tourn_id: int, tab_email_id: int) -> TournamentE
     return email
 
 
-def scrape_tournament_site(tab_tourn_id: int, tab_site_id: int) -> TournamentSite:
-    """Scrapes a tournament site.
+def scrape_tournament_email(tab_tourn_id: int, tab_email_id: int) -> TournamentEmail:
+    """Scrapes an email sent by a tournament.
+
+    Args:
+        tab_tourn_id (int): The unique ID assigned to the tournament, visible in the `tourn_id` query parameter.
+        tab_email_id (int): The unique ID assigned to the email, visible in the `email_id` query parameter.
+
+    Returns:
+        TournamentEmail: All pertinent information gathered about the email.
+    """
+
+    return parse_tournament_email(get_soup(get_tournament_email_url(tab_tourn_id, tab_email_id)))
+
+
+def get_tournament_site_url(tab_tourn_id: int, tab_site_id: int) -> str:
+    """Gets the URL of a tournament site.
 
     Args:
         tab_tourn_id (int): The unique ID assigned to the tournament, visible in the `tourn_id` query parameter.
         tab_site_id (int): The unique ID assigned to the site, visible in the `site_id` query parameter.
 
+    Returns:
+        str: The site page URL.
+    """
+
+    return f'https://www.tabroom.com/index/tourn/index.mhtml?site_id={tab_site_id}&tourn_id={tab_tourn_id}'
+
+
+def parse_tournament_site(soup: BeautifulSoup, tab_site_id: int) -> TournamentSite:
+    """Parses a tournament site.
+
+    Args:
+        soup (BeautifulSoup): The soup of the site page.
+        tab_site_id (int): The unique ID assigned to the site, visible in the `site_id` query parameter.
+
     Returns:
         TournamentSite: All pertinent information gathered about the site.
     """
 
     site: TournamentSite = {}
-    soup = get_soup(
-        f'https://www.tabroom.com/index/tourn/index.mhtml?site_id={tab_site_id}&tourn_id={tab_tourn_id}')
 
     site['name'] = clean_element(soup.find('h3'))
     site['host'] = clean_element(soup.find('p')).replace('Host: ', '')
@@ -231,20 +329,38 @@ def scrape_tournament_site(tab_tourn_id: int, tab_site_id: int) -> TournamentSit
 
     return site
 
-def scrape_tournament(job_id: int | None, tab_tourn_id: int) -> Tournament:
+
+def scrape_tournament_site(tab_tourn_id: int, tab_site_id: int) -> TournamentSite:
+    """Scrapes a tournament site.
+
+    Args:
+        tab_tourn_id (int): The unique ID assigned to the tournament, visible in the `tourn_id` query parameter.
+        tab_site_id (int): The unique ID assigned to the site, visible in the `site_id` query parameter.
+
+    Returns:
+        TournamentSite: All pertinent information gathered about the site.
+    """
+
+    return parse_tournament_site(get_soup(get_tournament_site_url(tab_tourn_id, tab_site_id)), tab_site_id)
+
+def scrape_tournament(job_id: int | None, tab_tourn_id: int, fan_out: bool = True) -> Tournament:
     """Scrapes a tournament for top-level metadata, including key dates, forms, locations, and contacts.
 
+    Sub-pages are gathered in two waves: everything linked from the homepage (pages, sites, past results and the
+    events, schools and emails listings), then everything linked from those listings (event metadata and emails).
+
     Args:
         tab_tourn_id (int): The unique tournament ID assigned to the tournament, visible in the `tourn_id` query parameter.
+        fan_out (bool, optional): Whether to fetch each wave of sub-pages concurrently. Defaults to True.
 
     Returns:
         Tournament: All pertinent information gathered from the homepage.
     """
 
+    load = get_soups if fan_out else lambda urls: list(map(get_soup, urls))
     tournament: Tournament = {}
 
-    soup = get_soup(
-        f'https://www.tabroom.com/index/tourn/index.mhtml?tourn_id={tab_tourn_id}')
+    soup = get_soup(get_tournament_page_url(tab_tourn_id))
 
     # Header
     tournament['name'] = clean_element(soup.find('h2'))
@@ -253,14 +369,13 @@ def scrape_tournament(job_id: int | None, tab_tourn_id: int) -> Tournament:
     tournament['location'] = location
 
     # Pages & Forms
-    tournament['pages'] = []
+    tab_webpage_ids: List[int] = []
     tournament['assets'] = []
     for link in soup.find_all(class_="yellow full"):
         # Relative link indicates Tabroom webpage
         if link["href"][0] == "/":
             query = parse_qs(urlparse(link["href"]).query)
-            tournament['pages'].append(scrape_tournament_page(
-                tab_tourn_id, int(query["webpage_id"][0])))
+            tab_webpage_ids.append(int(query["webpage_id"][0]))
         # Absolute link indicates external asset
         else:
             tournament['assets'].append({
@@ -276,9 +391,6 @@ def scrape_tournament(job_id: int | None, tab_tourn_id: int) -> Tournament:
                 'url': link['href']
             })
 
-    # Manually scrape invitation
-    tournament['pages'].append(scrape_tournament_page(tab_tourn_id))
-
     # Scrape circuits
     tournament['tab_circuits'] = []
     for link in soup.find_all('a', class_="third"):
@@ -325,8 +437,8 @@ def scrape_tournament(job_id: int | None, tab_tourn_id: int) -> Tournament:
                 case _:
                     lprint(job_id, "Warning",  message=f"Unhandled date field '{label}'")
 
-    # Scrape sites and contacts
-    tournament['sites'] = []
+    # Contacts and site links
+    tab_site_ids: List[int] = []
     tournament['contacts'] = []
     for link in soup.find_all(class_="blue full"):
         if link['href'].startswith("mailto:"):
@@ -336,20 +448,40 @@ def scrape_tournament(job_id: int | None, tab_tourn_id: int) -> Tournament:
             })
         else:
             query = parse_qs(urlparse(link["href"]).query)
-            tournament['sites'].append(scrape_tournament_site(
-                tab_tourn_id, int(query['site_id'][0])))
+            tab_site_ids.append(int(query['site_id'][0]))
 
-    # Scrape past results
-    tournament['past_results'] = []
+    # Past results link
+    past_results_link = None
     tournament['webname'] = None
     past_results_elem = soup.find(class_="martop blue full")
     if past_results_elem:
         past_results_link = f'https://www.tabroom.com{past_results_elem["href"]}'
         query = parse_qs(urlparse(past_results_link).query)
         tournament['webname'] = query['webname'][0]
-        soup = get_soup(past_results_link)
 
-        for i, row in enumerate(soup.find_all('tr')):
+    # First wave: everything linked from the homepage
+    first_wave = list(map(lambda tab_webpage_id: get_tournament_page_url(tab_tourn_id, tab_webpage_id), tab_webpage_ids)) + \
+        list(map(lambda tab_site_id: get_tournament_site_url(tab_tourn_id, tab_site_id), tab_site_ids)) + [
+        f'https://www.tabroom.com/index/tourn/events.mhtml?tourn_id={tab_tourn_id}',
+        f'https://www.tabroom.com/index/tourn/schools.mhtml?tourn_id={tab_tourn_id}',
+        f'https://www.tabroom.com/index/tourn/emails.mhtml?tourn_id={tab_tourn_id}'
+    ] + ([past_results_link] if past_results_link else [])
+
+    soups = load(first_wave)
+    page_soups = soups[0:len(tab_webpage_ids)]
+    site_soups = soups[len(tab_webpage_ids):len(tab_webpage_ids) + len(tab_site_ids)]
+    events_soup, schools_soup, emails_soup = soups[len(tab_webpage_ids) + len(tab_site_ids):len(tab_webpage_ids) + len(tab_site_ids) + 3]
+
+    tournament['pages'] = list(map(parse_tournament_page, page_soups, tab_webpage_ids))
+
+    # The invitation is the homepage itself, so it is parsed from the soup already in hand
+    tournament['pages'].append(parse_tournament_page(soup))
+    tournament['sites'] = list(map(parse_tournament_site, site_soups, tab_site_ids))
+
+    # Scrape past results
+    tournament['past_results'] = []
+    if past_results_link:
+        for i, row in enumerate(soups[-1].find_all('tr')):
             if i == 0:
                 continue
             past_result: TournamentPastResult = {}
@@ -363,34 +495,85 @@ def scrape_tournament(job_id: int | None, tab_tourn_id: int) -> Tournament:
                     past_result['tab_tourn_id'] = int(query['tourn_id'][0])
             tournament['past_results'].append(past_result)
 
-    # Scrape events
-    tournament['event_metadata'] = []
-    soup = get_soup(
-        f'https://www.tabroom.com/index/tourn/events.mhtml?tourn_id={tab_tourn_id}')
-    for link in soup.find_all(class_="blue half nowrap marvertno"):
-        query = parse_qs(urlparse(link["href"]).query)
-        tournament['event_metadata'].append(
-            scrape_event_metadata(tab_tourn_id, int(query['event_id'][0])))
-
     # Scrape schools
     # TODO: Test with other countries
     # TODO: Filter only for schools in the event
     tournament['schools'] = []
-    soup = get_soup(
-        f'https://www.tabroom.com/index/tourn/schools.mhtml?tourn_id={tab_tourn_id}')
-    for row in soup.find_all(class_="even") + soup.find_all(class_="odd"):
+    for row in schools_soup.find_all(class_="even") + schools_soup.find_all(class_="odd"):
         school: TournamentInstitutionInAttendance = {}
         school['name'], school['state'] = list(
             map(lambda element: clean_element(element), row.find_all()))
         tournament['schools'].append(school)
 
-    # Scrape emails
-    tournament['emails'] = []
-    soup = get_soup(
-        f'https://www.tabroom.com/index/tourn/emails.mhtml?tourn_id={tab_tourn_id}')
-    for link in soup.find_all(class_="blue block"):
-        query = parse_qs(urlparse(link["href"]).query)
-        tournament['emails'].append(scrape_tournament_email(
-            tab_tourn_id, int(query['email_id'][0])))
+    # Second wave: everything linked from the events and emails listings
+    tab_event_ids = list(map(lambda link: int(parse_qs(urlparse(link["href"]).query)['event_id'][0]),
+                             events_soup.find_all(class_="blue half nowrap marvertno")))
+    tab_email_ids = list(map(lambda link: int(parse_qs(urlparse(link["href"]).query)['email_id'][0]),
+                             emails_soup.find_all(class_="blue block")))
+
+    soups = load(list(map(lambda tab_event_id: get_event_metadata_url(tab_tourn_id, tab_event_id), tab_event_ids)) +
+                 list(map(lambda tab_email_id: get_tournament_email_url(tab_tourn_id, tab_email_id), tab_email_ids)))
+
+    tournament['event_metadata'] = list(map(parse_event_metadata, soups[0:len(tab_event_ids)]))
+    tournament['emails'] = list(map(parse_tournament_email, soups[len(tab_event_ids):]))
+
+    # Results of a tournament that ended over a day ago are final, so its result pages never need re-fetching
+    if 'end' in tournament and datetime.fromisoformat(tournament['end'][0:-1]) < datetime.now() - timedelta(days=1):
+        mark_finished(tab_tourn_id)
 
     return tournament
+
+
+_snapshots: Mapping[int, Tuple[float, Tournament]] = {}
+_snapshot_locks: Mapping[int, threading.Lock] = {}
+_snapshot_locks_lock = threading.Lock()
+
+
+def _evict_snapshots(ttl: float) -> None:
+    """Drops snapshots older than `ttl` seconds, then the oldest ones past MAX_TOURNAMENT_SNAPSHOTS, along with the
+    locks of tournaments no one is scraping. Must be called while holding `_snapshot_locks_lock`.
+
+    Args:
+        ttl (float): The maximum age of a kept snapshot in seconds.
+    """
+
+    now = time.monotonic()
+    by_age = sorted(_snapshots.items(), key=lambda item: item[1][0])
+    expired = [tab_tourn_id for tab_tourn_id, (taken_at, _) in by_age if now - taken_at > ttl]
+    kept = [tab_tourn_id for tab_tourn_id, (taken_at, _) in by_age if now - taken_at <= ttl]
+
+    for tab_tourn_id in expired + kept[0:max(len(kept) - MAX_TOURNAMENT_SNAPSHOTS, 0)]:
+        _snapshots.pop(tab_tourn_id, None)
+        lock = _snapshot_locks.get(tab_tourn_id)
+        if lock and not lock.locked():
+            del _snapshot_locks[tab_tourn_id]
+
+
+def get_tournament(job_id: int | None, tab_tourn_id: int, ttl: float = TOURNAMENT_SNAPSHOT_TTL) -> Tournament:
+    """Gets a tournament, only scraping it if no snapshot younger than `ttl` seconds is memoized. Expired snapshots,
+    and the oldest ones past MAX_TOURNAMENT_SNAPSHOTS, are dropped on each call.
+
+    Args:
+        job_id (int | None): The job the tournament is being scraped for.
+        tab_tourn_id (int): The unique tournament ID assigned to the tournament, visible in the `tourn_id` query parameter.
+        ttl (float, optional): The maximum age of a reusable snapshot in seconds. Defaults to TOURNAMENT_SNAPSHOT_TTL.
+
+    Returns:
+        Tournament: A copy of the snapshot, which callers are free to mutate.
+    """
+
+    with _snapshot_locks_lock:
+        lock = _snapshot_locks.setdefault(tab_tourn_id, threading.Lock())
+
+    # Only one caller scrapes a given tournament, the rest wait for its snapshot
+    with lock:
+        snapshot = _snapshots.get(tab_tourn_id)
+
+        if not snapshot or time.monotonic() - snapshot[0] > ttl:
+            snapshot = (time.monotonic(), scrape_tournament(job_id, tab_tourn_id))
+            _snapshots[tab_tourn_id] = snapshot
+
+    with _snapshot_locks_lock:
+        _evict_snapshots(max(ttl, TOURNAMENT_SNAPSHOT_TTL))
+
+    return copy.deepcopy(snapshot[1])
@@ -0,0 +1,260 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator, List, Mapping, Tuple
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .response_store import ResponseStore
+from .replay import PageArchive
+
+"""Maximum number of requests in flight at once"""
+MAX_WORKERS = 16
+
+"""Maximum number of requests started per second against a single host"""
+REQUESTS_PER_SECOND = 8
+
+
+class RateLimiter:
+    """A thread-safe, per-host rate limiter that spaces out request start times.
+
+    Attributes:
+        interval (float): The minimum number of seconds between two requests to the same host.
+    """
+
+    def __init__(self, requests_per_second: float):
+        self.interval = 1 / requests_per_second
+        self._next_slot: Mapping[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host: str) -> None:
+        """Blocks until a request to `host` may be started.
+
+        Args:
+            host (str): The host the request will be made to.
+        """
+
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def _create_session() -> requests.Session:
+    """Creates a keep-alive session with a connection pool large enough for every worker.
+
+    Returns:
+        requests.Session: The pooled session.
+    """
+
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=MAX_WORKERS,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    return session
+
+
+_session: requests.Session | None = None
+_store: ResponseStore | None = None
+_recording: PageArchive | None = None
+_replaying: PageArchive | None = None
+_lock = threading.Lock()
+rate_limiter = RateLimiter(REQUESTS_PER_SECOND)
+
+
+def get_session() -> requests.Session:
+    """Gets the shared session, creating it on first use.
+
+    Returns:
+        requests.Session: The pooled session shared by all fetches.
+    """
+
+    global _session
+
+    with _lock:
+        if _session is None:
+            _session = _create_session()
+
+    return _session
+
+
+def get_store() -> ResponseStore:
+    """Gets the shared response store, opening it on first use.
+
+    Returns:
+        ResponseStore: The store every fetch reads from and writes to.
+    """
+
+    global _store
+
+    with _lock:
+        if _store is None:
+            _store = ResponseStore()
+
+    return _store
+
+
+def start_recording() -> PageArchive:
+    """Starts recording every fetched page into an archive.
+
+    Returns:
+        PageArchive: The archive pages are recorded into, to be saved once the job completes.
+    """
+
+    global _recording
+
+    _recording = PageArchive()
+
+    return _recording
+
+
+def start_replay(path: str) -> None:
+    """Serves every fetch from a recorded archive instead of the network.
+
+    Args:
+        path (str): The path of an archive saved from `start_recording`.
+    """
+
+    global _replaying
+
+    _replaying = PageArchive.load(path)
+
+
+def mark_finished(tab_tourn_id: int) -> None:
+    """Records that a tournament has finished in the response store, see `ResponseStore.mark_finished`. Replayed runs
+    never write to the store, so this does nothing while replaying.
+
+    Args:
+        tab_tourn_id (int): The unique ID assigned to the tournament, visible in the `tourn_id` query parameter.
+    """
+
+    if not _replaying:
+        get_store().mark_finished(tab_tourn_id)
+
+
+def fetch(url: str) -> str:
+    """Makes a rate-limited GET request over the shared session, serving fresh responses from the response store
+    and revalidating stale ones with `If-None-Match`/`If-Modified-Since`. While replaying, pages are only ever served
+    from the replay archive.
+
+    Args:
+        url (str): The URL to make a GET request to.
+
+    Raises:
+        Exception: Thrown if the request was not made successfully (no 2xx status code).
+
+    Returns:
+        str: The response text.
+    """
+
+    if _replaying:
+        return _replaying.get(url)
+
+    text = _fetch(url)
+
+    if _recording:
+        _recording.add(url, text)
+
+    return text
+
+
+def _fetch(url: str) -> str:
+    """Fetches a URL through the response store, see `fetch`.
+
+    Args:
+        url (str): The URL to make a GET request to.
+
+    Raises:
+        Exception: Thrown if the request was not made successfully (no 2xx status code).
+
+    Returns:
+        str: The response text.
+    """
+
+    store = get_store()
+    stored = store.get(url)
+
+    if stored and store.is_fresh(url, stored):
+        return stored['text']
+
+    headers = {}
+    if stored and stored['etag']:
+        headers['If-None-Match'] = stored['etag']
+    if stored and stored['last_modified']:
+        headers['If-Modified-Since'] = stored['last_modified']
+
+    rate_limiter.wait(urlparse(url).netloc)
+    res = get_session().get(url, headers=headers)
+
+    if res.status_code == 304 and stored:
+        store.touch(url)
+        return stored['text']
+
+    # Retries don't raise once exhausted, so a 429/5xx that kept failing ends up here
+    if not 200 <= res.status_code < 300:
+        raise Exception(f'Error fetching {url} [{res.status_code}]')
+
+    store.put(url, res.text, res.headers.get('ETag'), res.headers.get('Last-Modified'))
+
+    return res.text
+
+
+def fetch_many(urls: List[str], max_workers: int = MAX_WORKERS) -> List[str]:
+    """Fetches a batch of URLs concurrently. Duplicate URLs are only requested once.
+
+    Args:
+        urls (List[str]): The URLs to make GET requests to.
+        max_workers (int, optional): The maximum number of requests in flight. Defaults to MAX_WORKERS.
+
+    Returns:
+        List[str]: The response texts, in the same order as `urls`.
+    """
+
+    unique_urls = list(dict.fromkeys(urls))
+
+    if len(unique_urls) <= 1:
+        texts = list(map(fetch, unique_urls))
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(unique_urls))) as executor:
+            texts = list(executor.map(fetch, unique_urls))
+
+    url_to_text = dict(zip(unique_urls, texts))
+
+    return [url_to_text[url] for url in urls]
+
+
+def iter_fetch(urls: List[str], max_workers: int = MAX_WORKERS) -> Iterator[Tuple[int, str]]:
+    """Fetches a batch of URLs concurrently, yielding each response as soon as it arrives so callers can process
+    pages while the rest of the batch is still in flight.
+
+    Args:
+        urls (List[str]): The URLs to make GET requests to.
+        max_workers (int, optional): The maximum number of requests in flight. Defaults to MAX_WORKERS.
+
+    Yields:
+        Tuple[int, str]: The index of the URL in `urls` and its response text, in completion order.
+    """
+
+    if not urls:
+        return
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(urls))) as executor:
+        future_to_index = {executor.submit(fetch, url): i for i, url in enumerate(urls)}
+
+        for future in as_completed(future_to_index):
+            yield future_to_index.pop(future), future.result()
@@ -0,0 +1,102 @@
+import io
+import json
+import hashlib
+import tarfile
+import threading
+from typing import Mapping
+from .response_store import normalize_url
+
+
+class PageArchive:
+    """An in-memory collection of fetched pages keyed by normalized URL, saved to and loaded from an xz-compressed tarball.
+
+    Attributes:
+        pages (Mapping[str, str]): The page text of each normalized URL.
+    """
+
+    def __init__(self, pages: Mapping[str, str] = None):
+        self.pages: Mapping[str, str] = pages or {}
+        self._lock = threading.Lock()
+
+    def add(self, url: str, text: str) -> None:
+        """Records a fetched page.
+
+        Args:
+            url (str): The URL the page was fetched from.
+            text (str): The page text.
+        """
+
+        with self._lock:
+            self.pages[normalize_url(url)] = text
+
+    def get(self, url: str) -> str:
+        """Gets a recorded page.
+
+        Args:
+            url (str): The URL the page was fetched from.
+
+        Raises:
+            KeyError: Thrown if the page was never recorded.
+
+        Returns:
+            str: The page text.
+        """
+
+        key = normalize_url(url)
+
+        if key not in self.pages:
+            raise KeyError(f"Replay failed: {url} was not recorded.")
+
+        return self.pages[key]
+
+    def save(self, path: str) -> None:
+        """Writes the archive as a tarball of pages plus an `index.json` mapping each URL to its member.
+
+        Args:
+            path (str): The path to write the archive to.
+        """
+
+        with self._lock:
+            pages = dict(self.pages)
+
+        index = {}
+
+        with tarfile.open(path, "w:xz") as archive:
+            for url, text in pages.items():
+                member = f"pages/{hashlib.sha1(url.encode('utf-8')).hexdigest()}.html"
+                index[url] = member
+                _add_member(archive, member, text.encode('utf-8'))
+
+            _add_member(archive, "index.json", json.dumps(index).encode('utf-8'))
+
+    @classmethod
+    def load(cls, path: str) -> 'PageArchive':
+        """Reads an archive written by `save`.
+
+        Args:
+            path (str): The path of the archive.
+
+        Returns:
+            PageArchive: The archive, with every page in memory.
+        """
+
+        with tarfile.open(path, "r:xz") as archive:
+            index = json.loads(archive.extractfile("index.json").read())
+
+            return cls({
+                url: archive.extractfile(member).read().decode('utf-8') for url, member in index.items()
+            })
+
+
+def _add_member(archive: tarfile.TarFile, name: str, data: bytes) -> None:
+    """Adds an in-memory file to a tarball.
+
+    Args:
+        archive (tarfile.TarFile): The tarball being written.
+        name (str): The member name.
+        data (bytes): The member contents.
+    """
+
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    archive.addfile(info, io.BytesIO(data))
@@ -0,0 +1,170 @@
+import os
+import time
+import zlib
+import sqlite3
+import threading
+from typing import List, Tuple, TypedDict
+from urllib.parse import urlparse, parse_qs, parse_qsl, urlencode
+
+"""Path of the SQLite response store, overridable with the `TABROOM_STORE` environment variable"""
+STORE_PATH = os.environ.get('TABROOM_STORE', "tabroom_responses.sqlite")
+
+"""Seconds a response stays fresh, by path prefix (first match wins)"""
+PAGE_TTLS: List[Tuple[str, float]] = [
+    ('/index/tourn/postings/entry_record.mhtml', 10 * 60),
+    ('/index/tourn/results/', 10 * 60),
+    ('/index/tourn/fields.mhtml', 10 * 60),
+    ('/api/download_data', 10 * 60),
+    ('/index/tourn/postings/judge.mhtml', 24 * 60 * 60),
+    # Pairings and other round postings change throughout a running tournament
+    ('/index/tourn/postings/', 10 * 60),
+    ('/index/tourn/', 6 * 60 * 60),
+]
+DEFAULT_TTL = 60 * 60
+
+"""Path prefixes of result pages, which never expire once their tournament has finished"""
+RESULT_PAGES = [
+    '/index/tourn/postings/entry_record.mhtml',
+    '/index/tourn/results/',
+    '/index/tourn/fields.mhtml',
+    '/api/download_data'
+]
+
+
+class StoredResponse(TypedDict):
+    text: str
+    etag: str | None
+    last_modified: str | None
+    fetched_at: float
+
+
+def normalize_url(url: str) -> str:
+    """Normalizes a Tabroom URL so that equivalent URLs share a store key.
+
+    Args:
+        url (str): Any URL.
+
+    Returns:
+        str: The URL over https, without `www.` or a fragment, and with its query parameters sorted.
+    """
+
+    parsed = urlparse(url)
+    host = parsed.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+
+    return f"https://{host}{parsed.path}?{urlencode(sorted(parse_qsl(parsed.query)))}"
+
+
+class ResponseStore:
+    """A compressed on-disk store of Tabroom responses with per-page-type expiry.
+
+    Attributes:
+        path (str): The path of the SQLite database.
+    """
+
+    def __init__(self, path: str = STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses (url TEXT PRIMARY KEY, body BLOB, etag TEXT, last_modified TEXT, fetched_at REAL)")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS finished_tournaments (tab_tourn_id INTEGER PRIMARY KEY, finished_at REAL)")
+        # Tournaments marked before finish times were recorded get one the next time they're marked
+        columns = [row[1] for row in self._connection.execute("PRAGMA table_info(finished_tournaments)")]
+        if 'finished_at' not in columns:
+            self._connection.execute("ALTER TABLE finished_tournaments ADD COLUMN finished_at REAL")
+        self._connection.commit()
+
+    def get(self, url: str) -> StoredResponse | None:
+        """Gets the stored response for a URL, whether or not it is fresh.
+
+        Args:
+            url (str): The URL the response was fetched from.
+
+        Returns:
+            StoredResponse | None: The stored response, or None if the URL was never stored.
+        """
+
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT body, etag, last_modified, fetched_at FROM responses WHERE url = ?", (normalize_url(url),)).fetchone()
+
+        if not row:
+            return None
+
+        return {
+            'text': zlib.decompress(row[0]).decode('utf-8'),
+            'etag': row[1],
+            'last_modified': row[2],
+            'fetched_at': row[3]
+        }
+
+    def put(self, url: str, text: str, etag: str | None, last_modified: str | None) -> None:
+        """Stores a response, compressing its body.
+
+        Args:
+            url (str): The URL the response was fetched from.
+            text (str): The response text.
+            etag (str | None): The response's `ETag` header.
+            last_modified (str | None): The response's `Last-Modified` header.
+        """
+
+        with self._lock:
+            self._connection.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)", (
+                normalize_url(url), zlib.compress(text.encode('utf-8')), etag, last_modified, time.time()))
+            self._connection.commit()
+
+    def touch(self, url: str) -> None:
+        """Marks a stored response as fresh again after a successful revalidation.
+
+        Args:
+            url (str): The URL the response was fetched from.
+        """
+
+        with self._lock:
+            self._connection.execute(
+                "UPDATE responses SET fetched_at = ? WHERE url = ?", (time.time(), normalize_url(url)))
+            self._connection.commit()
+
+    def mark_finished(self, tab_tourn_id: int) -> None:
+        """Records that a tournament has finished, so its result pages fetched (or revalidated) from now on never expire.
+        A tournament keeps the time it was first marked.
+
+        Args:
+            tab_tourn_id (int): The unique ID assigned to the tournament, visible in the `tourn_id` query parameter.
+        """
+
+        with self._lock:
+            self._connection.execute(
+                "INSERT INTO finished_tournaments VALUES (?, ?) ON CONFLICT (tab_tourn_id) DO UPDATE SET finished_at = excluded.finished_at "
+                "WHERE finished_at IS NULL", (tab_tourn_id, time.time()))
+            self._connection.commit()
+
+    def is_fresh(self, url: str, response: StoredResponse) -> bool:
+        """Checks whether a stored response can be served without contacting Tabroom.
+
+        Args:
+            url (str): The URL the response was fetched from.
+            response (StoredResponse): The stored response.
+
+        Returns:
+            bool: Whether the response is fresh. Result pages fetched after their tournament finished always are, while
+            those fetched while it was running (e.g. a half-posted bracket) expire like any other page.
+        """
+
+        path = urlparse(url).path
+
+        if any(map(lambda prefix: path.startswith(prefix), RESULT_PAGES)):
+            tab_tourn_id = parse_qs(urlparse(url).query).get('tourn_id', [None])[0]
+            if tab_tourn_id and tab_tourn_id.isdigit():
+                with self._lock:
+                    finished = self._connection.execute(
+                        "SELECT finished_at FROM finished_tournaments WHERE tab_tourn_id = ?", (int(tab_tourn_id),)).fetchone()
+                if finished and finished[0] is not None and response['fetched_at'] >= finished[0]:
+                    return True
+
+        ttl = next((ttl for prefix, ttl in PAGE_TTLS if path.startswith(prefix)), DEFAULT_TTL)
+
+        return time.time() - response['fetched_at'] < ttl
@@ -1,5 +1,28 @@
+import os
+from typing import Iterator, List, Tuple
 from bs4 import BeautifulSoup
-import requests
+from .fetch import fetch, fetch_many, iter_fetch, MAX_WORKERS
+
+# lxml is several times faster, but repairs Tabroom's malformed tables differently than html.parser. It stays opt-in
+# until every page type has a fixture showing identical output (see tests/unit.py and bin/scripts/compare_parsers.py)
+DEFAULT_PARSER = 'html.parser'
+
+"""The tree builder used for every page, overridable with the `SOUP_PARSER` environment variable (e.g. `lxml`)"""
+PARSER = os.environ.get('SOUP_PARSER', DEFAULT_PARSER)
+
+
+def make_soup(text: str, parser: str | None = None) -> BeautifulSoup:
+    """Parses markup with the configured parser backend.
+
+    Args:
+        text (str): The markup to parse.
+        parser (str | None, optional): The BeautifulSoup tree builder to use. Defaults to None, in which case PARSER is used.
+
+    Returns:
+        BeautifulSoup: The soup created from the markup.
+    """
+
+    return BeautifulSoup(text, parser or PARSER)
 
 
 def get_soup(url: str) -> BeautifulSoup:
@@ -15,9 +38,40 @@ def get_soup(url: str) -> BeautifulSoup:
         BeautifulSoup: The soup created from the response text.
     """
 
-    res = requests.get(url)
+    return make_soup(fetch(url))
+
+
+def get_soups(urls: List[str], max_workers: int = MAX_WORKERS) -> List[BeautifulSoup]:
+    """Get BeautifulSoup objects for a batch of URLs, fetching them concurrently.
+
+    Args:
+        urls (List[str]): The URLs to make GET requests to.
+        max_workers (int, optional): The maximum number of requests in flight. Defaults to MAX_WORKERS.
+
+    Raises:
+        TabroomException: Thrown if any request was not made successfully (no 2xx status code).
+
+    Returns:
+        List[BeautifulSoup]: The soups created from the response texts, in the same order as `urls`.
+    """
+
+    return list(map(make_soup, fetch_many(urls, max_workers)))
+
+
+def iter_soups(urls: List[str], max_workers: int = MAX_WORKERS) -> Iterator[Tuple[int, BeautifulSoup]]:
+    """Get BeautifulSoup objects for a batch of URLs, yielding each one as soon as its response arrives.
+
+    Args:
+        urls (List[str]): The URLs to make GET requests to.
+        max_workers (int, optional): The maximum number of requests in flight. Defaults to MAX_WORKERS.
+
+    Raises:
+        TabroomException: Thrown if any request was not made successfully (no 2xx status code).
+
+    Yields:
+        Tuple[int, BeautifulSoup]: The index of the URL in `urls` and the soup created from its response text, in
+        completion order.
+    """
 
-    if not res.status_code >= 200 and not res.status_code < 300:
-        raise Exception(f'Error fetching {url} [{res.status_code}]')
-    else:
-        return BeautifulSoup(res.text, 'html.parser')
+    for i, text in iter_fetch(urls, max_workers):
+        yield i, make_soup(text)
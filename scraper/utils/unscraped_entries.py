@@ -1,28 +1,53 @@
-from typing import List
+from typing import List, Set
 from ..lib.entry import Entry
 
-def get_unscraped_entries(entries: List[Entry]) -> List[int]:
-    """Returns a list of all unscraped entries by parsing
-    every single round and looking for tab_entry_ids without
-    corresponding entries.
 
-    Args:
-        entries (List[Entry]): The list of (presumably) all entries.
+class EntryFrontier:
+    """Tracks the tab_entry_ids known so far while discovering opponents wave by wave. Each entry's rounds are only
+    inspected once, when the entry is added.
 
-    Returns:
-        List[int]: A list of tab_entry_ids representing the entries
-        that were at the tournament but not included in the supplied list
-        of scraped entries.
+    Attributes:
+        known (Set[int]): The tab_entry_ids of every entry added so far.
+        discovered (Set[int]): The tab_entry_ids handed out for scraping so far.
     """
 
-    known_entries: List[int] = [entry['tab_entry_id'] for entry in entries]
-    unknown_entries: List[int] = []
+    def __init__(self):
+        self.known: Set[int] = set()
+        self.discovered: Set[int] = set()
 
-    for entry in entries:
-        for round in entry['rounds']:
-            if not round['opponent']: continue
-            opp_tab_id = round['opponent']['tab_entry_id']
-            if opp_tab_id not in known_entries and opp_tab_id not in unknown_entries:
-                unknown_entries.append(opp_tab_id)
+    def expect(self, tab_entry_ids: List[int]) -> None:
+        """Marks entries as known before they've been scraped, so that opponents still in flight in the current
+        batch aren't handed out a second time while the batch is streamed in.
+
+        Args:
+            tab_entry_ids (List[int]): The tab_entry_ids of the entries about to be scraped.
+        """
+
+        self.known.update(tab_entry_ids)
+
+    def add(self, entries: List[Entry]) -> List[int]:
+        """Adds newly scraped entries and returns the next batch of opponents to scrape.
+
+        Args:
+            entries (List[Entry]): The entries scraped since the last call.
+
+        Returns:
+            List[int]: The tab_entry_ids of opponents faced by `entries` that are neither known nor already handed out,
+            in the order they were found.
+        """
+
+        for entry in entries:
+            self.known.add(entry['tab_entry_id'])
+
+        unknown_entries: List[int] = []
+
+        for entry in entries:
+            for round in entry['rounds']:
+                if not round['opponent']: continue
+                opp_tab_id = round['opponent']['tab_entry_id']
+                if opp_tab_id not in self.known and opp_tab_id not in self.discovered:
+                    self.discovered.add(opp_tab_id)
+                    unknown_entries.append(opp_tab_id)
+
+        return unknown_entries
 
-    return unknown_entries
\ No newline at end of file
@@ -0,0 +1,141 @@
+import os
+import gzip
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, TypeVar
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+"""Maximum number of API requests in flight at once, overridable with the `API_MAX_WORKERS` environment variable"""
+API_MAX_WORKERS = int(os.environ.get('API_MAX_WORKERS', 8))
+
+"""Request bodies at least this large (in bytes) are gzipped"""
+GZIP_MIN_BYTES = 1024
+
+
+class ApiRetry(Retry):
+    """urllib3's retry policy, except that rate limited (429) requests are retried whatever their method, since the API
+    rejected them without processing them. Other failures are only retried for idempotent methods: a 5xx after a
+    POST may come after its rows were created, so resuming those is left to the upload journal and division diff.
+    """
+
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if status_code == 429:
+            return bool(self.total)
+
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+class ApiSession(requests.Session):
+    """A keep-alive session for the Debate Land API. JSON bodies are gzipped when large enough, and requests are
+    retried with exponential backoff when the API is rate limiting (429), or failing (5xx) on an idempotent request.
+
+    Attributes:
+        max_workers (int): The maximum number of requests `map` keeps in flight.
+    """
+
+    def __init__(self, max_workers: int = API_MAX_WORKERS):
+        super().__init__()
+        self.max_workers = max_workers
+
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=max_workers,
+            max_retries=ApiRetry(
+                total=5,
+                backoff_factor=0.5,
+                status_forcelist=[429, 500, 502, 503, 504],
+                respect_retry_after_header=True,
+                raise_on_status=False
+            )
+        )
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def request(self, method: str, url: str, *args, json: dict | list | None = None, headers: dict | None = None, **kwargs) -> requests.Response:
+        """Sends a request, serializing and (if large enough) gzipping its JSON body.
+
+        Args:
+            method (str): The HTTP method.
+            url (str): The URL.
+            json (dict | list | None, optional): A JSON body. Defaults to None.
+            headers (dict | None, optional): Extra headers. Defaults to None.
+
+        Returns:
+            requests.Response: The response.
+        """
+
+        if json is None:
+            return super().request(method, url, *args, headers=headers, **kwargs)
+
+        kwargs.pop('data', None)
+        headers = dict(headers or {})
+        headers['Content-Type'] = 'application/json'
+        body = _dumps(json)
+
+        if len(body) >= GZIP_MIN_BYTES:
+            body = gzip.compress(body, compresslevel=5)
+            headers['Content-Encoding'] = 'gzip'
+
+        return super().request(method, url, *args, data=body, headers=headers, **kwargs)
+
+    def map(self, fn: Callable[[T], R], items: Iterable[T], max_workers: int | None = None) -> List[R]:
+        """Calls `fn` (which should make API requests through this session) on every item, keeping a bounded number
+        of calls in flight.
+
+        Args:
+            fn (Callable[[T], R]): The function to call.
+            items (Iterable[T]): The items to call it on.
+            max_workers (int | None, optional): The maximum number of concurrent calls. Defaults to None, in which
+            case `max_workers` is used.
+
+        Returns:
+            List[R]: The return value of each call, in the same order as `items`.
+        """
+
+        items = list(items)
+        max_workers = min(max_workers or self.max_workers, len(items))
+
+        if max_workers <= 1:
+            return list(map(fn, items))
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(fn, items))
+
+
+def _dumps(body: dict | list) -> bytes:
+    """Serializes a JSON body compactly.
+
+    Args:
+        body (dict | list): The body.
+
+    Returns:
+        bytes: The UTF-8 encoded JSON.
+    """
+
+    return json.dumps(body, separators=(',', ':')).encode('utf-8')
+
+
+_session: ApiSession | None = None
+_lock = threading.Lock()
+
+
+def get_api_session() -> ApiSession:
+    """Gets the API session shared by every pipeline, creating it on first use.
+
+    Returns:
+        ApiSession: The shared session.
+    """
+
+    global _session
+
+    with _lock:
+        if _session is None:
+            _session = ApiSession()
+
+    return _session
@@ -0,0 +1,64 @@
+import hashlib
+from functools import lru_cache
+from unidecode import unidecode
+from typing import Iterable, List, Mapping, Tuple
+
+"""Number of distinct IDs kept in memory, enough for every team, competitor and judge in a large tournament"""
+ID_CACHE_SIZE = 1 << 16
+
+
+@lru_cache(maxsize=ID_CACHE_SIZE)
+def _hash_nodes(nodes: Tuple[str, ...]) -> str:
+    """Hashes the components of an ID, see `get_id`.
+
+    Args:
+        nodes (Tuple[str, ...]): The components to be used in getting the ID.
+
+    Returns:
+        str: The 24 character object ID.
+    """
+
+    nodes = list(map(unidecode, nodes))
+    nodes = sorted(nodes)
+    return hashlib.sha224(
+        "".join(nodes).lower().encode('utf-8')
+    ).hexdigest()[0:24]
+
+
+def get_id(nodes: List[str]) -> str:
+    """Gets a unique object ID. IDs are memoized, so repeated calls with the same components don't rehash.
+
+    Args:
+        nodes (List[str]): The components to be used in getting the ID.
+
+    Returns:
+        str: The 24 character object ID.
+    """
+
+    return _hash_nodes(tuple(nodes))
+
+
+def get_name_id(name: str) -> str:
+    """Gets the ID of a competitor or judge from their full name.
+
+    Args:
+        name (str): The full name, e.g. "First Last".
+
+    Returns:
+        str: The 24 character object ID.
+    """
+
+    return get_id(name.split(' '))
+
+
+def get_ids(names: Iterable[str]) -> Mapping[str, str]:
+    """Gets the IDs of many competitors or judges at once, hashing each distinct name a single time.
+
+    Args:
+        names (Iterable[str]): The full names, which may repeat.
+
+    Returns:
+        Mapping[str, str]: The ID of each distinct name.
+    """
+
+    return {name: get_name_id(name) for name in dict.fromkeys(names)}
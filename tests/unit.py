@@ -0,0 +1,611 @@
+import os
+import copy
+import json
+import math
+import statistics
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+from scraper.utils.soup import make_soup
+from scraper.lib.entries import parse_entry_fragments, parse_tab_entry_ids, assign_tab_entry_ids
+from scraper.lib.entry import parse_entry
+from scraper.lib.download_data import get_entries_from_download_data
+from scraper.lib import tournament
+from scraper.utils.response_store import ResponseStore
+from scraper.utils import fetch
+from scraper.utils.unscraped_entries import EntryFrontier
+from pipelines.utils.robust_stats import mean, stdev, iqr_mean, trimmed_mean, grouped_stats
+from pipelines.utils.iqr import apply_iqr
+from pipelines.utils.otr_comp import compute_division_comps
+from pipelines.utils.record_table import RecordTable
+from pipelines.utils.upload_journal import UploadJournal
+from pipelines.utils.upload_stages import UploadStage, run_stages
+from pipelines.utils.division_diff import match_rows, diff_fields, same_rows
+from pipelines.uploader import _chunk_rows, _get_result_update, _get_stored_record_key
+from pipelines.transformer import DivisionTransformer
+
+"""Saved Tabroom pages of a three-entry division (tourn_id 1000, event_id 2000)"""
+TABROOM_DATA = os.path.join(os.path.dirname(__file__), "data", "tabroom")
+
+TAB_ENTRY_IDS = [5001, 5002, 5003]
+
+
+def read_page(name: str) -> str:
+    with open(os.path.join(TABROOM_DATA, name)) as f:
+        return f.read()
+
+
+def scrape_pages(parser: str | None = None) -> list:
+    """Runs the HTML scraping path over the saved pages, as `scrape_entries` and `parse_entry` do over live ones."""
+
+    fragments = parse_entry_fragments(make_soup(read_page("fields.html"), parser))
+    assign_tab_entry_ids(fragments, make_soup(read_page("ranked_list.html"), parser))
+
+    return sorted(map(lambda f: parse_entry(f, make_soup(read_page(f"entry_{f['tab_entry_id']}.html"), parser)), fragments),
+                  key=lambda e: e['tab_entry_id'])
+
+
+class TestParsers(unittest.TestCase):
+    def test_fields(self):
+        self.assertEqual(parse_entry_fragments(make_soup(read_page("fields.html"), 'html.parser')),
+                         parse_entry_fragments(make_soup(read_page("fields.html"), 'lxml')))
+
+    def test_ranked_list(self):
+        tab_entry_ids = parse_tab_entry_ids(make_soup(read_page("ranked_list.html"), 'html.parser'))
+        self.assertEqual([5001, 5003, 5002], list(map(lambda e: e['tab_entry_id'], tab_entry_ids)))
+        self.assertEqual(tab_entry_ids, parse_tab_entry_ids(make_soup(read_page("ranked_list.html"), 'lxml')))
+
+    def test_entry_records(self):
+        entries = scrape_pages('html.parser')
+        self.assertEqual(TAB_ENTRY_IDS, list(map(lambda e: e['tab_entry_id'], entries)))
+        self.assertEqual(entries, scrape_pages('lxml'))
+
+
+def ranked_list(rows: list) -> str:
+    """Builds a "Prelim Records" page from (code, school, tab_entry_id) rows."""
+
+    return '<table id="ranked_list"><tr><th>Code</th><th>School</th></tr>' + ''.join(map(
+        lambda row: f'<tr><td><a href="/index/tourn/postings/entry_record.mhtml?tourn_id=1000&entry_id={row[2]}">{row[0]}</a></td><td>{row[1]}</td></tr>', rows)) + '</table>'
+
+
+class TestAssignTabEntryIds(unittest.TestCase):
+    def test_shared_code_by_school(self):
+        fragments = [{'code': "Smith", 'school': "Alpha"}, {'code': "Smith", 'school': "Beta"}, {'code': "Lee", 'school': "Alpha"}]
+        assign_tab_entry_ids(fragments, make_soup(ranked_list([("Lee", "Alpha", 3), ("Smith", "Beta", 2), ("Smith", "Alpha", 1)])))
+        self.assertEqual([1, 2, 3], list(map(lambda f: f['tab_entry_id'], fragments)))
+
+    def test_shared_code_and_school(self):
+        fragments = [{'code': "Smith", 'school': "Alpha"}, {'code': "Smith", 'school': "Alpha"}, {'code': "Lee", 'school': "Alpha"}]
+        assign_tab_entry_ids(fragments, make_soup(ranked_list([("Smith", "Alpha", 1), ("Smith", "Alpha", 2), ("Lee", "Alpha", 3)])))
+        self.assertEqual([{'code': "Lee", 'school': "Alpha", 'tab_entry_id': 3}], fragments)
+
+
+class TestDownloadData(unittest.TestCase):
+    def setUp(self):
+        with open(os.path.join(TABROOM_DATA, "download_data.json")) as f:
+            self.download_data = json.load(f)
+
+    def test_matches_entry_pages(self):
+        entries = sorted(get_entries_from_download_data(None, self.download_data, 2000), key=lambda e: e['tab_entry_id'])
+        self.assertEqual(scrape_pages(), entries)
+
+    def test_elim_panel(self):
+        self.download_data['categories'][0]['events'][0]['rounds'][2]['type'] = "prelim"
+        entry = get_entries_from_download_data(None, self.download_data, 2000)[0]
+        self.assertEqual(["Elim", "Prelim", "Prelim"], list(map(lambda r: r['type'], entry['rounds'])))
+
+    def test_side_labels(self):
+        self.download_data['categories'][0]['events'][0]['settings'] = {'aff_label': "Gov", 'neg_label': "Opp"}
+        entry = get_entries_from_download_data(None, self.download_data, 2000)[0]
+        self.assertEqual(["Pro", "Con", "Pro"], list(map(lambda r: r['side'], entry['rounds'])))
+
+    def test_fallback(self):
+        self.assertIsNone(get_entries_from_download_data(None, self.download_data, 2001))
+        del self.download_data['schools'][0]['students']
+        self.assertIsNone(get_entries_from_download_data(None, self.download_data, 2000))
+
+
+class TestDivisionDiff(unittest.TestCase):
+    def test_match_rows(self):
+        stored = [{'id': 1, 'key': "a"}, {'id': 2, 'key': "b"}, {'id': 3, 'key': "a"}]
+        match = match_rows(stored, ["a", "c", "c"], lambda row: row['key'])
+        self.assertEqual({"a": stored[0]}, match['matches'])
+        self.assertEqual([1], match['inserts'])
+        self.assertEqual([3, 2], match['deletes'])
+
+    def test_diff_fields(self):
+        stored = {'wins': 1, 'points': 28.1, 'isGhostBid': False, 'side': "Aff"}
+        self.assertEqual({}, diff_fields(stored, {'wins': 1.0, 'points': 28.1 + 1e-12, 'isGhostBid': False, 'side': "Aff"},
+                                         ['wins', 'points', 'isGhostBid', 'side']))
+        self.assertEqual({'wins': None, 'points': 28.1001}, diff_fields(stored, {'wins': None, 'points': 28.1001, 'isGhostBid': False, 'side': "Aff"},
+                                                                        ['wins', 'points', 'isGhostBid', 'side']))
+
+    def test_same_rows(self):
+        stored = [{'id': 1, 'judgeId': "j1", 'points': 28}, {'id': 2, 'judgeId': "j2", 'points': 28.5}]
+        self.assertTrue(same_rows(stored, [{'judgeId': "j2", 'points': 28.5}, {'judgeId': "j1", 'points': 28.0}], ['judgeId', 'points']))
+        self.assertFalse(same_rows(stored, [{'judgeId': "j1", 'points': 28}], ['judgeId', 'points']))
+
+    def test_stored_record_key(self):
+        record = {'judgeId': "j1", 'rounds': [{'nameStd': "R1"}], 'teams': [{'id': "t2"}, {'id': "t1"}]}
+        self.assertEqual("j1|R1|t1,t2", _get_stored_record_key(record))
+        self.assertEqual("j1|None|t1,t2", _get_stored_record_key({**record, 'rounds': []}))
+
+
+class TestResultUpdate(unittest.TestCase):
+    def setUp(self):
+        self.stored = {
+            'prelimWins': 2,
+            'speaking': [{'competitorId': "c1", 'rawAvgPoints': 28.5}],
+            'bid': None,
+            'rounds': [{'id': 10, 'nameStd': "R1", 'side': "Aff", 'speaking': [{'judgeId': "j1", 'points': 28.5}]}]
+        }
+        self.body = {
+            'prelimWins': 2.0,
+            'speaking': {'create': [{'competitorId': "c1", 'rawAvgPoints': 28.5}]},
+            'rounds': {'create': [{'nameStd': "R1", 'side': "Aff", 'speaking': {'create': [{'judgeId': "j1", 'points': 28.5}]}}]}
+        }
+
+    def get_update(self) -> dict:
+        round_match = match_rows(self.stored['rounds'], list(map(lambda r: r['nameStd'], self.body['rounds']['create'])),
+                                 lambda r: r['nameStd'])
+        return _get_result_update(self.stored, self.body, round_match)
+
+    def test_unchanged(self):
+        self.assertEqual({}, self.get_update())
+
+    def test_changed(self):
+        self.body['prelimWins'] = 3
+        self.body['bid'] = {'create': {'value': "Full", 'isGhostBid': False}}
+        self.body['rounds']['create'][0]['side'] = "Neg"
+        new_round = {'nameStd': "R2", 'side': "Aff", 'speaking': {'create': []}}
+        self.body['rounds']['create'].append(new_round)
+
+        update = self.get_update()
+        self.assertEqual(3, update['prelimWins'])
+        self.assertEqual({'create': {'value': "Full", 'isGhostBid': False}, 'update': {'value': "Full", 'isGhostBid': False}},
+                         update['bid']['upsert'])
+        self.assertEqual({'create': [new_round], 'update': [{'where': {'id': 10}, 'data': {'side': "Neg"}}]}, update['rounds'])
+        self.assertNotIn('speaking', update)
+
+    def test_deleted_bid(self):
+        self.stored['bid'] = {'value': "Full", 'isGhostBid': False}
+        self.assertEqual({'bid': {'delete': True}}, self.get_update())
+
+
+class TestUploadJournal(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.journal = UploadJournal(os.path.join(self.directory.name, "journal.sqlite"))
+
+    def tearDown(self):
+        self.journal._connection.close()
+        self.directory.cleanup()
+
+    def test_put_get(self):
+        self.assertEqual({}, self.journal.get(2000, 'teamResults'))
+        self.journal.put(2000, 'teamResults', {"t1": 1, "t2": None})
+        self.journal.put(2000, 'teamResults', {"t2": 2})
+        self.journal.put(2000, 'judgeResults', {"j1": 3})
+        self.journal.put(2001, 'teamResults', {"t1": 4})
+
+        self.assertEqual({"t1": 1, "t2": 2}, self.journal.get(2000, 'teamResults'))
+        self.assertEqual({"j1": 3}, self.journal.get(2000, 'judgeResults'))
+        self.assertEqual({"t1": 4}, self.journal.get(2001, 'teamResults'))
+
+    def test_reopen(self):
+        self.journal.put(2000, 'teamResults', {"t1": 1, "t2": None})
+        journal = UploadJournal(self.journal.path)
+        self.assertEqual({"t1": 1, "t2": None}, journal.get(2000, 'teamResults'))
+        journal._connection.close()
+
+    def test_clear(self):
+        self.journal.put(2000, 'teamResults', {"t1": 1})
+        self.journal.put(2001, 'teamResults', {"t1": 2})
+        self.journal.clear(2000)
+
+        self.assertEqual({}, self.journal.get(2000, 'teamResults'))
+        self.assertEqual({"t1": 2}, self.journal.get(2001, 'teamResults'))
+
+
+class TestRunStages(unittest.TestCase):
+    def test_order(self):
+        order = []
+        run_stages([
+            UploadStage("records", lambda: order.append("records"), ["teams", "judges"]),
+            UploadStage("judges", lambda: order.append("judges")),
+            UploadStage("teams", lambda: order.append("teams"))
+        ])
+        self.assertEqual("records", order[-1])
+        self.assertEqual(["judges", "records", "teams"], sorted(order))
+
+    def test_unknown_dependency(self):
+        with self.assertRaisesRegex(ValueError, "unknown stages"):
+            run_stages([UploadStage("records", lambda: None, ["teams"])])
+
+    def test_cycle(self):
+        with self.assertRaisesRegex(ValueError, "circular dependencies"):
+            run_stages([
+                UploadStage("paradigms", lambda: None),
+                UploadStage("teams", lambda: None, ["records"]),
+                UploadStage("records", lambda: None, ["teams"])
+            ])
+
+    def test_failed_stage(self):
+        order = []
+
+        def fail():
+            raise RuntimeError("teams failed")
+
+        with self.assertRaisesRegex(RuntimeError, "teams failed"):
+            run_stages([
+                UploadStage("teams", fail),
+                UploadStage("records", lambda: order.append("records"), ["teams"])
+            ])
+        self.assertEqual([], order)
+
+
+class TestChunkRows(unittest.TestCase):
+    def test_max_rows(self):
+        rows = [{'id': i} for i in range(7)]
+        chunks = list(_chunk_rows(rows, max_rows=3))
+        self.assertEqual([3, 3, 1], list(map(len, chunks)))
+        self.assertEqual(rows, [row for chunk in chunks for row in chunk])
+
+    def test_max_bytes(self):
+        rows = [{'name': "x" * 10} for _ in range(5)]
+        row_bytes = len(json.dumps(rows[0]))
+        chunks = list(_chunk_rows(rows, max_bytes=2 * row_bytes))
+        self.assertEqual([2, 2, 1], list(map(len, chunks)))
+
+    def test_oversized_row(self):
+        rows = [{'name': "x"}, {'name': "x" * 100}, {'name': "x"}]
+        self.assertEqual([[rows[0]], [rows[1]], [rows[2]]], list(_chunk_rows(rows, max_bytes=50)))
+
+    def test_empty(self):
+        self.assertEqual([], list(_chunk_rows([])))
+
+
+class TestResponseStore(unittest.TestCase):
+    RESULTS_URL = "https://www.tabroom.com/index/tourn/results/index.mhtml?tourn_id=1000"
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = ResponseStore(os.path.join(self.directory.name, "responses.sqlite"))
+        self.now = 1000000.0
+        self.clock = mock.patch('scraper.utils.response_store.time.time', lambda: self.now)
+        self.clock.start()
+
+    def tearDown(self):
+        self.clock.stop()
+        self.store._connection.close()
+        self.directory.cleanup()
+
+    def test_ttl(self):
+        url = "https://www.tabroom.com/index/tourn/index.mhtml?tourn_id=1000"
+        self.store.put(url, "<html></html>", None, None)
+        self.now += 6 * 60 * 60 - 1
+        self.assertTrue(self.store.is_fresh(url, self.store.get(url)))
+        self.now += 1
+        self.assertFalse(self.store.is_fresh(url, self.store.get(url)))
+
+    def test_finished_tournament(self):
+        self.store.put(self.RESULTS_URL, "half-posted", None, None)
+        self.now += 1
+        self.store.mark_finished(1000)
+        self.now += 24 * 60 * 60
+        self.assertFalse(self.store.is_fresh(self.RESULTS_URL, self.store.get(self.RESULTS_URL)))
+
+        self.store.put(self.RESULTS_URL, "final", None, None)
+        self.now += 365 * 24 * 60 * 60
+        self.assertTrue(self.store.is_fresh(self.RESULTS_URL, self.store.get(self.RESULTS_URL)))
+
+    def test_not_modified(self):
+        self.store.put(self.RESULTS_URL, "final", '"v1"', None)
+        self.now += 1
+        self.store.mark_finished(1000)
+        self.now += 60 * 60
+        self.assertFalse(self.store.is_fresh(self.RESULTS_URL, self.store.get(self.RESULTS_URL)))
+
+        session = mock.Mock()
+        session.get.return_value = mock.Mock(status_code=304)
+        with mock.patch.object(fetch, 'get_store', lambda: self.store), mock.patch.object(fetch, 'get_session', lambda: session), \
+                mock.patch.object(fetch.rate_limiter, 'wait'):
+            self.assertEqual("final", fetch._fetch(self.RESULTS_URL))
+
+        session.get.assert_called_once_with(self.RESULTS_URL, headers={'If-None-Match': '"v1"'})
+        self.assertEqual(self.now, self.store.get(self.RESULTS_URL)['fetched_at'])
+        self.assertTrue(self.store.is_fresh(self.RESULTS_URL, self.store.get(self.RESULTS_URL)))
+
+
+def baseline_apply_iqr(x: list) -> list:
+    """`apply_iqr` as it was before the robust-stats module, which the vectorized stats must match."""
+
+    upper_quartile = np.percentile(np.array(x), 75)
+    lower_quartile = np.percentile(np.array(x), 25)
+    iqr = (upper_quartile - lower_quartile) * 1.5
+
+    return [y for y in x if lower_quartile - iqr <= y <= upper_quartile + iqr]
+
+
+"""Speaker points with an outlier, ties, a single value and an even count"""
+POINTS = [[28.5, 29, 27.5, 28, 29.3, 22], [28, 28, 28, 28], [28.7], [27, 29.5]]
+
+
+class TestTournamentSnapshots(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        self.scraped = []
+        self.patches = [
+            mock.patch('scraper.lib.tournament.time.monotonic', lambda: self.now),
+            mock.patch('scraper.lib.tournament.scrape_tournament', lambda job_id, tab_tourn_id: self.scraped.append(tab_tourn_id) or {'tab_tourn_id': tab_tourn_id}),
+            mock.patch.dict(tournament._snapshots, clear=True),
+            mock.patch.dict(tournament._snapshot_locks, clear=True)
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in reversed(self.patches):
+            patch.stop()
+
+    def test_expired(self):
+        tournament.get_tournament(None, 1)
+        self.now += tournament.TOURNAMENT_SNAPSHOT_TTL
+        tournament.get_tournament(None, 2)
+        self.assertEqual({1, 2}, set(tournament._snapshots.keys()))
+
+        self.now += 1
+        self.assertEqual({'tab_tourn_id': 2}, tournament.get_tournament(None, 2))
+        self.assertEqual({2}, set(tournament._snapshots.keys()))
+        self.assertEqual({2}, set(tournament._snapshot_locks.keys()))
+        self.assertEqual([1, 2], self.scraped)
+
+    def test_size_bound(self):
+        with mock.patch('scraper.lib.tournament.MAX_TOURNAMENT_SNAPSHOTS', 2):
+            for tab_tourn_id in [1, 2, 3, 1]:
+                tournament.get_tournament(None, tab_tourn_id)
+                self.now += 1
+
+        self.assertEqual({1, 3}, set(tournament._snapshots.keys()))
+        self.assertEqual([1, 2, 3, 1], self.scraped)
+
+
+class TestRobustStats(unittest.TestCase):
+    def test_single_list(self):
+        for points in POINTS:
+            self.assertAlmostEqual(statistics.mean(points), mean(points))
+            self.assertEqual(baseline_apply_iqr(points), apply_iqr(points))
+            self.assertAlmostEqual(statistics.mean(baseline_apply_iqr(points)), iqr_mean(points))
+            if len(points) > 1:
+                self.assertAlmostEqual(statistics.stdev(points), stdev(points))
+            if len(points) > 2:
+                self.assertAlmostEqual(statistics.mean(sorted(points)[1:-1]), trimmed_mean(points, 1))
+
+    def test_empty(self):
+        self.assertIsNone(mean([]))
+        self.assertIsNone(iqr_mean([]))
+        self.assertIsNone(stdev([28.5]))
+        self.assertIsNone(trimmed_mean([28, 29], 1))
+        self.assertIsNone(trimmed_mean([28, 29, 30, 27], 2))
+
+    def test_grouped(self):
+        keys = [key for key, points in enumerate(POINTS) for _ in points]
+        values = [p for points in POINTS for p in points]
+        # Interleaved, so no group is contiguous
+        order = sorted(range(len(keys)), key=lambda i: (i % 3, i))
+        stats = grouped_stats([keys[i] for i in order], [values[i] for i in order])
+
+        self.assertEqual(len(POINTS), len(stats['keys']))
+        for i, key in enumerate(stats['keys']):
+            points = POINTS[key]
+            self.assertEqual(len(points), stats['count'][i])
+            self.assertAlmostEqual(statistics.mean(points), stats['mean'][i])
+            self.assertAlmostEqual(statistics.mean(baseline_apply_iqr(points)), stats['iqr_mean'][i])
+            if len(points) > 1:
+                self.assertAlmostEqual(statistics.stdev(points), stats['stdev'][i])
+            else:
+                self.assertTrue(math.isnan(stats['stdev'][i]))
+            if len(points) > 2:
+                self.assertAlmostEqual(statistics.mean(sorted(points)[1:-1]), stats['mean_1hl'][i])
+            else:
+                self.assertTrue(math.isnan(stats['mean_1hl'][i]))
+            if len(points) > 4:
+                self.assertAlmostEqual(statistics.mean(sorted(points)[2:-2]), stats['mean_2hl'][i])
+            else:
+                self.assertTrue(math.isnan(stats['mean_2hl'][i]))
+
+
+def baseline_comps(team_results: list, team_rounds: list, tournament_boost: float) -> dict:
+    """opWpM, RxR and OTR Comp as `transform_data` computed them before the NumPy kernel, by team ID."""
+
+    def get_p_wp(result: dict) -> float:
+        return result['prelim_ballots_won'] / (result['prelim_ballots_won'] + result['prelim_ballots_lost'])
+
+    comps = {}
+    for team_id, rounds in team_rounds:
+        result = next(r for r in team_results if r['team_id'] == team_id)
+        if result['prelim_ballots_won'] + result['prelim_ballots_lost'] == 0:
+            continue
+
+        p_wp = get_p_wp(result)
+        op_wp_m, op_wp_m_winning, op_wp_m_losing, rxr = [], [], [], 0
+        for round in rounds:
+            opponent = next((r for r in team_results if r['team_id'] == round['opponent_id']), None)
+            if not opponent or opponent['prelim_ballots_won'] + opponent['prelim_ballots_lost'] == 0:
+                continue
+
+            op_pwp = get_p_wp(opponent)
+            (op_wp_m_winning if round['outcome'] == "Win" else op_wp_m_losing).append(op_pwp)
+            op_wp_m.append(op_pwp)
+
+            delta_pwp = op_pwp - p_wp
+            if round['type'] == "Elim" or delta_pwp <= 0 or round['outcome'] != "Win":
+                continue
+            rxr += .12 * ((delta_pwp + 0.7)**16 / (0.5 + (delta_pwp + 0.7)**10))**(1/2)
+
+        break_boost = (result['elim_wins'] or 0) + (result['elim_losses'] or 0) + 1
+        comps[team_id] = {
+            'op_wp_m': statistics.mean(op_wp_m),
+            'op_wp_m_winning': statistics.mean(op_wp_m_winning) if op_wp_m_winning else 0,
+            'op_wp_m_losing': statistics.mean(op_wp_m_losing) if op_wp_m_losing else 0,
+            'rxr': rxr,
+            'otr_comp': (p_wp * break_boost * (statistics.mean(op_wp_m) + 0.625) * tournament_boost + rxr) / 3
+        }
+
+    return comps
+
+
+def team_result(team_id: str, won: int, lost: int, elim_wins: int = 0, elim_losses: int = 0) -> dict:
+    return {'team_id': team_id, 'prelim_ballots_won': won, 'prelim_ballots_lost': lost, 'elim_wins': elim_wins, 'elim_losses': elim_losses}
+
+
+def team_round(team_id: str, opponent_id: str | None, outcome: str, type: str = "Prelim") -> dict:
+    return {'team_id': team_id, 'opponent_id': opponent_id, 'outcome': outcome, 'type': type}
+
+
+"""A division with tied pWps (C and D), an upset elim, a bye and a team without prelim ballots (E)"""
+COMP_RESULTS = [team_result("A", 3, 1, 1, 1), team_result("B", 1, 3), team_result("C", 2, 2), team_result("D", 2, 2, 1), team_result("E", 0, 0)]
+COMP_ROUNDS = [
+    ("A", [team_round("A", "B", "Win"), team_round("A", "C", "Loss"), team_round("A", None, "Win"), team_round("A", "D", "Loss", "Elim")]),
+    ("B", [team_round("B", "A", "Loss"), team_round("B", "D", "Win"), team_round("B", "C", "Loss"), team_round("B", "E", "Win")]),
+    ("C", [team_round("C", "A", "Win"), team_round("C", "B", "Win"), team_round("C", "D", "Win")]),
+    ("D", [team_round("D", "B", "Loss"), team_round("D", "C", "Loss"), team_round("D", "A", "Win", "Elim")]),
+    ("E", [team_round("E", "B", "Loss")])
+]
+
+
+class TestOtrComps(unittest.TestCase):
+    def test_division_comps(self):
+        expected = baseline_comps(COMP_RESULTS, COMP_ROUNDS, 1.2)
+        p_wp = {r['team_id']: r['prelim_ballots_won'] / (r['prelim_ballots_won'] + r['prelim_ballots_lost'])
+                for r in COMP_RESULTS if r['prelim_ballots_won'] + r['prelim_ballots_lost']}
+        team_ids = list(expected.keys())
+        rounds = [round for team_id, team_rounds in COMP_ROUNDS if team_id in p_wp for round in team_rounds]
+
+        comps = compute_division_comps(
+            np.array([team_ids.index(round['team_id']) for round in rounds]),
+            np.array([p_wp.get(round['opponent_id'], np.nan) for round in rounds], dtype=float),
+            np.array([round['outcome'] == "Win" for round in rounds]),
+            np.array([round['type'] == "Elim" for round in rounds]),
+            np.array([p_wp[team_id] for team_id in team_ids]),
+            np.array([next(r['elim_wins'] + r['elim_losses'] + 1 for r in COMP_RESULTS if r['team_id'] == team_id) for team_id in team_ids]),
+            1.2
+        )
+
+        for i, team_id in enumerate(team_ids):
+            for field in ['op_wp_m', 'op_wp_m_winning', 'op_wp_m_losing', 'rxr', 'otr_comp']:
+                self.assertAlmostEqual(expected[team_id][field], comps[field][i], msg=f"{team_id} {field}")
+        self.assertGreater(expected["B"]['rxr'], 0)
+
+    def test_transformer(self):
+        transformer = object.__new__(DivisionTransformer)
+        transformer.team_results = copy.deepcopy(COMP_RESULTS) + [team_result("F", 1, 1)]
+        transformer._entry_rounds = [(i, rounds, [], []) for i, (_, rounds) in enumerate(COMP_ROUNDS + [("F", [team_round("F", None, "Win")])])]
+        transformer.tab_entry_id_to_entry_uuid = {i: team_id for i, (team_id, _) in enumerate(COMP_ROUNDS + [("F", [])])}
+        transformer.tournament_boost = 1.2
+        transformer._compute_otr_comps()
+
+        expected = baseline_comps(COMP_RESULTS, COMP_ROUNDS, 1.2)
+        results = {result['team_id']: result for result in transformer.team_results}
+        for team_id, comps in expected.items():
+            for field, value in comps.items():
+                self.assertAlmostEqual(value, results[team_id][field], msg=f"{team_id} {field}")
+        self.assertNotIn('otr_comp', results["E"])
+        self.assertIsNone(results["F"]['op_wp_m'])
+        self.assertIsNone(results["F"]['otr_comp'])
+
+    def test_no_valid_rounds(self):
+        comps = compute_division_comps(np.array([0, 1]), np.array([np.nan, 0.5]), np.array([True, True]), np.array([False, False]),
+                                       np.array([0.5, 0.5]), np.array([1, 1]), 1.0)
+        self.assertTrue(math.isnan(comps['op_wp_m'][0]))
+        self.assertTrue(math.isnan(comps['otr_comp'][0]))
+        self.assertEqual(0, comps['op_wp_m_winning'][0])
+        self.assertEqual(0, comps['rxr'][1])
+
+
+def frontier_entry(tab_entry_id: int, opponents: list) -> dict:
+    return {'tab_entry_id': tab_entry_id, 'rounds': list(map(lambda o: {'opponent': o and {'tab_entry_id': o}}, opponents))}
+
+
+class TestEntryFrontier(unittest.TestCase):
+    def test_waves(self):
+        frontier = EntryFrontier()
+        frontier.expect([1, 2, 3])
+
+        # 2 is still in flight, so only 4 is new, and neither is handed out again by later entries of the batch
+        self.assertEqual([4], frontier.add([frontier_entry(1, [2, 4, 4])]))
+        self.assertEqual([5], frontier.add([frontier_entry(2, [1, 4, 5])]))
+        self.assertEqual([], frontier.add([frontier_entry(3, [None, 1])]))
+
+        self.assertEqual([6], frontier.add([frontier_entry(4, [1, 5]), frontier_entry(5, [2, 6, 4])]))
+        self.assertEqual([], frontier.add([frontier_entry(6, [5])]))
+
+    def test_already_scraped(self):
+        frontier = EntryFrontier()
+        self.assertEqual([3, 4], frontier.add([frontier_entry(1, [2, 3]), frontier_entry(2, [1, 4, 3])]))
+        self.assertEqual([], frontier.add([frontier_entry(3, [1, 2, 4])]))
+
+
+def ballot(name_std: str, team_id: str, points: list, type: str = "Prelim") -> tuple:
+    return {'name_std': name_std, 'team_id': team_id, 'type': type}, {'speaking': list(map(lambda p: {'points': p}, points))}
+
+
+"""Ballots as (judge, matchup, round, record), in entry page order. j1's R1 ballot in m1 is on both teams' pages."""
+BALLOTS = [
+    ("j1", "m1", *ballot("R1", "t1", [28.5, 29])),
+    ("j1", "m2", *ballot("R2", "t1", [28, 28])),
+    ("j2", "m3", *ballot("R1", "t3", [29])),
+    ("j1", "m1", *ballot("R1", "t2", [27.5, 22])),
+    ("j3", "m4", *ballot("R2", "t3", [], "Elim")),
+    ("j1", "m5", *ballot("R1", "t4", [28])),
+]
+
+
+class TestRecordTable(unittest.TestCase):
+    def setUp(self):
+        self.table = RecordTable()
+        for judge_id, matchup_id, round, record in BALLOTS:
+            self.table.add(judge_id, matchup_id, round, record)
+
+    def test_merge(self):
+        self.assertEqual(["j1", "j2", "j3"], self.table.judge_ids)
+        self.assertEqual(5, len(self.table))
+        self.assertEqual(["t1", "t2"], self.table.teams[0])
+        self.assertEqual([28.5, 29, 27.5, 22], list(map(lambda s: s['points'], self.table.speaking[0])))
+        self.assertEqual([0, 4, 1, 2, 3], self.table.get_order().tolist())
+
+    def test_avg_points(self):
+        avg_points = self.table.get_avg_points().tolist()
+        for row, speaking in enumerate(self.table.speaking):
+            if speaking:
+                self.assertAlmostEqual(statistics.mean(map(lambda s: s['points'], speaking)), avg_points[row])
+            else:
+                self.assertTrue(math.isnan(avg_points[row]))
+
+    def test_count_by_judge(self):
+        self.assertEqual([3, 1, 1], self.table.count_by_judge([True] * len(self.table)).tolist())
+        self.assertEqual([3, 1, 0], self.table.count_by_judge(list(map(lambda r: r['type'] == "Prelim", self.table.rounds))).tolist())
+
+    def test_judge_point_stats(self):
+        stats = self.table.get_judge_point_stats()
+        self.assertEqual({0, 1}, set(stats.keys()))
+
+        points = [28.5, 29, 27.5, 22, 28, 28, 28]
+        raw, adj, std, one_hl, count = stats[0]
+        self.assertEqual(len(points), count)
+        self.assertAlmostEqual(statistics.mean(points), raw)
+        self.assertAlmostEqual(statistics.mean(baseline_apply_iqr(points)), adj)
+        self.assertAlmostEqual(statistics.stdev(points), std)
+        self.assertAlmostEqual(statistics.mean(sorted(points)[1:-1]), one_hl)
+
+        self.assertEqual(29, stats[1][0])
+        self.assertEqual(1, stats[1][4])
+
+    def test_empty(self):
+        self.assertEqual({}, RecordTable().get_judge_point_stats())
+        self.assertEqual([], RecordTable().get_avg_points().tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()